@@ -3,6 +3,9 @@
 
 """
 Analyse les données de ventes et génère les statistiques pour le tableau de bord
+
+Les montants des DataFrames sont en centimes int64 (montant_centimes) : les
+sommes sont exactes et converties en euros une fois, sur le résultat.
 """
 
 import pandas as pd
@@ -12,91 +15,255 @@ import os
 import sys
 from datetime import datetime
 import csv
-from decimal import Decimal
 
 # Assurez-vous que les imports peuvent fonctionner même si le script est exécuté depuis un autre dossier
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(current_dir)
 
 from database import DatabaseManager
-
-# Classe d'encodeur JSON personnalisée pour gérer les types Decimal
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            return float(obj)
-        return super(DecimalEncoder, self).default(obj)
+from cache import ResultCache
+from columns import COLUMN_DTYPES, build_frame, columnar_select, decode_chunk
+from config import (CACHE_MAX_ENTRIES, CACHE_TTL, CACHE_PATH, CSV_CHUNK_SIZE, CSV_FILE_PATH,
+                    DASHBOARD_STATE_PATH, DB_CHUNK_SIZE, SNAPSHOT_DIR)
+from dashboard_export import (COMPACT, DATA_FILE, DELTA_FILE, build_delta, facets_from_cumul, load_state,
+                              merge_rollup, remove_file, save_state, write_file)
+from dimensions import key_columns
+from import_csv import inspect_csv
+from instrumentation import instrumented_run, traced
+from money import AMOUNT_CENTS_SQL, PRICE_CENTS_SQL, cents_from_float
+from snapshot import SnapshotStore
+from watermark import Watermark
 
 class SalesAnalyzer:
     
-    def __init__(self, db_manager=None):
-        self.db = db_manager or DatabaseManager()
+    def __init__(self, db_manager=None, pool=None, cache=None):
+        self.db = db_manager or DatabaseManager(pool=pool)
         if not self.db.connection or not self.db.connection.is_connected():
             self.db.connect()
+        self.cache = cache if cache is not None else ResultCache(CACHE_MAX_ENTRIES, CACHE_TTL, CACHE_PATH)
     
-    def load_data_from_csv(self, csv_file):
-        try:
-            # Lecture du fichier CSV
-            df = pd.read_csv(csv_file, encoding='utf-8')
-            
-            # Nettoyage des noms de colonnes
-            df.columns = df.columns.str.strip()
-            
-            # Gestion des différents formats de colonnes possibles
-            if 'Quantité vendue' in df.columns:
-                df.rename(columns={'Quantité vendue': 'quantite'}, inplace=True)
-            elif 'Quantite vendue' in df.columns:
-                df.rename(columns={'Quantite vendue': 'quantite'}, inplace=True)
-            
-            if 'Prix unitaire' in df.columns:
-                df.rename(columns={'Prix unitaire': 'prix_unitaire'}, inplace=True)
-            elif 'Prix' in df.columns:
-                df.rename(columns={'Prix': 'prix_unitaire'}, inplace=True)
+    def _cached(self, method, params, compute):
+        """
+        Renvoie le résultat en cache pour (méthode, paramètres, version des données)
+        
+        La version (get_data_token) change à chaque import validé, même quand un
+        import concurrent valide des ids inférieurs au dernier : les résultats
+        précédents sont de fait invalidés.
+        """
+        key = (method, params, self.db.get_data_token())
+        return self.cache.get_or_compute(key, compute)
+    
+    def cache_stats(self):
+        return self.cache.get_stats()
+    
+    def save_cache(self):
+        return self.cache.save()
+    
+    # Colonnes du CSV renommées comme celles du DataFrame de load_data_from_db
+    CSV_COLUMNS = {'Date': 'Date', 'Magasin': 'Magasin', 'Produit': 'Produit',
+                   'Quantité vendue': 'quantite', 'Prix unitaire': 'prix_unitaire'}
+    
+    @traced('analyse.iter_data_from_csv', rows=len)
+    def iter_data_from_csv(self, csv_file, chunk_size=CSV_CHUNK_SIZE):
+        """
+        Parcourt un CSV de ventes par DataFrames de chunk_size lignes
+        
+        Encodage, délimiteur, colonnes et format de date sont détectés une fois
+        (inspect_csv). Seules les cinq colonnes utiles sont lues, avec des types
+        compacts : catégories pour magasin/produit, int32 pour la quantité,
+        centimes int64 pour le prix et le montant (un seul arrondi, à la lecture).
+        Les lignes illisibles sont écartées.
+        """
+        layout = inspect_csv(csv_file)
+        if layout is None:
+            return
+        date_parser = layout['date_parser']
+        date_format = date_parser.pandas_format
+        
+        renamed = {actual: self.CSV_COLUMNS[expected] for expected, actual in layout['field_mapping'].items()}
+        names = [renamed.get(field, f'_colonne_{i}') for i, field in enumerate(layout['field_names'])]
+        reader = pd.read_csv(
+            csv_file, sep=layout['delimiter'], encoding=layout['encoding'],
+            header=0, names=names, usecols=list(self.CSV_COLUMNS.values()),
+            dtype={'Date': str, 'Magasin': 'category', 'Produit': 'category'},
+            skipinitialspace=True, on_bad_lines='skip', chunksize=chunk_size
+        )
+        
+        rejected = 0
+        for chunk in reader:
+            dates = chunk['Date']
+            # exact=False : seule la partie date est lue, l'heure éventuelle est ignorée
+            parsed = pd.to_datetime(dates, format=date_format, exact=False, errors='coerce')
+            missing = parsed.isna() & dates.notna()
+            if missing.any():
+                # Valeurs atypiques : même repli que l'import (DateParser puis cascade)
+                parsed[missing] = pd.to_datetime(dates[missing].map(date_parser.parse), errors='coerce')
             
-            # Conversion des types
-            df['Date'] = pd.to_datetime(df['Date'], format='%d/%m/%Y', errors='coerce')
-            df['quantite'] = pd.to_numeric(df['quantite'], errors='coerce')
-            df['prix_unitaire'] = pd.to_numeric(df['prix_unitaire'].astype(str).str.replace(',', '.'), errors='coerce')
+            quantities = self._to_numeric(chunk['quantite'])
+            prices = self._to_numeric(chunk['prix_unitaire'])
             
-            # Calcul du montant total
-            df['montant'] = df['quantite'] * df['prix_unitaire']
+            valid = parsed.notna() & quantities.notna() & prices.notna()
+            valid &= chunk['Magasin'].notna() & chunk['Produit'].notna()
+            rejected += int((~valid).sum())
             
+            quantities = quantities[valid].astype(np.int32)
+            cents = pd.Series(cents_from_float(prices[valid]), index=quantities.index)
+            yield pd.DataFrame({
+                'Date': parsed[valid],
+                'Magasin': chunk['Magasin'][valid],
+                'Produit': chunk['Produit'][valid],
+                'quantite': quantities,
+                'prix_centimes': cents,
+                'montant_centimes': quantities.astype(np.int64) * cents
+            })
+        
+        if rejected:
+            print(f"{rejected} lignes ignorées dans {csv_file} (date, quantité ou prix illisible)")
+    
+    @staticmethod
+    def _to_numeric(column):
+        """Colonne numérique ; le nettoyage des chaînes n'a lieu que si le parseur n'a pas su la lire"""
+        if column.dtype != object and not pd.api.types.is_string_dtype(column):
+            return column
+        cleaned = column.str.replace(' ', '', regex=False).str.replace(',', '.', regex=False)
+        return pd.to_numeric(cleaned, errors='coerce')
+    
+    @traced('analyse.load_data_from_csv', rows=len)
+    def load_data_from_csv(self, csv_file, chunk_size=CSV_CHUNK_SIZE):
+        """Charge un CSV de ventes dans un DataFrame (mêmes colonnes que load_data_from_db)"""
+        try:
+            chunks = list(self.iter_data_from_csv(csv_file, chunk_size))
+            if not chunks:
+                return None
+            df = pd.concat(chunks, ignore_index=True)
+            # Les catégories diffèrent d'un paquet à l'autre : on les réunit après coup
+            for column in ('Magasin', 'Produit'):
+                df[column] = df[column].astype('category')
             return df
         except Exception as e:
             print(f"Erreur lors du chargement du fichier CSV: {e}")
             return None
     
-    def load_data_from_db(self):
-        query = """
-        SELECT date, magasin, produit, quantite, prix_unitaire,
-               quantite * prix_unitaire AS montant
+    @traced('analyse.aggregate_csv', rows=len)
+    def aggregate_csv(self, csv_file, chunk_size=CSV_CHUNK_SIZE):
+        """
+        Agrège un CSV par jour × magasin × produit, paquet par paquet
+        
+        La mémoire utilisée est celle d'un paquet plus celle du cumul, quelle que
+        soit la taille du fichier. Les montants sont cumulés en centimes entiers.
+        Le DataFrame renvoyé a les colonnes de load_data_from_db (Date, Magasin,
+        Produit, quantite, montant_centimes) et peut être passé à toutes les
+        méthodes d'analyse (sales_by_store, sales_trend...).
+        """
+        keys = ['Date', 'Magasin', 'Produit']
+        total = None
+        try:
+            for chunk in self.iter_data_from_csv(csv_file, chunk_size):
+                partial = pd.DataFrame({
+                    'Date': chunk['Date'],
+                    'Magasin': chunk['Magasin'],
+                    'Produit': chunk['Produit'],
+                    'quantite': chunk['quantite'].astype(np.int64),
+                    'montant_centimes': chunk['montant_centimes']
+                }).groupby(keys, sort=False, observed=True).sum()
+                total = partial if total is None else pd.concat([total, partial]).groupby(level=keys, sort=False).sum()
+        except Exception as e:
+            print(f"Erreur lors de l'agrégation du fichier CSV: {e}")
+            return None
+        
+        if total is None:
+            return None
+        return total.reset_index()
+    
+    @traced('analyse.iter_data_from_db', rows=len)
+    def iter_data_from_db(self, chunk_size=DB_CHUNK_SIZE, max_id=None):
+        """
+        Parcourt la table ventes par DataFrames de chunk_size lignes
+        
+        Destiné aux traitements en flux : la mémoire utilisée reste celle d'un paquet.
+        """
+        if max_id is None:
+            max_id = self.db.get_data_version()
+        select, dimensions = columnar_select(self.db)
+        store_codes, product_codes = {}, {}
+        for rows in self.db.iter_chunks(select + "WHERE id <= %s", (max_id,), chunk_size):
+            columns = decode_chunk(rows, store_codes, product_codes, dimensions)
+            yield build_frame(columns, store_codes, product_codes)
+    
+    @traced('analyse.load_data_from_db', rows=len)
+    def load_data_from_db(self, chunk_size=DB_CHUNK_SIZE, columnar=True):
+        """
+        Charge la table ventes dans un DataFrame
+        
+        Les lignes sont lues par paquets et recopiées directement dans des colonnes
+        NumPy préallouées (catégories pour magasin/produit, int32 pour la quantité,
+        datetime64 pour la date, centimes int64 pour le prix et le montant).
+        columnar=False conserve l'ancien chargement par dictionnaires, pour comparaison.
+        """
+        if not columnar:
+            return self._load_data_from_db_dicts()
+        
+        max_id = self.db.get_data_version()
+        result = self.db.fetch_one("SELECT COUNT(*) AS nb FROM ventes WHERE id <= %s", (max_id,))
+        total = int(result['nb']) if result else 0
+        if not total:
+            print("Pas de données disponibles dans la base de données.")
+            return None
+        
+        columns = {name: np.empty(total, dtype=dtype) for name, dtype in COLUMN_DTYPES.items()}
+        select, dimensions = columnar_select(self.db)
+        store_codes, product_codes = {}, {}
+        filled = 0
+        for rows in self.db.iter_chunks(select + "WHERE id <= %s", (max_id,), chunk_size):
+            chunk = decode_chunk(rows, store_codes, product_codes, dimensions)
+            end = min(filled + len(rows), total)
+            for name, values in chunk.items():
+                columns[name][filled:end] = values[:end - filled]
+            filled = end
+        
+        if filled < total:
+            columns = {name: values[:filled] for name, values in columns.items()}
+        return build_frame(columns, store_codes, product_codes)
+    
+    @traced('analyse.load_data_from_snapshot', rows=len)
+    def load_data_from_snapshot(self, path=SNAPSHOT_DIR, columns=None, start=None, end=None, refresh=False):
+        """
+        Charge les ventes depuis la copie locale en colonnes (voir snapshot.py)
+        
+        Seuls les mois compris entre start et end et les colonnes demandées sont lus ;
+        refresh=True ajoute d'abord les lignes importées depuis la dernière copie.
+        """
+        store = SnapshotStore(path)
+        if refresh:
+            store.refresh(self.db)
+        return store.load(columns=columns, start=start, end=end)
+    
+    def _load_data_from_db_dicts(self):
+        # Prix et montant lus directement en centimes entiers : aucun Decimal à convertir
+        dimensions = self.db.dimensions
+        store, product = key_columns(dimensions is not None)
+        query = f"""
+        SELECT date, {store} AS magasin, {product} AS produit, quantite, {PRICE_CENTS_SQL} AS prix_centimes,
+               {AMOUNT_CENTS_SQL} AS montant_centimes
         FROM ventes
         """
         data = self.db.fetch_all(query)
+        if dimensions is not None:
+            dimensions.name_rows(data)
         
         if not data:
             print("Pas de données disponibles dans la base de données.")
             return None
             
-        converted_data = []
-        for row in data:
-            converted_row = {}
-            for key, value in row.items():
-                if isinstance(value, Decimal):
-                    converted_row[key] = float(value)
-                else:
-                    converted_row[key] = value
-            converted_data.append(converted_row)
-            
-        df = pd.DataFrame(converted_data)
+        df = pd.DataFrame(data)
         
         column_mapping = {
             'date': 'Date',
             'magasin': 'Magasin',
             'produit': 'Produit',
             'quantite': 'quantite',
-            'prix_unitaire': 'prix_unitaire',
-            'montant': 'montant'
+            'prix_centimes': 'prix_centimes',
+            'montant_centimes': 'montant_centimes'
         }
         
         df.rename(columns=column_mapping, inplace=True)
@@ -106,22 +273,32 @@ class SalesAnalyzer:
             
         return df
     
+    @staticmethod
+    def _with_cents(df):
+        """DataFrame avec la colonne montant_centimes (déduite de montant en euros si besoin)"""
+        if 'montant_centimes' in df.columns:
+            return df
+        return df.assign(montant_centimes=cents_from_float(df['montant']))
+    
+    @staticmethod
+    def _to_euros(frame, column='total_ventes'):
+        """Conversion finale en euros d'une colonne de sommes en centimes"""
+        frame[column] = frame[column].to_numpy(dtype=np.int64) / 100
+        return frame
+    
+    @traced('analyse.calculate_total_sales')
     def calculate_total_sales(self, df=None):
         if df is None:
-            total = self.db.get_total_sales()
-            return float(total) if isinstance(total, Decimal) else total
-        return float(df['montant'].sum())
+            return self._cached('calculate_total_sales', (), self._total_sales_db)
+        return int(self._with_cents(df)['montant_centimes'].to_numpy().sum()) / 100
     
+    @traced('analyse.sales_by_store')
     def sales_by_store(self, df=None):
         if df is None:
-            stores = self.db.get_sales_by_store()
-            for store in stores:
-                for key, value in store.items():
-                    if isinstance(value, Decimal):
-                        store[key] = float(value)
-            return stores
+            return self._cached('sales_by_store', (), self._sales_by_store_db)
         
-        store_sales = df.groupby('Magasin')['montant'].sum().reset_index()
+        df = self._with_cents(df)
+        store_sales = df.groupby('Magasin')['montant_centimes'].sum().reset_index()
         
         if 'quantite' in df.columns:
             store_quantity = df.groupby('Magasin')['quantite'].sum().reset_index()
@@ -129,33 +306,25 @@ class SalesAnalyzer:
             store_sales = pd.merge(store_sales, store_quantity, on='Magasin', how='left')
         
         store_sales.columns = ['magasin', 'total_ventes'] if len(store_sales.columns) == 2 else ['magasin', 'total_ventes', 'quantite_totale']
-        return store_sales.to_dict('records')
+        return self._to_euros(store_sales).to_dict('records')
     
+    @traced('analyse.sales_by_product')
     def sales_by_product(self, df=None):
         if df is None:
-            products = self.db.get_sales_by_product()
-            for product in products:
-                for key, value in product.items():
-                    if isinstance(value, Decimal):
-                        product[key] = float(value)
-            return products
-        
-        product_sales = df.groupby('Produit').agg({
+            return self._cached('sales_by_product', (), self._sales_by_product_db)
+        
+        product_sales = self._with_cents(df).groupby('Produit').agg({
             'quantite': 'sum',
-            'montant': 'sum'
+            'montant_centimes': 'sum'
         }).reset_index()
         
         product_sales.columns = ['produit', 'quantite_totale', 'total_ventes']
-        return product_sales.to_dict('records')
+        return self._to_euros(product_sales).to_dict('records')
     
+    @traced('analyse.sales_trend')
     def sales_trend(self, df=None, period='M'):
         if df is None:
-            trends = self.db.get_sales_by_date('monthly' if period == 'M' else 'daily' if period == 'D' else 'yearly')
-            for trend in trends:
-                for key, value in trend.items():
-                    if isinstance(value, Decimal):
-                        trend[key] = float(value)
-            return trends
+            return self._cached('sales_trend', (period,), lambda: self._sales_trend_db(period))
         
         if period == 'D':
             df['periode'] = df['Date'].dt.strftime('%Y-%m-%d')
@@ -164,38 +333,57 @@ class SalesAnalyzer:
         else:  # 'Y'
             df['periode'] = df['Date'].dt.strftime('%Y')
         
-        trend = df.groupby('periode')['montant'].sum().reset_index()
+        trend = self._with_cents(df).groupby('periode')['montant_centimes'].sum().reset_index()
         trend.columns = ['periode', 'total_ventes']
-        return trend.to_dict('records')
+        return self._to_euros(trend).to_dict('records')
     
+    @traced('analyse.best_selling_products')
     def best_selling_products(self, df=None, limit=5):
         if df is None:
-            products = self.db.get_best_selling_products(limit)
-            # Convertir les valeurs Decimal
-            for product in products:
-                for key, value in product.items():
-                    if isinstance(value, Decimal):
-                        product[key] = float(value)
-            return products
+            return self._cached('best_selling_products', (limit,),
+                                lambda: self._best_selling_products_db(limit))
         
         top_products = df.groupby('Produit')['quantite'].sum().reset_index()
         top_products.columns = ['produit', 'quantite_totale']
         top_products = top_products.sort_values('quantite_totale', ascending=False).head(limit)
         return top_products.to_dict('records')
     
-    def convert_decimal_values(self, data):
-        if isinstance(data, dict):
-            return {k: self.convert_decimal_values(v) for k, v in data.items()}
-        elif isinstance(data, list):
-            return [self.convert_decimal_values(item) for item in data]
-        elif isinstance(data, Decimal):
-            return float(data)
-        else:
-            return data
+    # Requêtes en base (appelées via le cache)
     
-    def generate_full_report(self, output_format='json'):
-        # Chargement des données
-        df = self.load_data_from_db()
+    # Les montants arrivent déjà convertis en euros (sommes en centimes, voir database.py)
+    
+    def _total_sales_db(self):
+        return self.db.get_total_sales()
+    
+    def _sales_by_store_db(self):
+        return self.db.get_sales_by_store()
+    
+    def _sales_by_product_db(self):
+        return self._with_int_quantities(self.db.get_sales_by_product())
+    
+    def _sales_trend_db(self, period):
+        return self.db.get_sales_by_date('monthly' if period == 'M' else 'daily' if period == 'D' else 'yearly')
+    
+    def _best_selling_products_db(self, limit):
+        return self._with_int_quantities(self.db.get_best_selling_products(limit))
+    
+    @staticmethod
+    def _with_int_quantities(rows):
+        # SUM d'entiers : Decimal sous MySQL
+        for row in rows:
+            row['quantite_totale'] = int(row['quantite_totale'] or 0)
+        return rows
+    
+    @traced('analyse.generate_full_report')
+    def generate_full_report(self, output_format='json', source='db', csv_file=None):
+        # Chargement des données (source='snapshot' : copie locale, sans la base ;
+        # source='csv' : fichier csv_file agrégé par paquets, sans le charger en entier)
+        if source == 'snapshot':
+            df = self.load_data_from_snapshot()
+        elif source == 'csv':
+            df = self.aggregate_csv(csv_file or CSV_FILE_PATH)
+        else:
+            df = self.load_data_from_db()
         if df is None:
             print("Impossible de charger les données depuis la base de données.")
             return None
@@ -209,15 +397,13 @@ class SalesAnalyzer:
             'produits_populaires': self.best_selling_products(df)
         }
         
-        report = self.convert_decimal_values(report)
-        
         script_dir = os.path.dirname(os.path.abspath(__file__))
         project_dir = os.path.dirname(script_dir)
         
         if output_format == 'json':
             report_path = os.path.join(project_dir, 'rapport_ventes.json')
             with open(report_path, 'w', encoding='utf-8') as f:
-                json.dump(report, f, cls=DecimalEncoder, ensure_ascii=False, indent=4)
+                json.dump(report, f, ensure_ascii=False, indent=4)
             print(f"Rapport JSON généré: {report_path}")
         
         elif output_format == 'csv':
@@ -233,14 +419,44 @@ class SalesAnalyzer:
         
         return report
     
-    def export_data_for_dashboard(self):
+    @traced('analyse.export_data_for_dashboard')
+    def export_data_for_dashboard(self, incremental=True, compress=False, state_path=DASHBOARD_STATE_PATH):
+        """
+        Écrit frontend/js/dashboard_data.js (voir dashboard_export.py)
+        
+        Args:
+            incremental (bool): Ne lit que les ventes importées depuis le dernier export et
+                                les fusionne au cumul sauvegardé ; False recalcule tout
+            compress (bool): Écrit aussi des copies .gz précompressées
+            state_path (str): Fichier d'état de l'export incrémental
+        
+        Returns:
+            dict: Données du tableau de bord, ou None en cas d'erreur
+        """
         if not self.db.connection or not self.db.connection.is_connected():
             self.db.connect()
         
         try:
-            dashboard_data = self.db.get_sales_data_for_dashboard()
+            version = self.db.get_data_version()
+            previous = load_state(state_path)
+            state = previous if incremental else None
             
-            dashboard_data = self.convert_decimal_values(dashboard_data)
+            if state is not None and state['repere'].max_id <= version:
+                intervals, watermark = state['repere'].plan(self.db, version)
+                rows = self.db.get_monthly_rollup_for_ids(intervals)
+                cumul = merge_rollup(state['cumul'], rows)
+                revision = state['version'] + 1 if rows else state['version']
+                delta = build_delta(state['version'], revision, rows)
+            else:
+                # Premier export, export forcé ou table vidée depuis : cumul complet
+                intervals, watermark = Watermark().plan(self.db, version)
+                cumul = merge_rollup({}, self.db.get_monthly_rollup_for_ids(intervals))
+                # Jamais une version déjà publiée : un navigateur n'appliquerait pas un delta étranger
+                revision = previous['version'] + 1 if previous is not None else 1
+                delta = None
+            
+            dashboard_data = facets_from_cumul(cumul)
+            dashboard_data['data_version'] = revision
             
             script_dir = os.path.dirname(os.path.abspath(__file__))
             project_dir = os.path.dirname(script_dir)
@@ -249,12 +465,20 @@ class SalesAnalyzer:
             if not os.path.exists(js_dir):
                 os.makedirs(js_dir)
                 
-            js_file = os.path.join(js_dir, 'dashboard_data.js')
+            js_file = os.path.join(js_dir, DATA_FILE)
+            payload = json.dumps(dashboard_data, **COMPACT)
+            size = write_file(js_file, f"const dashboardData = {payload};", compress)
+            
+            delta_file = os.path.join(js_dir, DELTA_FILE)
+            if delta is not None:
+                write_file(delta_file, json.dumps(delta, **COMPACT), compress)
+            else:
+                remove_file(delta_file)
             
-            with open(js_file, 'w', encoding='utf-8') as f:
-                f.write(f"const dashboardData = {json.dumps(dashboard_data, cls=DecimalEncoder, ensure_ascii=False, indent=2)};")
+            save_state(state_path, watermark, revision, cumul)
             
-            print(f"Données exportées pour le tableau de bord: {js_file}")
+            detail = f", delta de {len(delta['lignes'])} lignes" if delta is not None else ""
+            print(f"Données exportées pour le tableau de bord: {js_file} ({size} octets{detail})")
             return dashboard_data
             
         except Exception as e:
@@ -262,8 +486,10 @@ class SalesAnalyzer:
             return None
 
 if __name__ == "__main__":
-    analyzer = SalesAnalyzer()
-    report = analyzer.generate_full_report(output_format='json')
-    analyzer.export_data_for_dashboard()
-    
-    analyzer.db.disconnect()
\ No newline at end of file
+    with instrumented_run('analyse'):
+        analyzer = SalesAnalyzer()
+        report = analyzer.generate_full_report(output_format='json')
+        analyzer.export_data_for_dashboard()
+        
+        analyzer.save_cache()
+        analyzer.db.disconnect()
\ No newline at end of file
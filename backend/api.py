@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+API HTTP du tableau de bord
+
+Sert le dossier frontend/ et expose les agrégations de DatabaseManager en JSON,
+calculées à la demande au lieu d'être figées dans js/dashboard_data.js.
+
+Filtres communs (paramètres de requête) :
+    debut, fin        bornes de dates incluses (AAAA-MM-JJ)
+    magasin, produit  répétables : ?magasin=Paris&magasin=Lyon
+
+Routes :
+    /api/dashboard    mêmes données que dashboardData
+    /api/total        total des ventes, des quantités et des transactions
+    /api/magasins     ventes par magasin (paginé : page, par_page)
+    /api/produits     ventes par produit (paginé)
+    /api/tendance     ventes par période, periode=jour|mois|annee (paginé)
+    /api/populaires   produits les plus vendus en quantité (limite)
+    /api/ventes       lignes brutes, pagination par curseur (apres=<dernier id>, par_page)
+    /api/cube         agrégation libre sur le cube en mémoire (cube.py) : par=magasin&par=mois,
+                      top, mesure=montant|quantite|transactions
+    /api/sante        état du pool de connexions, du cache et du cube
+    /api/metriques    mesures de instrumentation.py au format texte de Prometheus
+
+Chaque réponse porte un ETag dérivé de la version des données (get_data_token,
+qui change à chaque import validé) et de la requête : un client qui renvoie
+If-None-Match reçoit un 304 sans qu'aucune agrégation ne soit exécutée. Les
+corps JSON sont gardés dans un ResultCache indexé de la même façon.
+
+Les vues sont synchrones : chaque requête emprunte une connexion au pool le temps
+d'une requête SQL, la concurrence vient des threads du serveur. En production :
+    gunicorn -k gthread -w 2 --threads 8 --chdir backend -b 0.0.0.0:5000 api:app
+En développement :
+    python backend/api.py
+"""
+
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import Flask, Response, jsonify, request, send_from_directory
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+from cache import ResultCache
+from config import (API_HOST, API_MAX_PAGE_SIZE, API_PAGE_SIZE, API_PORT,
+                    CACHE_MAX_ENTRIES, CACHE_TTL)
+from cube import SalesCube
+from database import DatabaseManager, build_dashboard_facets, build_filters, get_shared_pool
+from dimensions import key_columns
+from instrumentation import prometheus_text, span
+
+FRONTEND_DIR = os.path.join(os.path.dirname(current_dir), 'frontend')
+
+# Durée pendant laquelle la version des données est réutilisée sans interroger la base
+VERSION_TTL = 1.0
+
+TREND_PERIODS = {'jour': 'jour', 'mois': 'mois', 'annee': 'annee'}
+
+class ApiError(Exception):
+    """Paramètre de requête invalide (réponse 400)"""
+
+class ApiJSONEncoder(json.JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return float(obj)
+        if isinstance(obj, (date, datetime)):
+            return obj.isoformat()
+        return super(ApiJSONEncoder, self).default(obj)
+
+def parse_filters(args):
+    """Lit debut, fin, magasin et produit depuis les paramètres de la requête"""
+    filters = {'start': args.get('debut'), 'end': args.get('fin'),
+               'stores': args.getlist('magasin'), 'products': args.getlist('produit')}
+    for name, key in (('debut', 'start'), ('fin', 'end')):
+        if filters[key]:
+            try:
+                datetime.strptime(filters[key], '%Y-%m-%d')
+            except ValueError:
+                raise ApiError(f"Paramètre '{name}' invalide, format attendu AAAA-MM-JJ")
+    return filters
+
+def parse_int(args, name, default, minimum=1, maximum=None):
+    value = args.get(name)
+    if value is None:
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise ApiError(f"Paramètre '{name}' invalide, entier attendu")
+    if value < minimum:
+        raise ApiError(f"Paramètre '{name}' doit être supérieur ou égal à {minimum}")
+    return min(value, maximum) if maximum else value
+
+def paginate(fetch, args):
+    """
+    Appelle fetch(limit, offset) en demandant une ligne de plus que la page
+
+    Returns:
+        dict: {donnees, page, par_page, suite}
+    """
+    page = parse_int(args, 'page', 1)
+    per_page = parse_int(args, 'par_page', API_PAGE_SIZE, maximum=API_MAX_PAGE_SIZE)
+    rows = fetch(per_page + 1, (page - 1) * per_page)
+    return {'donnees': rows[:per_page], 'page': page, 'par_page': per_page,
+            'suite': len(rows) > per_page}
+
+def create_app(db=None, cache=None, cube=None):
+    """
+    Crée l'application Flask
+
+    Args:
+        db (DatabaseManager, optional): Accès aux données (pool partagé par défaut)
+        cache (ResultCache, optional): Cache des réponses JSON
+        cube (SalesCube, optional): Cube en mémoire, chargé à la première requête /api/cube
+    """
+    app = Flask(__name__, static_folder=None)
+    db = db or DatabaseManager(pool=get_shared_pool())
+    cache = cache if cache is not None else ResultCache(CACHE_MAX_ENTRIES, CACHE_TTL)
+    cube = cube if cube is not None else SalesCube()
+    version_state = {'value': None, 'read_at': 0.0}
+    version_lock = threading.Lock()
+
+    def data_version():
+        with version_lock:
+            if time.monotonic() - version_state['read_at'] > VERSION_TTL:
+                version_state['value'] = db.get_data_token()
+                version_state['read_at'] = time.monotonic()
+            return version_state['value']
+
+    def cached_json(compute):
+        """Sert le résultat de compute() en JSON, avec ETag et cache des réponses"""
+        with span(f"api.{request.endpoint}"):
+            return _cached_json(compute)
+
+    def _cached_json(compute):
+        version = data_version()
+        query = sorted((key, tuple(values)) for key, values in request.args.lists())
+        digest = hashlib.sha1(repr((request.path, query)).encode('utf-8')).hexdigest()[:16]
+        etag = f"{version}-{digest}"
+
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            key = (request.path, tuple(query), version)
+            body = cache.get_or_compute(
+                key, lambda: json.dumps(compute(), cls=ApiJSONEncoder, ensure_ascii=False))
+            response = Response(body, mimetype='application/json')
+        response.set_etag(etag)
+        # Le navigateur peut garder la réponse mais doit la revalider à chaque usage
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    @app.errorhandler(ApiError)
+    def bad_request(error):
+        return jsonify({'erreur': str(error)}), 400
+
+    @app.route('/')
+    def index():
+        return send_from_directory(FRONTEND_DIR, 'dashboard.html')
+
+    @app.route('/<path:filename>')
+    def frontend(filename):
+        return send_from_directory(FRONTEND_DIR, filename)
+
+    @app.route('/api/dashboard')
+    def dashboard():
+        filters = parse_filters(request.args)
+        limit = parse_int(request.args, 'limite', 5)
+        return cached_json(lambda: build_dashboard_facets(db.get_monthly_rollup(**filters), limit))
+
+    @app.route('/api/total')
+    def total():
+        filters = parse_filters(request.args)
+
+        def compute():
+            rows = db.get_sales_summary(None, **filters)
+            return rows[0] if rows else {'quantite_totale': None, 'total_ventes': None,
+                                         'nb_transactions': None}
+        return cached_json(compute)
+
+    @app.route('/api/magasins')
+    def stores():
+        filters = parse_filters(request.args)
+        return cached_json(lambda: paginate(
+            lambda limit, offset: db.get_sales_summary('magasin', limit=limit, offset=offset, **filters),
+            request.args))
+
+    @app.route('/api/produits')
+    def products():
+        filters = parse_filters(request.args)
+        return cached_json(lambda: paginate(
+            lambda limit, offset: db.get_sales_summary('produit', limit=limit, offset=offset, **filters),
+            request.args))
+
+    @app.route('/api/tendance')
+    def trend():
+        filters = parse_filters(request.args)
+        period = request.args.get('periode', 'mois')
+        if period not in TREND_PERIODS:
+            raise ApiError("Paramètre 'periode' invalide, valeurs possibles: jour, mois, annee")
+        return cached_json(lambda: paginate(
+            lambda limit, offset: db.get_sales_summary(TREND_PERIODS[period], limit=limit, offset=offset,
+                                                       order_by='periode', **filters),
+            request.args))
+
+    @app.route('/api/populaires')
+    def best_sellers():
+        filters = parse_filters(request.args)
+        limit = parse_int(request.args, 'limite', 5, maximum=API_MAX_PAGE_SIZE)
+        return cached_json(lambda: db.get_sales_summary('produit', limit=limit, order_by='quantite_totale',
+                                                        **filters))
+
+    @app.route('/api/ventes')
+    def sales():
+        filters = parse_filters(request.args)
+        after = parse_int(request.args, 'apres', 0, minimum=0)
+        per_page = parse_int(request.args, 'par_page', API_PAGE_SIZE, maximum=API_MAX_PAGE_SIZE)
+
+        def compute():
+            # Pagination par curseur sur la clé primaire : coût constant quelle que soit la page
+            star = db.is_star_schema()
+            store, product = key_columns(star)
+            where, params = build_filters(star=star, **filters)
+            where = (where + " AND" if where else " WHERE") + " id > %s"
+            rows = db.fetch_all(f"""
+            SELECT id, date, {store} AS magasin, {product} AS produit, quantite, prix_unitaire
+            FROM ventes{where}
+            ORDER BY id
+            LIMIT %s
+            """, params + [after, per_page + 1])
+            has_more = len(rows) > per_page
+            rows = rows[:per_page]
+            if star:
+                db.dimensions.name_rows(rows)
+            return {'donnees': rows, 'par_page': per_page, 'suite': has_more,
+                    'apres': rows[-1]['id'] if has_more else None}
+        return cached_json(compute)
+
+    @app.route('/api/cube')
+    def cube_query():
+        filters = parse_filters(request.args)
+        by = tuple(request.args.getlist('par'))
+        top = parse_int(request.args, 'top', None)
+        measure = request.args.get('mesure', 'montant')
+
+        def compute():
+            if not cube.is_current(db.get_data_version()):
+                cube.refresh(db)
+            try:
+                return cube.query(by, top=top, measure=measure, **filters)
+            except ValueError as e:
+                raise ApiError(str(e))
+        return cached_json(compute)
+
+    @app.route('/api/sante')
+    def health():
+        return jsonify({
+            'version_donnees': data_version(),
+            'pool': db.pool.get_metrics() if db.pool is not None else None,
+            'cache': cache.get_stats(),
+            'cube': cube.get_stats()
+        })
+
+    @app.route('/api/metriques')
+    def metrics():
+        return Response(prometheus_text(), mimetype='text/plain; version=0.0.4')
+
+    return app
+
+app = create_app()
+
+if __name__ == "__main__":
+    # Serveur de développement multi-thread ; voir l'en-tête pour gunicorn
+    app.run(host=API_HOST, port=API_PORT, threaded=True)
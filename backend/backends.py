@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Moteurs de base de données : MySQL (serveur) ou SQLite (fichier local, embarqué)
+
+Le moteur est choisi par la clé 'backend' du dictionnaire de connexion
+(DB_CONFIG, db_config...) : 'mysql' par défaut, 'sqlite' avec 'database' = chemin
+du fichier. DatabaseManager, le pool, l'import et les cumuls passent par connect()
+et par les méthodes du moteur pour tout ce qui diffère d'un dialecte à l'autre :
+existence d'une table, création des tables et index, upsert, insertion sans
+doublon, vidage d'une table, partitions et plan d'exécution (EXPLAIN).
+
+Les requêtes de lecture restent écrites en SQL MySQL (paramètres %s,
+DATE_FORMAT, DATEDIFF, CAST ... AS SIGNED) : les curseurs SQLite les
+traduisent à la volée (SQLiteBackend.translate), ce qui évite de dupliquer
+chaque requête. Avec SQLite, les analyses s'exécutent dans le processus, sans
+aller-retour réseau ; les montants agrégés sont alors des float et non des
+Decimal.
+"""
+
+import re
+import sqlite3
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+
+try:
+    import mysql.connector
+    from mysql.connector import Error as MySQLError
+except ImportError:
+    # SQLite seul (poste d'analyse, intégration continue) : mysql-connector n'est pas requis
+    mysql = None
+
+    class MySQLError(Exception):
+        pass
+
+# Exceptions à intercepter quel que soit le moteur
+DatabaseError = (MySQLError, sqlite3.Error)
+
+# Marqueur de colonne "clé primaire entière auto-incrémentée" dans les définitions de table
+AUTO_ID = 'AUTO_ID'
+
+def ensure_indexes(cursor, table, indexes, obsolete=()):
+    """
+    Crée les index manquants d'une table existante et supprime ceux qu'ils remplacent
+
+    Args:
+        indexes (list): (nom de l'index, colonnes) attendus
+        obsolete (tuple): Noms d'index d'un ancien schéma à supprimer
+
+    Returns:
+        list: Noms des index créés
+    """
+    backend = backend_of(cursor)
+    created = []
+    for name, columns in indexes:
+        if not backend.index_exists(cursor, table, name):
+            print(f"Création de l'index '{name}' sur '{table}'...")
+            cursor.execute(backend.create_index_sql(table, name, columns))
+            created.append(name)
+    for name in obsolete:
+        if backend.index_exists(cursor, table, name):
+            print(f"Suppression de l'index '{name}' (remplacé) sur '{table}'...")
+            cursor.execute(backend.drop_index_sql(table, name))
+    return created
+
+def _explain_rows(cursor):
+    names = [column[0] for column in cursor.description]
+    return [row if isinstance(row, dict) else dict(zip(names, row)) for row in cursor.fetchall()]
+
+class MySQLBackend:
+    name = 'mysql'
+    partitioning = True
+
+    def connect(self, config):
+        if mysql is None:
+            raise MySQLError("mysql-connector-python n'est pas installé")
+        return mysql.connector.connect(**{k: v for k, v in config.items() if k != 'backend'})
+
+    def table_exists(self, cursor, table):
+        cursor.execute("SHOW TABLES LIKE %s", (table,))
+        return cursor.fetchone() is not None
+
+    def column_exists(self, cursor, table, column):
+        cursor.execute(f"SHOW COLUMNS FROM {table} LIKE %s", (column,))
+        return cursor.fetchone() is not None
+
+    def index_exists(self, cursor, table, name):
+        cursor.execute(f"SHOW INDEX FROM {table} WHERE Key_name = %s", (name,))
+        return bool(cursor.fetchall())
+
+    def create_table_sql(self, table, columns, primary_key=None, indexes=(), unique_indexes=(), partitions=None):
+        """
+        Instructions de création d'une table et de ses index
+
+        Args:
+            table (str): Nom de la table
+            columns (list): (nom, type SQL) ; type AUTO_ID pour l'identifiant auto-incrémenté
+            primary_key (tuple, optional): Colonnes de la clé primaire composite
+            indexes, unique_indexes (list): (nom de l'index, colonnes)
+            partitions (tuple, optional): (colonne, [(nom, borne exclue ou None), ...]) pour
+                un partitionnement RANGE ; la colonne est ajoutée à la clé primaire et aux
+                index uniques, comme l'exige MySQL
+
+        Returns:
+            list: Requêtes à exécuter dans l'ordre
+        """
+        column, bounds = partitions or (None, None)
+        auto = [name for name, kind in columns if kind == AUTO_ID]
+        if column and auto:
+            primary_key = primary_key or (auto[0], column)
+        auto_kind = 'INT NOT NULL AUTO_INCREMENT' if primary_key else 'INT AUTO_INCREMENT PRIMARY KEY'
+        lines = [f"{name} {auto_kind if kind == AUTO_ID else kind}" for name, kind in columns]
+        if primary_key:
+            lines.append(f"PRIMARY KEY ({', '.join(primary_key)})")
+        lines.extend(f"INDEX {name} ({', '.join(cols)})" for name, cols in indexes)
+        lines.extend(f"UNIQUE INDEX {name} ({', '.join(self._with_column(cols, column))})"
+                     for name, cols in unique_indexes)
+        body = ',\n    '.join(lines)
+        suffix = f"\n{self.partition_clause(column, bounds)}" if column else ""
+        return [f"CREATE TABLE IF NOT EXISTS {table} (\n    {body}\n) ENGINE=InnoDB{suffix}"]
+
+    @staticmethod
+    def _with_column(columns, column):
+        return tuple(columns) + ((column,) if column and column not in columns else ())
+
+    def create_index_sql(self, table, name, columns, unique=False):
+        return f"CREATE {'UNIQUE ' if unique else ''}INDEX {name} ON {table} ({', '.join(columns)})"
+
+    def drop_index_sql(self, table, name):
+        return f"DROP INDEX {name} ON {table}"
+
+    @staticmethod
+    def _partition_definitions(bounds):
+        return ',\n    '.join(f"PARTITION {name} VALUES LESS THAN ({repr(bound) if bound else 'MAXVALUE'})"
+                               for name, bound in bounds)
+
+    def partition_clause(self, column, bounds):
+        """Clause PARTITION BY RANGE COLUMNS, partitions (nom, borne exclue ; None = MAXVALUE)"""
+        return f"PARTITION BY RANGE COLUMNS({column}) (\n    {self._partition_definitions(bounds)}\n)"
+
+    def list_partitions(self, cursor, table):
+        """Noms des partitions d'une table, dans l'ordre ; None si elle n'est pas partitionnée"""
+        cursor.execute("""
+        SELECT partition_name AS nom FROM information_schema.partitions
+        WHERE table_schema = DATABASE() AND table_name = %s AND partition_name IS NOT NULL
+        ORDER BY partition_ordinal_position
+        """, (table,))
+        names = [row['nom'] if isinstance(row, dict) else row[0] for row in cursor.fetchall()]
+        return names or None
+
+    def split_partition_sql(self, table, partition, bounds):
+        """Découpe une partition (la dernière, MAXVALUE) en partitions (nom, borne)"""
+        return (f"ALTER TABLE {table} REORGANIZE PARTITION {partition} INTO (\n    "
+                f"{self._partition_definitions(bounds)}\n)")
+
+    def full_scans(self, cursor, query, params, tables):
+        """Parcours complets (table ou index entier) des tables données, selon EXPLAIN"""
+        cursor.execute(f"EXPLAIN {query}", params or ())
+        return [f"{row['table']} (type {row['type']}, partitions {row.get('partitions')})"
+                for row in _explain_rows(cursor)
+                if row.get('table') in tables and row.get('type') in ('ALL', 'index')]
+
+    def upsert_sql(self, table, columns, keys, increments):
+        """INSERT qui ajoute les colonnes increments aux valeurs existantes en cas de doublon de clé"""
+        updates = ',\n    '.join(f"{col} = {col} + VALUES({col})" for col in increments)
+        return (f"INSERT INTO {table} ({', '.join(columns)})\n"
+                f"VALUES ({', '.join(['%s'] * len(columns))})\n"
+                f"ON DUPLICATE KEY UPDATE\n    {updates}")
+
+    def insert_ignore_sql(self, table, columns):
+        """INSERT qui ignore les lignes en doublon d'une clé unique"""
+        return f"INSERT IGNORE INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+
+    def truncate_sql(self, table):
+        return [f"TRUNCATE TABLE {table}"]
+
+    def update_statistics(self, cursor):
+        """Met à jour les statistiques de l'optimiseur après un import"""
+        # InnoDB les recalcule de lui-même (innodb_stats_auto_recalc) après 10 % de lignes modifiées
+        return None
+
+    def translate(self, query):
+        return query
+
+# Spécificateurs de DATE_FORMAT (MySQL) -> strftime (SQLite) ; les autres
+# (noms de mois et de jours, semaines...) n'ont pas d'équivalent
+DATE_SPECIFIERS = {'%Y': '%Y', '%m': '%m', '%d': '%d', '%H': '%H', '%i': '%M',
+                   '%s': '%S', '%S': '%S', '%j': '%j', '%T': '%H:%M:%S', '%%': '%%'}
+
+def _date_format_to_strftime(match):
+    """Remplacement de DATE_FORMAT(expression, 'format') par strftime"""
+    def specifier(found):
+        if found.group(0) not in DATE_SPECIFIERS:
+            raise ValueError(f"Format DATE_FORMAT non traduisible pour SQLite: {found.group(0)}")
+        return DATE_SPECIFIERS[found.group(0)]
+    return f"strftime('{re.sub(r'%.', specifier, match.group(2))}', {match.group(1)})"
+
+class SQLiteBackend:
+    name = 'sqlite'
+    # Pas de partitionnement : les index couvrants sur la date font l'élagage
+    partitioning = False
+
+    # Réglages de connexion : journal WAL (lecteurs non bloqués par l'import), cache
+    # de pages de 256 Mo, tables temporaires des GROUP BY en mémoire, lecture en mmap
+    PRAGMAS = [
+        "PRAGMA journal_mode = WAL",
+        "PRAGMA synchronous = NORMAL",
+        "PRAGMA cache_size = -262144",
+        "PRAGMA temp_store = MEMORY",
+        "PRAGMA mmap_size = 1073741824"
+    ]
+
+    # Dialecte MySQL utilisé par les requêtes du projet -> équivalent SQLite ; les
+    # paramètres %s sont remplacés hors des chaînes littérales ('%s' dans un LIKE...)
+    TRANSLATIONS = [
+        (re.compile(r"DATE_FORMAT\(([^,()]+),\s*'([^']*)'\)"), _date_format_to_strftime),
+        (re.compile(r"DATEDIFF\(([^,()]+),\s*('[^']*'|%s)\)"),
+         r"CAST(julianday(\1) - julianday(\2) AS INTEGER)"),
+        (re.compile(r"\bAS SIGNED\)"), "AS INTEGER)"),
+        (re.compile(r"('(?:[^']|'')*')|%s"), lambda match: match.group(1) or "?")
+    ]
+
+    def __init__(self):
+        self._translated = {}
+        self._lock = threading.Lock()
+
+    def connect(self, config):
+        connection = sqlite3.connect(config['database'], timeout=config.get('timeout', 30),
+                                     detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+        for pragma in self.PRAGMAS:
+            connection.execute(pragma)
+        return SQLiteConnection(connection, self)
+
+    def table_exists(self, cursor, table):
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = %s", (table,))
+        return cursor.fetchone() is not None
+
+    def column_exists(self, cursor, table, column):
+        cursor.execute(f"SELECT name FROM pragma_table_info('{table}') WHERE name = %s", (column,))
+        return cursor.fetchone() is not None
+
+    def index_exists(self, cursor, table, name):
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = %s AND name = %s",
+                       (table, name))
+        return cursor.fetchone() is not None
+
+    def create_table_sql(self, table, columns, primary_key=None, indexes=(), unique_indexes=(), partitions=None):
+        lines = [f"{name} {'INTEGER PRIMARY KEY AUTOINCREMENT' if kind == AUTO_ID else kind}"
+                 for name, kind in columns]
+        if primary_key:
+            lines.append(f"PRIMARY KEY ({', '.join(primary_key)})")
+        body = ',\n    '.join(lines)
+        # Clé composite : table organisée selon la clé (comme InnoDB), sans rowid
+        suffix = " WITHOUT ROWID" if primary_key else ""
+        statements = [f"CREATE TABLE IF NOT EXISTS {table} (\n    {body}\n){suffix}"]
+        statements.extend(self.create_index_sql(table, name, cols) for name, cols in indexes)
+        statements.extend(self.create_index_sql(table, name, cols, unique=True) for name, cols in unique_indexes)
+        return statements
+
+    def create_index_sql(self, table, name, columns, unique=False):
+        return f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"
+
+    def drop_index_sql(self, table, name):
+        return f"DROP INDEX IF EXISTS {name}"
+
+    def list_partitions(self, cursor, table):
+        return None
+
+    def full_scans(self, cursor, query, params, tables):
+        # "SCAN t" (éventuellement USING INDEX) : parcours complet ; "SEARCH t" : accès par plage
+        cursor.execute(f"EXPLAIN QUERY PLAN {query}", params or ())
+        details = [row['detail'] for row in _explain_rows(cursor)]
+        return [detail for detail in details
+                if detail.startswith('SCAN ') and detail.split()[1] in tables]
+
+    def upsert_sql(self, table, columns, keys, increments):
+        updates = ',\n    '.join(f"{col} = {col} + excluded.{col}" for col in increments)
+        return (f"INSERT INTO {table} ({', '.join(columns)})\n"
+                f"VALUES ({', '.join(['%s'] * len(columns))})\n"
+                f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET\n    {updates}")
+
+    def insert_ignore_sql(self, table, columns):
+        return f"INSERT OR IGNORE INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+
+    def truncate_sql(self, table):
+        # Remet aussi le compteur AUTOINCREMENT à zéro, comme TRUNCATE sous MySQL
+        return [f"DELETE FROM {table}", f"DELETE FROM sqlite_sequence WHERE name = '{table}'"]
+
+    def update_statistics(self, cursor):
+        # Sans statistiques, SQLite préfère parcourir tout un index dans l'ordre du GROUP BY
+        # plutôt que borner la lecture à date >= ... ; ANALYZE par échantillon (rapide)
+        cursor.execute("PRAGMA analysis_limit = 1000")
+        cursor.execute("ANALYZE")
+
+    def translate(self, query):
+        """Traduit une requête écrite pour MySQL (résultat mémorisé par requête)"""
+        translated = self._translated.get(query)
+        if translated is None:
+            translated = query
+            for pattern, replacement in self.TRANSLATIONS:
+                translated = pattern.sub(replacement, translated)
+            with self._lock:
+                self._translated[query] = translated
+        return translated
+
+class SQLiteConnection:
+    """Connexion SQLite exposant l'interface de mysql.connector utilisée par le projet"""
+
+    def __init__(self, connection, backend):
+        self.connection = connection
+        self.backend = backend
+        self._open = True
+
+    def cursor(self, dictionary=False, buffered=False):
+        return SQLiteCursor(self.connection.cursor(), self.backend, dictionary)
+
+    def is_connected(self):
+        return self._open
+
+    def ping(self, reconnect=False):
+        self.connection.execute("SELECT 1")
+
+    def commit(self):
+        self.connection.commit()
+
+    def rollback(self):
+        self.connection.rollback()
+
+    def close(self):
+        self._open = False
+        self.connection.close()
+
+class SQLiteCursor:
+    """Curseur SQLite qui traduit les requêtes MySQL et peut renvoyer des dictionnaires"""
+
+    def __init__(self, cursor, backend, dictionary=False):
+        self._cursor = cursor
+        self.backend = backend
+        self.dictionary = dictionary
+
+    def execute(self, query, params=()):
+        self._cursor.execute(self.backend.translate(query), tuple(params or ()))
+
+    def executemany(self, query, rows):
+        self._cursor.executemany(self.backend.translate(query), rows)
+
+    def _convert(self, rows):
+        if not self.dictionary:
+            return rows
+        names = [column[0] for column in self._cursor.description]
+        return [dict(zip(names, row)) for row in rows]
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        return self._convert([row])[0] if row is not None else None
+
+    def fetchall(self):
+        return self._convert(self._cursor.fetchall())
+
+    def fetchmany(self, size):
+        return self._convert(self._cursor.fetchmany(size))
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def close(self):
+        self._cursor.close()
+
+# Types lus et écrits comme avec mysql.connector : DATE -> date, DECIMAL -> Decimal
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_converter('DATE', lambda value: date.fromisoformat(value.decode()))
+sqlite3.register_converter('DECIMAL', lambda value: Decimal(value.decode()))
+
+BACKENDS = {'mysql': MySQLBackend(), 'sqlite': SQLiteBackend()}
+
+def get_backend(config):
+    """Moteur désigné par la clé 'backend' de la configuration de connexion"""
+    name = config.get('backend', 'mysql')
+    if name not in BACKENDS:
+        raise ValueError(f"Moteur de base de données inconnu: {name} (possibles: {', '.join(BACKENDS)})")
+    return BACKENDS[name]
+
+def connect(config):
+    """Ouvre une connexion avec le moteur de la configuration"""
+    return get_backend(config).connect(config)
+
+def backend_of(handle):
+    """Moteur d'une connexion ou d'un curseur ouvert par connect()"""
+    return getattr(handle, 'backend', None) or BACKENDS['mysql']
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Suite de mesures reproductible de toute la chaîne : import, chargement, rapports
+
+Pour chaque taille demandée (10k, 1M, 10M lignes par défaut), la suite génère
+des fichiers déterministes (generateur_donnees.py, gardés dans bench_data/ pour
+les exécutions suivantes), les importe dans la base de mesure puis chronomètre
+chaque étape :
+
+    import                         import_data d'un CSV propre (format d'origine)
+    import_variantes               import_data d'un CSV cp1252, ';', dates jj/mm/aaaa, 1 % de lignes invalides
+    load_data_from_db              chargement de la table ventes en DataFrame
+    generate_full_report           rapport JSON complet
+    get_sales_data_for_dashboard   données du tableau de bord
+    generate_sales_report_data     données du rapport PDF (un an, tous magasins)
+
+Les étapes de lecture sont répétées et le meilleur temps est retenu. Chaque
+mesure est ajoutée à mesures/benchmarks.jsonl (commit, machine, durées), puis
+comparée à la référence benchmarks/reference.json : une durée qui dépasse la
+référence de plus de BENCH_TOLERANCE est signalée comme régression et le script
+se termine en erreur (utilisable en intégration continue).
+
+Usage: python backend/bench_suite.py [--tailles 10k,1M,10M] [--etapes import,...] [--repetitions 3]
+                                     [--tolerance 0.2] [--base mysql|sqlite] [--reference]
+    --reference   enregistre les mesures comme nouvelle référence
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+from analysis import SalesAnalyzer
+from benchmark import BENCH_CONFIGS, BENCH_DB_CONFIG, reset_bench_database
+from config import BENCH_BASELINE_PATH, BENCH_DATA_DIR, BENCH_RESULTS_PATH, BENCH_TOLERANCE
+from database import DatabaseManager
+from export_pdf import PDFExporter
+from generateur_donnees import generate_sales_csv
+from import_csv import import_data
+
+DEFAULT_SIZES = ['10k', '1M', '10M']
+
+STAGES = ['import', 'import_variantes', 'load_data_from_db', 'generate_full_report',
+          'get_sales_data_for_dashboard', 'generate_sales_report_data']
+
+# Fichier "difficile" : encodage, délimiteur et format de date différents, lignes invalides
+VARIANT_OPTIONS = {'date_format': 'jj/mm/aaaa', 'delimiter': ';', 'encoding': 'cp1252', 'dirty_ratio': 0.01}
+
+# Écart absolu minimal pour parler de régression : en dessous, c'est du bruit de mesure
+MIN_REGRESSION_DELTA = 0.05
+
+# Fichiers du projet réécrits par les étapes mesurées, restaurés à la fin
+PROJECT_DIR = os.path.dirname(current_dir)
+WRITTEN_FILES = [os.path.join(PROJECT_DIR, 'rapport_ventes.json')]
+
+def parse_size(text):
+    """'10k' -> 10000, '1M' -> 1000000, '5000' -> 5000"""
+    multipliers = {'k': 1000, 'm': 1000000}
+    text = text.strip().lower()
+    if text and text[-1] in multipliers:
+        return int(float(text[:-1]) * multipliers[text[-1]])
+    return int(text)
+
+def format_size(rows):
+    if rows >= 1000000 and rows % 1000000 == 0:
+        return f"{rows // 1000000}M"
+    if rows >= 1000 and rows % 1000 == 0:
+        return f"{rows // 1000}k"
+    return str(rows)
+
+def dataset(rows, seed=42, **options):
+    """
+    Chemin d'un fichier généré avec ces paramètres, créé au premier appel
+
+    Le générateur étant déterministe, le fichier est réutilisé tel quel par les
+    exécutions suivantes.
+    """
+    os.makedirs(BENCH_DATA_DIR, exist_ok=True)
+    suffix = ''.join(f"_{key}-{value}" for key, value in sorted(options.items()))
+    suffix = suffix.replace('/', '').replace(';', 'pv')
+    path = os.path.join(BENCH_DATA_DIR, f"ventes_{format_size(rows)}_{seed}{suffix}.csv")
+    if not os.path.exists(path):
+        start = time.perf_counter()
+        generate_sales_csv(path + '.tmp', rows, seed=seed, **options)
+        os.replace(path + '.tmp', path)
+        print(f"[suite] {os.path.basename(path)} généré en {time.perf_counter() - start:.1f} s")
+    return path
+
+@contextmanager
+def preserved_files(paths):
+    """Restaure à la sortie le contenu des fichiers (et supprime ceux qui n'existaient pas)"""
+    saved = {}
+    for path in paths:
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                saved[path] = f.read()
+    try:
+        yield
+    finally:
+        for path in paths:
+            if path in saved:
+                with open(path, 'wb') as f:
+                    f.write(saved[path])
+            elif os.path.exists(path):
+                os.remove(path)
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def measure(stage, rows, func, repeat=1, setup=None):
+    """
+    Exécute func repeat fois et renvoie la mesure de l'étape (meilleur temps)
+
+    Args:
+        setup (callable, optional): Appelé avant chaque exécution, hors chronométrage
+    """
+    durations = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        result = func()
+        durations.append(time.perf_counter() - start)
+        if result is None:
+            print(f"[suite] {stage}: l'étape a échoué")
+            return None
+    best = min(durations)
+    print(f"[suite] {stage} ({format_size(rows)} lignes): {best:.3f} s")
+    return {'etape': stage, 'lignes': rows, 'duree': best, 'durees': durations,
+            'lignes_par_seconde': rows / best if best > 0 else None}
+
+def run_size(rows, stages, repeat, db_config=BENCH_DB_CONFIG):
+    """Mesure les étapes demandées sur rows lignes"""
+    results = []
+    reset = lambda: reset_bench_database(db_config)
+
+    if 'import_variantes' in stages:
+        variant = dataset(rows, **VARIANT_OPTIONS)
+        results.append(measure('import_variantes', rows, lambda: import_data(
+            variant, resume=False, db_config=db_config), setup=reset))
+
+    # L'import propre est toujours exécuté : les étapes suivantes lisent ses données
+    clean = dataset(rows)
+    imported = measure('import', rows, lambda: import_data(clean, resume=False, db_config=db_config),
+                       setup=reset)
+    if imported is None:
+        return [result for result in results if result]
+    if 'import' in stages:
+        results.append(imported)
+
+    analyzer = SalesAnalyzer(db_manager=DatabaseManager(db_config))
+    exporter = PDFExporter(db_manager=analyzer.db)
+    one_year = {'start': '2023-01-01', 'end': '2023-12-31'}
+    readers = {
+        'load_data_from_db': analyzer.load_data_from_db,
+        'generate_full_report': lambda: analyzer.generate_full_report('json'),
+        'get_sales_data_for_dashboard': analyzer.db.get_sales_data_for_dashboard,
+        'generate_sales_report_data': lambda: exporter.generate_sales_report_data(date_range=one_year)
+    }
+    try:
+        for stage, func in readers.items():
+            if stage in stages:
+                # Cache vidé avant chaque répétition : on mesure le calcul, pas le cache
+                results.append(measure(stage, rows, func, repeat, setup=analyzer.cache.clear))
+    finally:
+        analyzer.db.disconnect()
+    return [result for result in results if result]
+
+def load_baseline(path=BENCH_BASELINE_PATH):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Référence illisible ({path}): {e}")
+        return {}
+
+def baseline_key(result):
+    return f"{result['base']}:{result['etape']}@{result['lignes']}"
+
+def save_baseline(results, path=BENCH_BASELINE_PATH):
+    """Fusionne les mesures dans la référence (les autres entrées sont conservées)"""
+    baseline = load_baseline(path)
+    for result in results:
+        baseline[baseline_key(result)] = {'duree': round(result['duree'], 6),
+                                          'commit': result.get('commit'),
+                                          'machine': result.get('machine')}
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, ensure_ascii=False, indent=2, sort_keys=True)
+    print(f"Référence enregistrée dans {path} ({len(results)} mesures)")
+
+def append_results(results, path=BENCH_RESULTS_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        for result in results:
+            f.write(json.dumps(result, ensure_ascii=False) + '\n')
+
+def compare(results, baseline, tolerance=BENCH_TOLERANCE):
+    """
+    Compare les mesures à la référence et affiche le tableau des écarts
+
+    Returns:
+        list: Mesures en régression
+    """
+    regressions = []
+    print(f"\n=== Résultats (tolérance {tolerance:.0%}) ===")
+    for result in results:
+        reference = baseline.get(baseline_key(result))
+        label = f"{result['etape']} ({format_size(result['lignes'])})"
+        if reference is None:
+            print(f"{label:>44}: {result['duree']:9.3f} s   (pas de référence)")
+            continue
+        ratio = result['duree'] / reference['duree'] if reference['duree'] > 0 else float('inf')
+        regression = (ratio > 1 + tolerance
+                      and result['duree'] - reference['duree'] > MIN_REGRESSION_DELTA)
+        flag = "  RÉGRESSION" if regression else ""
+        print(f"{label:>44}: {result['duree']:9.3f} s   référence {reference['duree']:9.3f} s   "
+              f"x{ratio:.2f}{flag}")
+        if regression:
+            regressions.append(result)
+    return regressions
+
+def run_suite(sizes, stages=STAGES, repeat=3, tolerance=BENCH_TOLERANCE, update_baseline=False,
+              base=BENCH_DB_CONFIG.get('backend', 'mysql')):
+    """
+    Exécute la suite, enregistre les mesures et les compare à la référence
+
+    Returns:
+        tuple: (mesures, régressions)
+    """
+    context = {'horodatage': time.strftime('%Y-%m-%dT%H:%M:%S'), 'commit': git_commit(),
+               'machine': platform.node(), 'python': platform.python_version(),
+               'cpu': os.cpu_count(), 'base': base}
+    results = []
+    with preserved_files(WRITTEN_FILES):
+        for rows in sizes:
+            results.extend(dict(context, **result)
+                           for result in run_size(rows, stages, repeat, BENCH_CONFIGS[base]))
+
+    append_results(results)
+    regressions = compare(results, load_baseline(), tolerance)
+    if update_baseline:
+        save_baseline(results)
+    return results, regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Suite de mesures de la chaîne de traitement des ventes")
+    parser.add_argument('--tailles', default=','.join(DEFAULT_SIZES),
+                        help="Nombres de lignes séparés par des virgules (10k, 1M...)")
+    parser.add_argument('--etapes', default=','.join(STAGES), help="Étapes à mesurer")
+    parser.add_argument('--repetitions', type=int, default=3, help="Répétitions des étapes de lecture")
+    parser.add_argument('--tolerance', type=float, default=BENCH_TOLERANCE,
+                        help="Écart relatif toléré par rapport à la référence")
+    parser.add_argument('--base', choices=sorted(BENCH_CONFIGS), default=BENCH_DB_CONFIG.get('backend', 'mysql'),
+                        help="Moteur de base de données mesuré")
+    parser.add_argument('--reference', action='store_true', help="Enregistrer les mesures comme référence")
+    args = parser.parse_args()
+
+    stages = [stage.strip() for stage in args.etapes.split(',') if stage.strip()]
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        parser.error(f"étapes inconnues: {', '.join(unknown)} (possibles: {', '.join(STAGES)})")
+
+    _, regressions = run_suite([parse_size(size) for size in args.tailles.split(',')], stages,
+                               args.repetitions, args.tolerance, args.reference, args.base)
+    if regressions and not args.reference:
+        print(f"{len(regressions)} régression(s) détectée(s).")
+        sys.exit(1)
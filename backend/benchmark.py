@@ -0,0 +1,857 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Mesures de performance sur des données générées au format de donnees_ventes.csv
+
+Les mesures utilisent une base dédiée (ventes_db_bench sous MySQL,
+bench_data/ventes_bench.sqlite avec VENTES_BASE=sqlite) pour ne jamais toucher
+aux données réelles. Le mode etoile remplit en plus une seconde base au schéma
+en étoile (ventes_db_bench_etoile, bench_data/ventes_bench_etoile.sqlite) ; le mode
+plans échoue si EXPLAIN montre un parcours complet pour une requête bornée par des dates.
+
+Usage: python backend/benchmark.py [nombre_de_lignes] [dates|parallele|dashboard|export|cube|csv|chargement|rapport|pdf|lot|moteurs|doublons|centimes|validation|etoile|plans]
+"""
+
+import csv
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+from backends import DatabaseError, connect, get_backend
+from config import BENCH_DATA_DIR, DB_CONFIG, MYSQL_CONFIG
+from cube import SalesCube
+from analysis import SalesAnalyzer
+from database import DatabaseManager, build_dashboard_facets
+from dimensions import DIMENSIONS, key_columns, uses_star_schema
+from export_pdf import PDFExporter
+from fingerprints import IMPORTED_FILES_TABLE
+from generateur_donnees import generate_sales_csv
+from date_parser import DateParser, format_date
+from import_csv import import_data, import_files, create_tables_if_not_exist, inspect_csv, parse_row
+from money import AMOUNT_CENTS_SQL
+from rollups import ROLLUP_TABLE
+from validation import MAX_PRICE_CENTS, MAX_QUANTITY, REJECT_SUFFIX, BatchValidator
+
+BENCH_CONFIGS = {
+    'mysql': dict(MYSQL_CONFIG, database='ventes_db_bench'),
+    'sqlite': {'backend': 'sqlite', 'database': os.path.join(BENCH_DATA_DIR, 'ventes_bench.sqlite')}
+}
+BENCH_DB_CONFIG = BENCH_CONFIGS[DB_CONFIG.get('backend', 'mysql')]
+BENCH_STAR_CONFIGS = {
+    'mysql': dict(MYSQL_CONFIG, database='ventes_db_bench_etoile'),
+    'sqlite': {'backend': 'sqlite', 'database': os.path.join(BENCH_DATA_DIR, 'ventes_bench_etoile.sqlite')}
+}
+BENCH_STAR_DB_CONFIG = BENCH_STAR_CONFIGS[DB_CONFIG.get('backend', 'mysql')]
+
+def generate_csv(path, rows, stores=5, products=10, seed=42, start=datetime(2022, 1, 1), days=3 * 365):
+    """Génère un CSV de ventes synthétiques (mêmes colonnes et formats que donnees_ventes.csv)"""
+    generate_sales_csv(path, rows, stores=stores, products=products, start=start.strftime('%Y-%m-%d'),
+                       days=days, seed=seed)
+    return path
+
+def reset_bench_database(db_config=None, star=False):
+    """
+    Crée la base de mesure si besoin et vide la table ventes, ses cumuls et les fichiers importés
+
+    star ne s'applique qu'à la création de ventes (une base existante garde son schéma) ;
+    les tables de dimension éventuelles sont vidées aussi.
+    """
+    db_config = db_config or BENCH_DB_CONFIG
+    backend = get_backend(db_config)
+    if backend.name == 'sqlite':
+        os.makedirs(os.path.dirname(db_config['database']), exist_ok=True)
+        conn = connect(db_config)
+        cursor = conn.cursor()
+    else:
+        server_config = {k: v for k, v in db_config.items() if k != 'database'}
+        conn = connect(server_config)
+        cursor = conn.cursor()
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {db_config['database']}")
+        cursor.execute(f"USE {db_config['database']}")
+    create_tables_if_not_exist(cursor, star)
+    tables = ['ventes', ROLLUP_TABLE, IMPORTED_FILES_TABLE]
+    tables += [table for table in DIMENSIONS.values() if backend.table_exists(cursor, table)]
+    for table in tables:
+        for statement in backend.truncate_sql(table):
+            cursor.execute(statement)
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+def timed(label, func, *args, **kwargs):
+    """Exécute func et affiche sa durée"""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    print(f"[bench] {label}: {elapsed:.2f} s")
+    return result, elapsed
+
+def bench_import(csv_file, rows):
+    """Compare l'import ligne par ligne et l'import par lots"""
+    results = {}
+    for label, options in [('ligne par ligne', {'row_by_row': True}),
+                           ('par lots', {'resume': False})]:
+        reset_bench_database()
+        summary, elapsed = timed(f"import {label}", import_data, csv_file,
+                                 db_config=BENCH_DB_CONFIG, **options)
+        imported = summary['importees'] if summary else 0
+        results[label] = imported / elapsed if elapsed > 0 else 0.0
+
+    print(f"\n=== Import de {rows} lignes ===")
+    for label, rate in results.items():
+        print(f"{label:>16}: {rate:,.0f} lignes/s")
+    return results
+
+def bench_parallel_import(tmp_dir, rows, files=8):
+    """Débit de import_files selon le nombre de processus de lecture"""
+    paths = [generate_csv(os.path.join(tmp_dir, f'magasin_{i}.csv'), rows // files, seed=i)
+             for i in range(files)]
+
+    results = {}
+    workers = 1
+    while workers <= (os.cpu_count() or 1):
+        reset_bench_database()
+        _, elapsed = timed(f"import parallèle ({workers} processus)", import_files, paths,
+                           workers=workers, db_config=BENCH_DB_CONFIG)
+        results[workers] = rows / elapsed if elapsed > 0 else 0.0
+        workers *= 2
+
+    print(f"\n=== Import parallèle de {files} fichiers ({rows} lignes) ===")
+    for workers, rate in results.items():
+        print(f"{workers:>3} processus: {rate:,.0f} lignes/s (x{rate / results[1]:.1f})")
+    return results
+
+def fill_bench_database(tmp_dir, rows, files=8, db_config=None, star=False):
+    """Remplit la base de mesure avec rows lignes générées (import parallèle)"""
+    db_config = db_config or BENCH_DB_CONFIG
+    reset_bench_database(db_config, star)
+    paths = [generate_csv(os.path.join(tmp_dir, f'remplissage_{i}.csv'), rows // files, seed=100 + i)
+             for i in range(files)]
+    _, elapsed = timed(f"remplissage de la base ({rows} lignes)", import_files, paths, db_config=db_config)
+    for path in paths:
+        os.remove(path)
+    return elapsed
+
+def bench_dedup(tmp_dir, rows):
+    """
+    Coût de l'import idempotent : premier import avec et sans empreintes, réimport
+    du même contenu (toutes les lignes écartées comme doublons) et fichier déjà connu
+    """
+    csv_file = generate_csv(os.path.join(tmp_dir, 'ventes_doublons.csv'), rows)
+    results = {}
+    for label, idempotent in [('sans empreintes', False), ('avec empreintes', True)]:
+        reset_bench_database()
+        summary, elapsed = timed(f"premier import ({label})", import_data, csv_file, resume=False,
+                                 db_config=BENCH_DB_CONFIG, idempotent=idempotent)
+        results[label] = (elapsed, summary['importees'] if summary else 0, 0)
+
+    # Base remplie par l'import avec empreintes : on relit tout le fichier ligne à ligne
+    summary, elapsed = timed("réimport des mêmes lignes", import_data, csv_file, resume=False,
+                             db_config=BENCH_DB_CONFIG, idempotent=True, skip_known_files=False)
+    results['réimport'] = (elapsed, summary['importees'] if summary else 0,
+                           summary['doublons'] if summary else 0)
+    summary, elapsed = timed("réimport du fichier connu", import_data, csv_file, resume=False,
+                             db_config=BENCH_DB_CONFIG, idempotent=True)
+    results['fichier connu'] = (elapsed, summary['importees'] if summary else 0, 0)
+
+    reference = results['sans empreintes'][0]
+    print(f"\n=== Import idempotent de {rows} lignes ===")
+    for label, (elapsed, imported, duplicates) in results.items():
+        print(f"{label:>16}: {elapsed:8.2f} s, {imported:,} importées, {duplicates:,} doublons "
+              f"(x{elapsed / reference:.2f})")
+    return results
+
+def bench_dashboard(repeat=3):
+    """Compare get_sales_data_for_dashboard en un parcours et en cinq requêtes"""
+    db = DatabaseManager(BENCH_DB_CONFIG)
+    db.connect()
+
+    results = {}
+    for label, single_pass in [('cinq requêtes', False), ('un seul parcours', True)]:
+        durations = []
+        for _ in range(repeat):
+            _, elapsed = timed(f"tableau de bord ({label})", db.get_sales_data_for_dashboard,
+                               single_pass=single_pass)
+            durations.append(elapsed)
+        results[label] = min(durations)
+    db.disconnect()
+
+    print("\n=== get_sales_data_for_dashboard (meilleur temps) ===")
+    for label, elapsed in results.items():
+        print(f"{label:>16}: {elapsed:.2f} s")
+    return results
+
+def bench_dashboard_export(tmp_dir, rows):
+    """
+    Export du tableau de bord après l'import d'une journée sur un historique de trois ans :
+    export complet face à l'export incrémental
+    """
+    analyzer = SalesAnalyzer(db_manager=DatabaseManager(BENCH_DB_CONFIG))
+    state_path = os.path.join(tmp_dir, 'dashboard_state.json')
+    js_dir = os.path.join(os.path.dirname(current_dir), 'frontend', 'js')
+    # L'export écrit dans frontend/js : on restaure les fichiers existants à la fin
+    saved = {}
+    for name in ('dashboard_data.js', 'dashboard_delta.json'):
+        path = os.path.join(js_dir, name)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                saved[path] = f.read()
+
+    try:
+        analyzer.export_data_for_dashboard(incremental=True, state_path=state_path)
+
+        day_rows = max(1, rows // (3 * 365))
+        day_file = generate_csv(os.path.join(tmp_dir, 'journee.csv'), day_rows, seed=7,
+                                start=datetime(2025, 1, 1), days=1)
+        import_data(day_file, resume=False, db_config=BENCH_DB_CONFIG)
+
+        results = {}
+        for label, incremental in [('complet', False), ('incrémental', True)]:
+            # L'export complet repart de zéro : il réécrit aussi l'état, on le sauvegarde
+            with open(state_path, 'rb') as f:
+                state = f.read()
+            _, elapsed = timed(f"export du tableau de bord ({label})", analyzer.export_data_for_dashboard,
+                               incremental=incremental, compress=True, state_path=state_path)
+            data_size = os.path.getsize(os.path.join(js_dir, 'dashboard_data.js'))
+            gz_size = os.path.getsize(os.path.join(js_dir, 'dashboard_data.js.gz'))
+            delta_path = os.path.join(js_dir, 'dashboard_delta.json')
+            delta_size = os.path.getsize(delta_path) if os.path.exists(delta_path) else 0
+            results[label] = (elapsed, data_size, gz_size, delta_size)
+            if not incremental:
+                with open(state_path, 'wb') as f:
+                    f.write(state)
+    finally:
+        for name in ('dashboard_data.js.gz', 'dashboard_delta.json', 'dashboard_delta.json.gz'):
+            path = os.path.join(js_dir, name)
+            if os.path.exists(path) and path not in saved:
+                os.remove(path)
+        for path, content in saved.items():
+            with open(path, 'wb') as f:
+                f.write(content)
+        analyzer.db.disconnect()
+
+    print(f"\n=== Export du tableau de bord après une journée ({day_rows} lignes) sur trois ans ===")
+    for label, (elapsed, data_size, gz_size, delta_size) in results.items():
+        print(f"{label:>12}: {elapsed * 1000:,.0f} ms, dashboard_data.js {data_size:,} octets "
+              f"({gz_size:,} compressé), delta {delta_size:,} octets")
+    return results
+
+def bench_cube(repeat=5):
+    """Latence des requêtes du cube en mémoire face aux requêtes SQL équivalentes"""
+    db = DatabaseManager(BENCH_DB_CONFIG)
+    db.connect()
+    cube = SalesCube()
+    _, build_time = timed("construction du cube", cube.refresh, db)
+
+    one_year = {'start': '2023-01-01', 'end': '2023-12-31'}
+    two_stores = ['Magasin_1', 'Magasin_2']
+    cases = [
+        ("total", {}, lambda: db.get_sales_summary(None)),
+        ("par magasin", {'by': ('magasin',)}, lambda: db.get_sales_summary('magasin')),
+        ("par mois, un an", dict(by=('mois',), **one_year),
+         lambda: db.get_sales_summary('mois', order_by='periode', **one_year)),
+        ("top 3 produits en quantité", {'by': ('produit',), 'top': 3, 'measure': 'quantite'},
+         lambda: db.get_sales_summary('produit', limit=3, order_by='quantite_totale')),
+        ("magasin × mois, 2 magasins, un an", dict(by=('magasin', 'mois'), stores=two_stores, **one_year),
+         lambda: db.get_monthly_rollup(stores=two_stores, **one_year)),
+        ("magasin × produit × jour", {'by': ('magasin', 'produit', 'jour')},
+         lambda: db.fetch_all("SELECT date, {0}, {1}, SUM(quantite) AS quantite_totale "
+                              "FROM ventes GROUP BY date, {0}, {1}".format(*key_columns(db.is_star_schema()))))
+    ]
+
+    results = {}
+    for label, cube_args, sql_query in cases:
+        cube_time = min(timed(f"cube: {label}", cube.query, **cube_args)[1] for _ in range(repeat))
+        sql_time = min(timed(f"SQL: {label}", sql_query)[1] for _ in range(repeat))
+        results[label] = (cube_time, sql_time)
+    db.disconnect()
+
+    stats = cube.get_stats()
+    print(f"\n=== Cube {stats['magasins']} magasins × {stats['produits']} produits × {stats['jours']} jours "
+          f"({stats['octets'] / 1024 ** 2:,.1f} Mo, construit en {build_time:.2f} s), meilleur temps ===")
+    for label, (cube_time, sql_time) in results.items():
+        print(f"{label:>36}: cube {cube_time * 1000:8.2f} ms, SQL {sql_time * 1000:9.2f} ms "
+              f"(x{sql_time / cube_time:,.0f})")
+    return results
+
+def bench_backends(tmp_dir, rows, repeat=3):
+    """
+    Requêtes du tableau de bord sur chaque moteur (MySQL, SQLite embarqué) remplis
+    avec les mêmes données ; un moteur indisponible est ignoré
+    """
+    one_year = {'start': '2023-01-01', 'end': '2023-12-31'}
+    two_stores = ['Magasin_1', 'Magasin_2']
+    cases = [
+        ("tableau de bord (cumuls)", lambda db, raw: db.get_sales_data_for_dashboard()),
+        ("tableau de bord (cinq requêtes)", lambda db, raw: db.get_sales_data_for_dashboard(single_pass=False)),
+        ("ventes par magasin (table brute)", lambda db, raw: raw.get_sales_summary('magasin')),
+        ("magasin × produit × mois, brut", lambda db, raw: raw.get_monthly_rollup()),
+        ("2 magasins, un an, par mois", lambda db, raw: db.get_monthly_rollup(stores=two_stores, **one_year)),
+        ("load_data_from_db", lambda db, raw: SalesAnalyzer(db_manager=raw).load_data_from_db())
+    ]
+
+    results = {}
+    for name, db_config in BENCH_CONFIGS.items():
+        try:
+            import_time = fill_bench_database(tmp_dir, rows, db_config=db_config)
+        except DatabaseError as e:
+            print(f"[bench] moteur {name} indisponible: {e}")
+            continue
+        db = DatabaseManager(db_config)
+        raw = DatabaseManager(db_config, use_rollups=False)
+        db.connect()
+        raw.connect()
+        results[name] = {'import': import_time}
+        for label, query in cases:
+            results[name][label] = min(timed(f"{name}: {label}", query, db, raw)[1] for _ in range(repeat))
+        db.disconnect()
+        raw.disconnect()
+
+    print(f"\n=== Moteurs de base de données ({rows} lignes, meilleur temps) ===")
+    names = list(results)
+    print(f"{'':>36}" + ''.join(f"{name:>12}" for name in names))
+    for label in ['import'] + [label for label, _ in cases]:
+        print(f"{label:>36}" + ''.join(f"{results[name][label]:>11.3f}s" for name in names))
+    return results
+
+def storage_size(db, table):
+    """Octets occupés par une table : (données, index)"""
+    if db.config.get('backend') == 'sqlite':
+        rows = db.fetch_all("""
+        SELECT m.type AS type, SUM(s.pgsize) AS octets
+        FROM sqlite_master m JOIN dbstat s ON s.name = m.name
+        WHERE m.tbl_name = %s
+        GROUP BY m.type
+        """, (table,))
+        sizes = {row['type']: int(row['octets']) for row in rows}
+        return sizes.get('table', 0), sizes.get('index', 0)
+    row = db.fetch_one("""
+    SELECT data_length AS donnees, index_length AS index_octets
+    FROM information_schema.tables
+    WHERE table_schema = DATABASE() AND table_name = %s
+    """, (table,))
+    return (int(row['donnees']), int(row['index_octets'])) if row else (0, 0)
+
+def _canonical(value):
+    """Forme comparable d'un résultat, indépendante de l'ordre des lignes à égalité"""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _canonical(item)) for key, item in value.items()))
+    if isinstance(value, list):
+        return tuple(sorted((_canonical(item) for item in value), key=repr))
+    return value
+
+def bench_star_schema(tmp_dir, rows, repeat=3):
+    """
+    Schéma à noms face au schéma en étoile (dimensions.py), remplis avec les mêmes
+    données : taille de ventes et des cumuls, import, requêtes du tableau de bord
+    et identité des résultats
+    """
+    one_year = {'start': '2023-01-01', 'end': '2023-12-31'}
+    two_stores = ['Magasin_1', 'Magasin_2']
+    cases = [
+        ("tableau de bord (cumuls)", lambda db, raw: db.get_sales_data_for_dashboard()),
+        ("ventes par magasin (brut)", lambda db, raw: raw.get_sales_summary('magasin')),
+        ("ventes par produit (brut)", lambda db, raw: raw.get_sales_by_product()),
+        ("magasin × produit × mois, brut", lambda db, raw: raw.get_monthly_rollup()),
+        ("2 magasins, un an, brut", lambda db, raw: raw.get_monthly_rollup(stores=two_stores, **one_year)),
+        ("load_data_from_db", lambda db, raw: SalesAnalyzer(db_manager=raw).load_data_from_db()
+         .groupby('Magasin', observed=True)['montant_centimes'].sum().to_dict())
+    ]
+
+    results, outputs = {}, {}
+    for name, db_config, star in [('noms', BENCH_DB_CONFIG, False), ('étoile', BENCH_STAR_DB_CONFIG, True)]:
+        import_time = fill_bench_database(tmp_dir, rows, db_config=db_config, star=star)
+        db = DatabaseManager(db_config)
+        raw = DatabaseManager(db_config, use_rollups=False)
+        db.connect()
+        raw.connect()
+        results[name] = {'import': import_time}
+        for table in ('ventes', ROLLUP_TABLE):
+            results[name][table] = storage_size(raw, table)
+        outputs[name] = {}
+        for label, query in cases:
+            outputs[name][label] = _canonical(query(db, raw))
+            results[name][label] = min(timed(f"{name}: {label}", query, db, raw)[1] for _ in range(repeat))
+        db.disconnect()
+        raw.disconnect()
+
+    names, star = results['noms'], results['étoile']
+    print(f"\n=== Schéma à noms / schéma en étoile ({rows} lignes) ===")
+    for table in ('ventes', ROLLUP_TABLE):
+        for part, index in (('données', 0), ('index', 1)):
+            before, after = names[table][index], star[table][index]
+            print(f"{table + ' ' + part:>36}: {before / 1024 ** 2:9.1f} Mo -> {after / 1024 ** 2:9.1f} Mo "
+                  f"({(after - before) / max(before, 1):+.0%})")
+    print(f"{'import':>36}: {names['import']:9.2f} s  -> {star['import']:9.2f} s")
+    for label, _ in cases:
+        same = "identique" if outputs['noms'][label] == outputs['étoile'][label] else "DIFFÉRENT"
+        print(f"{label:>36}: {names[label] * 1000:9.1f} ms -> {star[label] * 1000:9.1f} ms "
+              f"(x{names[label] / max(star[label], 1e-9):.2f}), résultat {same}")
+    return all(outputs['noms'][label] == outputs['étoile'][label] for label, _ in cases)
+
+class RecordingDatabaseManager(DatabaseManager):
+    """DatabaseManager qui garde chaque requête exécutée et ses paramètres (pour EXPLAIN)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.queries = []
+
+    def fetch_all(self, query, params=None):
+        self.queries.append((query, list(params or ())))
+        return super().fetch_all(query, params)
+
+    def iter_chunks(self, query, params=None, chunk_size=50000):
+        self.queries.append((query, list(params or ())))
+        return super().iter_chunks(query, params, chunk_size)
+
+def bench_query_plans(db_config=None):
+    """
+    Vérifie avec EXPLAIN qu'aucune requête bornée par des dates (DatabaseManager,
+    PDFExporter, requête de rapport_mensuel) ne parcourt ventes ou les cumuls en entier
+
+    Returns:
+        bool: True si aucun parcours complet n'est trouvé
+    """
+    db_config = db_config or BENCH_DB_CONFIG
+    one_year = {'start': '2023-01-01', 'end': '2023-12-31'}
+    two_stores = ['Magasin_1', 'Magasin_2']
+    cases = [
+        ("total, un an", lambda db: db.get_sales_summary(None, **one_year)),
+        ("par magasin, un an", lambda db: db.get_sales_summary('magasin', **one_year)),
+        ("par produit, un an", lambda db: db.get_sales_summary('produit', **one_year)),
+        ("par mois, un an", lambda db: db.get_sales_summary('mois', order_by='periode', **one_year)),
+        ("par magasin, depuis un mois", lambda db: db.get_sales_summary('magasin', start='2024-12-01')),
+        ("par produit, jusqu'à un mois", lambda db: db.get_sales_summary('produit', end='2022-01-31')),
+        ("par jour, 2 magasins, un an", lambda db: db.get_sales_summary('jour', stores=two_stores, **one_year)),
+        ("par magasin, un produit, un an",
+         lambda db: db.get_sales_summary('magasin', products=['Produit_1'], **one_year)),
+        ("magasin × produit × mois, un an", lambda db: db.get_monthly_rollup(**one_year)),
+        ("2 magasins, un an, par mois", lambda db: db.get_monthly_rollup(stores=two_stores, **one_year)),
+        ("rapport PDF (sql)", lambda db: PDFExporter(db_manager=db).generate_sales_report_data(
+            one_year, ['Magasin_2'])),
+        ("rapport PDF (stream)", lambda db: PDFExporter(db_manager=db).generate_sales_report_data(
+            one_year, ['Magasin_2'], mode='stream')),
+        ("lot de rapports mensuels", lambda db: PDFExporter(db_manager=db).generate_sales_reports_data(
+            store_report_specs(12)))
+    ]
+    conn = connect(db_config)
+    cursor = conn.cursor()
+    backend = get_backend(db_config)
+    store, _ = key_columns(uses_star_schema(cursor))
+    monthly_report = (f"""
+    SELECT {store}, SUM(quantite) AS quantite_totale, SUM({AMOUNT_CENTS_SQL}) AS total_centimes,
+           COUNT(DISTINCT date) AS jours_actifs
+    FROM ventes
+    WHERE date >= %s AND date < %s
+    GROUP BY {store}
+    """, ['2023-03-01', '2023-04-01'])
+
+    checked = [("rapport_mensuel (requête de la procédure)",) + monthly_report]
+    for use_rollups in (True, False):
+        source = 'cumuls' if use_rollups else 'table brute'
+        for label, run in cases:
+            db = RecordingDatabaseManager(db_config, use_rollups=use_rollups)
+            db.connect()
+            run(db)
+            db.disconnect()
+            checked.extend((f"{label} ({source})", query, params) for query, params in db.queries
+                           if 'date >=' in query or 'date <=' in query)
+
+    failures = 0
+    print(f"\n=== Plans d'exécution des requêtes bornées par des dates ({backend.name}) ===")
+    for label, query, params in checked:
+        scans = backend.full_scans(cursor, query, params, ('ventes', ROLLUP_TABLE))
+        failures += bool(scans)
+        print(f"{label:>48}: {'PARCOURS COMPLET ' + '; '.join(scans) if scans else 'ok'}")
+    partitions = backend.list_partitions(cursor, 'ventes')
+    if partitions:
+        print(f"{len(partitions)} partitions mensuelles ({partitions[0]} ... {partitions[-1]})")
+    cursor.close()
+    conn.close()
+    print(f"{len(checked) - failures}/{len(checked)} requêtes sans parcours complet")
+    return failures == 0
+
+def measure_peak(label, func, *args, **kwargs):
+    """Exécute func en mesurant sa durée et son pic de mémoire (tracemalloc)"""
+    tracemalloc.start()
+    result, elapsed = timed(label, func, *args, **kwargs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+def _csv_analysis_case(case, csv_file):
+    """Exécute un cas de bench_csv_analysis ; renvoie (durée, pic de mémoire résidente en octets)"""
+    import resource
+    import pandas as pd
+
+    analyzer = SalesAnalyzer(db_manager=DatabaseManager(BENCH_DB_CONFIG))
+    start = time.perf_counter()
+    if case == 'read_csv':
+        df = pd.read_csv(csv_file, encoding='utf-8')
+        df['montant'] = df['Quantité vendue'] * df['Prix unitaire']
+        df.groupby('Magasin')['montant'].sum()
+    elif case == 'load':
+        df = analyzer.load_data_from_csv(csv_file)
+        analyzer.sales_by_store(df)
+    else:
+        df = analyzer.aggregate_csv(csv_file)
+        analyzer.sales_by_store(df)
+    elapsed = time.perf_counter() - start
+    return elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def bench_csv_analysis(tmp_dir, rows):
+    """Temps et mémoire de l'analyse directe d'un CSV : lecture complète face à l'agrégation par paquets"""
+    from concurrent.futures import ProcessPoolExecutor
+
+    csv_file = os.path.join(tmp_dir, 'ventes_analyse.csv')
+    timed(f"génération de {rows} lignes", generate_csv, csv_file, rows)
+    size = os.path.getsize(csv_file)
+
+    results = {}
+    for label, case in [('pd.read_csv par défaut', 'read_csv'),
+                        ('load_data_from_csv', 'load'),
+                        ('aggregate_csv (paquets)', 'aggregate')]:
+        # Un processus neuf par cas : le pic de mémoire résidente n'est pas faussé par le précédent
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            results[label] = executor.submit(_csv_analysis_case, case, csv_file).result()
+        print(f"[bench] {label}: {results[label][0]:.2f} s")
+
+    print(f"\n=== Analyse d'un CSV de {rows} lignes ({size / 1024 ** 2:,.0f} Mo) ===")
+    for label, (elapsed, peak) in results.items():
+        print(f"{label:>24}: {elapsed:.2f} s, {rows / elapsed:,.0f} lignes/s, "
+              f"pic mémoire {peak / 1024 ** 2:,.0f} Mo")
+    return results
+
+def bench_load_from_db():
+    """Compare le chargement par dictionnaires et le chargement en colonnes"""
+    db = DatabaseManager(BENCH_DB_CONFIG)
+    db.connect()
+    analyzer = SalesAnalyzer(db_manager=db)
+
+    results = {}
+    for label, columnar in [('dictionnaires', False), ('colonnes', True)]:
+        df, elapsed, peak = measure_peak(f"load_data_from_db ({label})",
+                                         analyzer.load_data_from_db, columnar=columnar)
+        results[label] = (elapsed, peak, len(df) if df is not None else 0)
+        del df
+    db.disconnect()
+
+    print("\n=== load_data_from_db ===")
+    for label, (elapsed, peak, rows) in results.items():
+        print(f"{label:>14}: {rows} lignes, {elapsed:.2f} s, pic mémoire {peak / 1024 ** 2:,.0f} Mo")
+    return results
+
+def bench_money(repeat=5):
+    """
+    Montants en centimes entiers : chaque chemin d'agrégation (SQL brut, cumuls, DataFrame,
+    cube, rapport PDF, tableau de bord) doit retrouver au centime près la somme entière
+    calculée par la base ; comparaison avec l'ancienne somme en float64
+    """
+    import numpy as np
+    import pandas as pd
+
+    db = DatabaseManager(BENCH_DB_CONFIG)
+    db.connect()
+    raw = DatabaseManager(BENCH_DB_CONFIG, use_rollups=False)
+    raw.connect()
+    analyzer = SalesAnalyzer(db_manager=db)
+
+    exact = int(raw.fetch_one(f"SELECT SUM({AMOUNT_CENTS_SQL}) AS total FROM ventes")['total'])
+    df = analyzer.load_data_from_db()
+    cube = SalesCube()
+    cube.refresh(db)
+    exporter = PDFExporter(db_manager=db)
+
+    totals = {
+        'SQL, table ventes': raw.get_total_sales(),
+        'SQL, cumuls journaliers': db.get_total_sales(),
+        'DataFrame (int64)': analyzer.calculate_total_sales(df),
+        'cube': cube.query()[0]['total_ventes'],
+        'rapport PDF (sql)': exporter.generate_sales_report_data(mode='sql')['total_sales'],
+        'rapport PDF (stream)': exporter.generate_sales_report_data(mode='stream')['total_sales'],
+        'tableau de bord': build_dashboard_facets(db.get_monthly_rollup())['total_sales']
+    }
+    by_store = {row['magasin']: row['total_ventes'] for row in raw.get_sales_by_store()}
+    stores_match = all(by_store[row['magasin']] == row['total_ventes'] for row in analyzer.sales_by_store(df))
+
+    # Ancien chemin : montants en euros float64 (prix / 100 puis produit), sommés par NumPy
+    # (somme par paires) et dans l'ordre des lignes (cumul séquentiel, comme un SUM en DOUBLE)
+    quantities = df['quantite'].to_numpy()
+    float_amounts = quantities * (df['prix_centimes'].to_numpy() / 100.0)
+    cents = df['montant_centimes'].to_numpy()
+    float_sums = {'float64, somme NumPy': float(float_amounts.sum()),
+                  'float64, somme séquentielle': float(np.cumsum(float_amounts)[-1])}
+
+    float_time = min(timed("somme float64", float_amounts.sum)[1] for _ in range(repeat))
+    int_time = min(timed("somme int64", cents.sum)[1] for _ in range(repeat))
+    groups = df['Magasin']
+    float_group_time = min(timed("par magasin float64", pd.Series(float_amounts).groupby(groups).sum)[1]
+                           for _ in range(repeat))
+    int_group_time = min(timed("par magasin int64", df['montant_centimes'].groupby(groups).sum)[1]
+                         for _ in range(repeat))
+    raw.disconnect()
+    db.disconnect()
+
+    print(f"\n=== Montants exacts sur {len(df):,} lignes : total de référence {exact / 100:,.2f} € "
+          f"({exact} centimes, SUM entier en base) ===")
+    all_exact = stores_match
+    for label, total in totals.items():
+        ok = total is not None and round(total * 100) == exact and total == exact / 100
+        all_exact &= ok
+        print(f"{label:>28}: {total!r:>22} {'exact' if ok else 'ÉCART'}")
+    print(f"{'ventes par magasin':>28}: {'identiques au SQL' if stores_match else 'ÉCART'}")
+    for label, total in float_sums.items():
+        print(f"{label:>28}: {total!r:>22} (écart {total * 100 - exact:+.4f} centime, "
+              f"{'affichage exact' if total == exact / 100 else 'bruit visible'})")
+    print(f"{'somme totale':>28}: int64 {int_time * 1000:.2f} ms, float64 {float_time * 1000:.2f} ms")
+    print(f"{'somme par magasin':>28}: int64 {int_group_time * 1000:.2f} ms, "
+          f"float64 {float_group_time * 1000:.2f} ms")
+    print(f"Tous les chemins sont exacts : {'oui' if all_exact else 'NON'}")
+    return all_exact
+
+def _check_row_by_row(rows, today):
+    """Règles du trigger verif_ventes_before_insert appliquées ligne à ligne, comme en base"""
+    clean, refused = [], 0
+    for row in rows:
+        date, magasin, produit, quantite, prix = row[:5]
+        if (quantite <= 0 or prix <= 0 or date > today or quantite > MAX_QUANTITY
+                or prix > MAX_PRICE_CENTS or not magasin or not produit):
+            refused += 1
+        else:
+            clean.append(row)
+    return clean, refused
+
+def bench_validation(tmp_dir, rows, dirty_ratio=0.01, batch_size=5000):
+    """
+    Validation par lots (validation.py) face au contrôle ligne à ligne du trigger, sur un
+    CSV comportant une proportion dirty_ratio de lignes invalides ; puis coût de la
+    validation dans import_data
+    """
+    csv_file = os.path.join(tmp_dir, 'ventes_invalides.csv')
+    generated = generate_sales_csv(csv_file, rows, dirty_ratio=dirty_ratio)
+    layout = inspect_csv(csv_file)
+    with open(csv_file, 'r', encoding=layout['encoding'], newline='') as f:
+        reader = csv.reader(f, delimiter=layout['delimiter'])
+        next(reader)
+        parsed = []
+        for values in reader:
+            try:
+                parsed.append(parse_row(dict(zip(layout['field_names'], values)), layout['field_mapping'],
+                                        layout['date_parser']))
+            except (ValueError, KeyError):
+                pass
+    batches = [parsed[i:i + batch_size] for i in range(0, len(parsed), batch_size)]
+
+    today = datetime.now().strftime('%Y-%m-%d')
+    _, scalar_time = timed("contrôle ligne à ligne", lambda: [_check_row_by_row(b, today) for b in batches])
+    rules_only = BatchValidator(outlier_factor=None)
+    _, rules_time = timed("lots NumPy (règles du trigger)", lambda: [rules_only.split(b) for b in batches])
+    validator = BatchValidator()
+    _, batch_time = timed("lots NumPy (+ prix aberrants)", lambda: [validator.split(b) for b in batches])
+
+    results = {}
+    for label, validate in [('sans validation', False), ('avec validation', True)]:
+        reset_bench_database()
+        summary, elapsed = timed(f"import {label}", import_data, csv_file, db_config=BENCH_DB_CONFIG,
+                                 resume=False, validate=validate)
+        results[label] = (summary['importees'] if summary else 0, elapsed)
+    if os.path.exists(csv_file + REJECT_SUFFIX):
+        os.remove(csv_file + REJECT_SUFFIX)
+
+    count = len(parsed)
+    print(f"\n=== Validation de {count:,} lignes lisibles ({generated['invalides']:,} lignes invalides "
+          f"injectées sur {rows:,}, lots de {batch_size}) ===")
+    print(f"{'ligne à ligne':>30}: {count / scalar_time:,.0f} lignes/s")
+    print(f"{'lots NumPy (règles du trigger)':>30}: {count / rules_time:,.0f} lignes/s "
+          f"(x{scalar_time / rules_time:.1f})")
+    print(f"{'lots NumPy (+ prix aberrants)':>30}: {count / batch_time:,.0f} lignes/s")
+    print("Motifs: " + ', '.join(f"{reason} ({n})" for reason, n in validator.reasons.most_common()))
+    for label, (imported, elapsed) in results.items():
+        print(f"{'import ' + label:>30}: {imported:,} lignes, {imported / elapsed:,.0f} lignes/s")
+    return results
+
+def bench_pdf_report():
+    """Compare les modes 'sql' et 'stream' de generate_sales_report_data sur un an, tous magasins"""
+    exporter = PDFExporter(db_manager=DatabaseManager(BENCH_DB_CONFIG))
+    date_range = {'start': '2023-01-01', 'end': '2023-12-31'}
+    stores = [f"Magasin_{i}" for i in range(1, 6)]
+
+    results = {}
+    for mode in ['stream', 'sql']:
+        _, elapsed, peak = measure_peak(f"rapport PDF ({mode})", exporter.generate_sales_report_data,
+                                        date_range=date_range, store_filter=stores, mode=mode)
+        results[mode] = (elapsed, peak)
+    exporter.db.disconnect()
+
+    print("\n=== generate_sales_report_data (un an, 5 magasins) ===")
+    for mode, (elapsed, peak) in results.items():
+        print(f"{mode:>7}: {elapsed:.2f} s, pic mémoire {peak / 1024 ** 2:,.1f} Mo")
+    return results
+
+def store_report_specs(count, stores=5):
+    """count rapports filtrés par magasin et par mois (cycle sur les magasins et 2022-2024)"""
+    specs = []
+    for i in range(count):
+        year, month = 2022 + (i // stores // 12) % 3, (i // stores) % 12 + 1
+        last_day = (datetime(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)).day
+        specs.append({
+            'filename': f'rapport_{i:03d}.pdf',
+            'title': f"Magasin_{i % stores + 1} - {year}-{month:02d}",
+            'date_range': {'start': f'{year}-{month:02d}-01', 'end': f'{year}-{month:02d}-{last_day}'},
+            'store_filter': [f"Magasin_{i % stores + 1}"]
+        })
+    return specs
+
+def bench_report_batch(count=200, repeat=3):
+    """
+    count rapports filtrés par magasin et par mois : appels individuels face au lot
+    en un parcours, depuis les cumuls journaliers ('sql') et depuis la table ventes ('stream')
+    """
+    exporter = PDFExporter(db_manager=DatabaseManager(BENCH_DB_CONFIG))
+    specs = store_report_specs(count)
+    strip = lambda reports: [{k: v for k, v in report.items() if k != 'date_generated'} for report in reports]
+
+    results = {}
+    for mode in ['sql', 'stream']:
+        def individual():
+            return [exporter.generate_sales_report_data(date_range=spec['date_range'],
+                                                        store_filter=spec['store_filter'], mode=mode)
+                    for spec in specs]
+
+        outputs = {}
+        for label, func in [('appels individuels', individual),
+                            ('lot', lambda: exporter.generate_sales_reports_data(specs, mode=mode))]:
+            durations = []
+            for _ in range(repeat):
+                outputs[label], elapsed = timed(f"{count} rapports ({mode}, {label})", func)
+                durations.append(elapsed)
+            results[(mode, label)] = min(durations)
+        results[(mode, 'identiques')] = strip(outputs['appels individuels']) == strip(outputs['lot'])
+    exporter.db.disconnect()
+
+    print(f"\n=== Données de {count} rapports par magasin et par mois (meilleur temps) ===")
+    for mode in ['sql', 'stream']:
+        single, batch = results[(mode, 'appels individuels')], results[(mode, 'lot')]
+        print(f"{mode:>7}: appels individuels {single:.3f} s, lot {batch:.3f} s (x{single / batch:.1f}, "
+              f"résultats {'identiques' if results[(mode, 'identiques')] else 'DIFFÉRENTS'})")
+    return results
+
+def bench_pdf_render(tmp_dir, count=100):
+    """Débit du rendu PDF côté serveur (rapports/minute) pour count rapports filtrés par magasin"""
+    exporter = PDFExporter(db_manager=DatabaseManager(BENCH_DB_CONFIG))
+    specs = store_report_specs(count)
+
+    results = {}
+    for workers in sorted({1, os.cpu_count() or 1}):
+        statuses, elapsed = timed(f"{count} rapports PDF ({workers} processus)", exporter.export_pdfs,
+                                  specs, os.path.join(tmp_dir, f'pdf_{workers}'), workers=workers)
+        ok = sum(1 for status in statuses if status['status'] == 'success')
+        results[workers] = ok / elapsed * 60 if elapsed > 0 else 0.0
+    exporter.db.disconnect()
+
+    print(f"\n=== Rendu de {count} rapports PDF ===")
+    for workers, rate in results.items():
+        print(f"{workers:>3} processus: {rate:,.0f} rapports/minute")
+    return results
+
+def bench_date_parsing(rows):
+    """Coût par ligne de la cascade format_date face au DateParser compilé"""
+    start = datetime(2022, 1, 1)
+    span = timedelta(days=3 * 365).total_seconds()
+    values = [(start + timedelta(seconds=span * i / rows)).strftime('%Y-%m-%d %H:%M:%S.%f') + '000'
+              for i in range(rows)]
+
+    _, cascade_time = timed("format_date (cascade)", lambda: [format_date(v) for v in values])
+    parser = DateParser(values[:1000])
+    parsed, parser_time = timed(f"DateParser ({parser.format_name})", parser.parse_many, values)
+
+    print(f"\n=== Lecture de {rows} dates ===")
+    print(f"   cascade: {cascade_time / rows * 1e6:.2f} µs/ligne")
+    print(f"DateParser: {parser_time / rows * 1e6:.2f} µs/ligne "
+          f"(x{cascade_time / parser_time:.1f}, {parser.stats})")
+    return parsed
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    if len(sys.argv) > 2 and sys.argv[2] == 'dates':
+        bench_date_parsing(rows)
+        sys.exit(0)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if len(sys.argv) > 2 and sys.argv[2] == 'parallele':
+            bench_parallel_import(tmp_dir, rows)
+            sys.exit(0)
+
+        if len(sys.argv) > 2 and sys.argv[2] == 'chargement':
+            fill_bench_database(tmp_dir, rows)
+            bench_load_from_db()
+            sys.exit(0)
+
+        if len(sys.argv) > 2 and sys.argv[2] == 'rapport':
+            fill_bench_database(tmp_dir, rows)
+            bench_pdf_report()
+            sys.exit(0)
+
+        if len(sys.argv) > 2 and sys.argv[2] == 'pdf':
+            fill_bench_database(tmp_dir, rows)
+            bench_pdf_render(tmp_dir)
+            sys.exit(0)
+
+        if len(sys.argv) > 2 and sys.argv[2] == 'lot':
+            fill_bench_database(tmp_dir, rows)
+            bench_report_batch()
+            sys.exit(0)
+
+        if len(sys.argv) > 2 and sys.argv[2] == 'dashboard':
+            fill_bench_database(tmp_dir, rows)
+            bench_dashboard()
+            sys.exit(0)
+
+        if len(sys.argv) > 2 and sys.argv[2] == 'csv':
+            bench_csv_analysis(tmp_dir, rows)
+            sys.exit(0)
+
+        if len(sys.argv) > 2 and sys.argv[2] == 'cube':
+            fill_bench_database(tmp_dir, rows)
+            bench_cube()
+            sys.exit(0)
+
+        if len(sys.argv) > 2 and sys.argv[2] == 'moteurs':
+            bench_backends(tmp_dir, rows)
+            sys.exit(0)
+
+        if len(sys.argv) > 2 and sys.argv[2] == 'doublons':
+            bench_dedup(tmp_dir, rows)
+            sys.exit(0)
+
+        if len(sys.argv) > 2 and sys.argv[2] == 'centimes':
+            fill_bench_database(tmp_dir, rows)
+            sys.exit(0 if bench_money() else 1)
+
+        if len(sys.argv) > 2 and sys.argv[2] == 'plans':
+            fill_bench_database(tmp_dir, rows)
+            sys.exit(0 if bench_query_plans() else 1)
+
+        if len(sys.argv) > 2 and sys.argv[2] == 'etoile':
+            sys.exit(0 if bench_star_schema(tmp_dir, rows) else 1)
+
+        if len(sys.argv) > 2 and sys.argv[2] == 'validation':
+            bench_validation(tmp_dir, rows)
+            sys.exit(0)
+
+        if len(sys.argv) > 2 and sys.argv[2] == 'export':
+            fill_bench_database(tmp_dir, rows)
+            bench_dashboard_export(tmp_dir, rows)
+            sys.exit(0)
+
+        csv_file = os.path.join(tmp_dir, 'ventes_bench.csv')
+        timed(f"génération de {rows} lignes", generate_csv, csv_file, rows)
+        bench_import(csv_file, rows)
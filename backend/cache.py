@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Cache de résultats pour les agrégations de SalesAnalyzer
+
+Les entrées sont indexées par (méthode, paramètres, version des données) : dès
+qu'un import ajoute des lignes, la version change et les anciennes entrées ne
+sont plus jamais servies (elles finissent évincées par la politique LRU).
+"""
+
+import copy
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+class ResultCache:
+    """Cache LRU avec durée de vie, éventuellement sauvegardé sur disque"""
+
+    def __init__(self, max_entries=256, ttl=3600, path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+        if path:
+            self.load()
+
+    def get(self, key):
+        """Renvoie (True, valeur) si la clé est présente et valide, (False, None) sinon"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return False, None
+
+            stored_at, value = entry
+            if self.ttl is not None and time.time() - stored_at > self.ttl:
+                del self._entries[key]
+                self.stats['expirations'] += 1
+                self.stats['misses'] += 1
+                return False, None
+
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+        # Copie : l'appelant peut modifier le résultat sans altérer le cache
+        return True, copy.deepcopy(value)
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.time(), copy.deepcopy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def get_or_compute(self, key, compute):
+        hit, value = self.get(key)
+        if hit:
+            return value
+        value = compute()
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['entrees'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['taux_succes'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+    def save(self):
+        """Écrit les entrées sur disque pour un redémarrage à chaud"""
+        if not self.path:
+            return False
+        with self._lock:
+            entries = list(self._entries.items())
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(entries, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+            return True
+        except (OSError, pickle.PicklingError) as e:
+            print(f"Erreur lors de l'enregistrement du cache: {e}")
+            return False
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, 'rb') as f:
+                entries = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            print(f"Cache sur disque illisible, ignoré: {e}")
+            return False
+
+        now = time.time()
+        with self._lock:
+            for key, (stored_at, value) in entries[-self.max_entries:]:
+                if self.ttl is None or now - stored_at <= self.ttl:
+                    self._entries[key] = (stored_at, value)
+        return True
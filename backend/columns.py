@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Représentation en colonnes NumPy de la table ventes
+
+La table est lue en entiers uniquement (jours depuis 1970, prix en centimes) et
+les magasins/produits sont codés en entiers ; ce module fait la conversion vers
+le DataFrame utilisé par SalesAnalyzer. Les montants du DataFrame restent en
+centimes int64 (prix_centimes, montant_centimes) : les sommes NumPy sont exactes
+et la conversion en euros n'a lieu que sur les agrégats (voir money.py).
+En schéma en étoile (voir dimensions.py), la table fournit déjà des identifiants
+entiers : seuls les identifiants distincts de chaque paquet sont traduits en noms.
+"""
+
+import numpy as np
+import pandas as pd
+
+from money import PRICE_CENTS_SQL
+
+COLUMNAR_SELECT = f"""
+SELECT DATEDIFF(date, '1970-01-01') AS jour, magasin, produit, quantite,
+       {PRICE_CENTS_SQL} AS prix_centimes
+FROM ventes
+"""
+
+COLUMNAR_STAR_SELECT = COLUMNAR_SELECT.replace('magasin, produit', 'magasin_id, produit_id')
+
+COLUMN_DTYPES = {
+    'jour': np.int32,
+    'magasin': np.int32,
+    'produit': np.int32,
+    'quantite': np.int32,
+    'prix_centimes': np.int64
+}
+
+# Colonnes stockées nécessaires à chaque colonne du DataFrame
+FRAME_DEPENDENCIES = {
+    'Date': ['jour'],
+    'Magasin': ['magasin'],
+    'Produit': ['produit'],
+    'quantite': ['quantite'],
+    'prix_centimes': ['prix_centimes'],
+    'montant_centimes': ['quantite', 'prix_centimes'],
+    # Montants en euros (float), produits seulement sur demande
+    'prix_unitaire': ['prix_centimes'],
+    'montant': ['quantite', 'prix_centimes']
+}
+
+# Colonnes du DataFrame produites par défaut
+FRAME_COLUMNS = ['Date', 'Magasin', 'Produit', 'quantite', 'prix_centimes', 'montant_centimes']
+
+def columnar_select(db):
+    """
+    Requête de lecture en colonnes et cache des dimensions (None hors schéma en étoile)
+
+    Le cache est rechargé ici : à appeler après avoir fixé l'identifiant maximal à
+    lire, pour que tous les magasins et produits de ces lignes y soient connus.
+    """
+    dimensions = db.dimensions
+    if dimensions is None:
+        return COLUMNAR_SELECT, None
+    dimensions.refresh()
+    return COLUMNAR_STAR_SELECT, dimensions
+
+def _encode(values, codes, count, names=None):
+    if names is None:
+        return np.fromiter((codes.setdefault(v, len(codes)) for v in values), dtype=np.int32, count=count)
+    # Identifiants de dimension : une traduction par identifiant distinct du paquet
+    ids, inverse = np.unique(np.fromiter(values, dtype=np.int64, count=count), return_inverse=True)
+    lookup = np.fromiter((codes.setdefault(names[i], len(codes)) for i in ids.tolist()),
+                         dtype=np.int32, count=len(ids))
+    return lookup[inverse]
+
+def decode_chunk(rows, store_codes, product_codes, dimensions=None):
+    """
+    Transpose un paquet de tuples en colonnes NumPy (magasins et produits codés)
+
+    Avec dimensions (schéma en étoile), magasin et produit sont des identifiants,
+    codés selon leur nom pour que les codes restent ceux du schéma à noms.
+    """
+    days, stores, products, quantities, cents = zip(*rows)
+    count = len(rows)
+    return {
+        'jour': np.fromiter(days, dtype=np.int32, count=count),
+        'magasin': _encode(stores, store_codes, count, dimensions and dimensions.names['magasin']),
+        'produit': _encode(products, product_codes, count, dimensions and dimensions.names['produit']),
+        'quantite': np.fromiter(quantities, dtype=np.int32, count=count),
+        'prix_centimes': np.fromiter(cents, dtype=np.int64, count=count)
+    }
+
+def stored_columns_for(frame_columns):
+    """Colonnes stockées à lire pour produire les colonnes demandées du DataFrame"""
+    needed = []
+    for column in frame_columns:
+        for stored in FRAME_DEPENDENCIES[column]:
+            if stored not in needed:
+                needed.append(stored)
+    return needed
+
+def build_frame(columns, store_names, product_names, frame_columns=None):
+    """
+    Construit le DataFrame (mêmes colonnes que l'ancien chargement par dictionnaires)
+
+    Args:
+        columns (dict): Colonnes NumPy stockées (jour, magasin, produit, quantite, prix_centimes)
+        store_names (list): Noms des magasins, indexés par code
+        product_names (list): Noms des produits, indexés par code
+        frame_columns (list, optional): Colonnes du DataFrame à produire (FRAME_COLUMNS par défaut)
+    """
+    frame_columns = frame_columns or FRAME_COLUMNS
+    data = {}
+    for column in frame_columns:
+        if column == 'Date':
+            data['Date'] = columns['jour'].astype('datetime64[D]').astype('datetime64[ns]')
+        elif column == 'Magasin':
+            data['Magasin'] = pd.Categorical.from_codes(columns['magasin'], categories=list(store_names))
+        elif column == 'Produit':
+            data['Produit'] = pd.Categorical.from_codes(columns['produit'], categories=list(product_names))
+        elif column == 'quantite':
+            data['quantite'] = columns['quantite']
+        elif column == 'prix_centimes':
+            data['prix_centimes'] = columns['prix_centimes']
+        elif column == 'montant_centimes':
+            data['montant_centimes'] = columns['quantite'].astype(np.int64) * columns['prix_centimes']
+        elif column == 'prix_unitaire':
+            data['prix_unitaire'] = columns['prix_centimes'] / 100.0
+        elif column == 'montant':
+            data['montant'] = columns['quantite'] * (columns['prix_centimes'] / 100.0)
+    return pd.DataFrame(data)
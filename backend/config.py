@@ -2,12 +2,109 @@
 Contient les paramètres de connexion à la base de données et autres configurations
 """
 
-DB_CONFIG = {
+import os
+
+MYSQL_CONFIG = {
     'host': 'localhost',
     'user': 'root',        
     'password': '',        
     'database': 'ventes_db'
 }
 
+# Base embarquée (voir backends.py) : VENTES_BASE=sqlite pour travailler sur un fichier
+# local, sans serveur MySQL (postes d'analyse, intégration continue)
+SQLITE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'base_de_donnee', 'ventes.sqlite')
+SQLITE_CONFIG = {'backend': 'sqlite', 'database': SQLITE_PATH}
+
+DB_CONFIG = SQLITE_CONFIG if os.environ.get('VENTES_BASE') == 'sqlite' else MYSQL_CONFIG
+
 CSV_FILE_PATH = 'donnees_ventes.csv'
-DATE_FORMAT = '%Y-%m-%d'
\ No newline at end of file
+DATE_FORMAT = '%Y-%m-%d'
+
+# Importation par lots : nombre de lignes envoyées et validées par transaction
+IMPORT_BATCH_SIZE = 5000
+
+# Import parallèle de plusieurs fichiers : taille des plages lues par processus
+# et nombre de connexions d'écriture simultanées
+IMPORT_CHUNK_BYTES = 16 * 1024 * 1024
+IMPORT_WRITERS = 2
+
+# Import idempotent : réimporter un fichier (ou une partie) n'ajoute aucune ligne en double
+# (empreinte par ligne et par fichier, voir fingerprints.py)
+IMPORT_IDEMPOTENT = True
+
+# Validation des lots avant insertion (voir validation.py) : les lignes refusées vont dans
+# un fichier de rejets ; un prix plus de VALIDATION_OUTLIER_FACTOR fois au-dessus ou en
+# dessous du prix médian du produit est considéré comme aberrant (0 pour ne pas contrôler)
+IMPORT_VALIDATION = True
+VALIDATION_OUTLIER_FACTOR = 10.0
+
+# Schéma en étoile (voir dimensions.py) : à la création de la table ventes, magasins et
+# produits y sont stockés par identifiant entier (tables de dimension magasins / produits)
+# plutôt que par nom ; une base existante garde son schéma
+STAR_SCHEMA = False
+
+# Partitionnement mensuel de ventes sous MySQL (voir partitions.py), à la création de la
+# table : une partition par mois depuis PARTITION_FIRST_MONTH, et PARTITION_MONTHS_AHEAD
+# mois d'avance créés automatiquement à chaque import
+PARTITION_VENTES = True
+PARTITION_FIRST_MONTH = '2020-01'
+PARTITION_MONTHS_AHEAD = 3
+
+# Pool de connexions partagé (DatabaseManager(pool=...))
+POOL_SIZE = 5                 # connexions ouvertes au maximum
+POOL_IDLE_TIMEOUT = 300       # secondes avant fermeture d'une connexion inutilisée
+POOL_HEALTH_CHECK = 30        # secondes d'inactivité au-delà desquelles on vérifie la connexion
+POOL_CHECKOUT_TIMEOUT = 10    # secondes d'attente maximale d'une connexion libre
+
+# Répondre aux agrégations depuis la table de cumuls journaliers (voir rollups.py)
+USE_ROLLUPS = True
+
+# Cache des agrégations de SalesAnalyzer (voir cache.py)
+CACHE_MAX_ENTRIES = 256
+CACHE_TTL = 3600              # secondes ; None pour ne jamais expirer
+CACHE_PATH = None             # fichier de sauvegarde du cache, None pour rester en mémoire
+
+# Nombre de lignes lues par paquet lors du chargement de la table ventes
+DB_CHUNK_SIZE = 50000
+
+# Rafraîchissements incrémentaux (voir watermark.py) : un id absent plus de
+# WATERMARK_WINDOW ids sous le dernier id lu n'est plus attendu
+WATERMARK_WINDOW = 100000
+
+# Nombre de lignes lues par paquet lors de l'analyse directe d'un CSV
+CSV_CHUNK_SIZE = 1000000
+
+# Copie locale de la table ventes en colonnes, partitionnée par mois (voir snapshot.py)
+SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'snapshots')
+
+# Serveur HTTP (backend/api.py)
+API_HOST = '127.0.0.1'
+API_PORT = 5000
+API_PAGE_SIZE = 100           # lignes par page par défaut
+API_MAX_PAGE_SIZE = 1000
+
+# Service d'ingestion (voir ingestion.py) : dossier de dépôt surveillé, fichiers en attente
+# d'import au maximum, secondes entre deux parcours du dossier et entre deux régénérations
+# des rapports, fichier des mesures au format Prometheus
+INGESTION_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'depot')
+INGESTION_QUEUE_SIZE = 16
+INGESTION_POLL_INTERVAL = 2.0
+INGESTION_REPORT_INTERVAL = 60.0
+INGESTION_METRICS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'mesures', 'ingestion.prom')
+
+# État de l'export incrémental du tableau de bord (voir dashboard_export.py)
+DASHBOARD_STATE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dashboard_state.json')
+
+# Instrumentation (voir instrumentation.py) : VENTES_INSTRUMENTATION=1 pour mesurer,
+# VENTES_PROFIL=cprofile ou echantillons pour profiler les scripts
+INSTRUMENTATION = os.environ.get('VENTES_INSTRUMENTATION', '') not in ('', '0')
+PROFILE_MODE = os.environ.get('VENTES_PROFIL') or None
+INSTRUMENTATION_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'mesures')
+
+# Suite de mesures (voir bench_suite.py) : fichiers générés, historique des résultats,
+# référence de comparaison et écart toléré avant de signaler une régression
+BENCH_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'bench_data')
+BENCH_RESULTS_PATH = os.path.join(INSTRUMENTATION_DIR, 'benchmarks.jsonl')
+BENCH_BASELINE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks', 'reference.json')
+BENCH_TOLERANCE = 0.20
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Cube de ventes en mémoire : magasin × produit × jour
+
+Trois tableaux NumPy denses (quantités, montants en centimes, nombre de
+transactions) sont indexés par les codes de magasin et de produit et par le
+numéro de jour. Une requête ne fait que découper ces tableaux et les sommer :
+toute combinaison de dimensions, toute fenêtre de dates et les top-N se
+calculent en quelques millisecondes sans interroger la base.
+
+Le cube est construit depuis la table ventes puis tenu à jour par refresh(), qui
+ne lit que les lignes pas encore chargées (voir watermark.py). L'empreinte mémoire est
+de 16 octets par cellule (magasins × produits × jours) : adapté à quelques
+centaines de magasins et de produits sur quelques années.
+
+Usage: python backend/cube.py [dimension ...]    (ex. magasin mois)
+"""
+
+import os
+import sys
+import threading
+
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+from columns import columnar_select, decode_chunk
+from config import DB_CHUNK_SIZE
+from watermark import Watermark, id_condition
+
+DIMENSIONS = ('magasin', 'produit', 'jour', 'mois', 'annee')
+TIME_UNITS = {'jour': 'D', 'mois': 'M', 'annee': 'Y'}
+MEASURES = {'montant': 'total_ventes', 'quantite': 'quantite_totale', 'transactions': 'nb_transactions'}
+
+# Marge allouée d'avance sur l'axe des jours : un import quotidien ne réalloue pas le cube
+DAY_SLACK = 31
+
+class SalesCube:
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.stores = {}       # nom -> code
+        self.products = {}
+        self.first_day = None  # jour (depuis 1970) de l'indice 0 de l'axe des jours
+        self.days = 0          # nombre de jours utilisés sur cet axe
+        self.watermark = Watermark()
+        self.quantities = np.zeros((0, 0, 0), dtype=np.int32)
+        self.cents = np.zeros((0, 0, 0), dtype=np.int64)
+        self.counts = np.zeros((0, 0, 0), dtype=np.int32)
+
+    def refresh(self, db, chunk_size=DB_CHUNK_SIZE):
+        """
+        Ajoute au cube les lignes de ventes insérées depuis le dernier chargement
+
+        Returns:
+            int: Nombre de lignes ajoutées
+        """
+        version = db.get_data_version()
+        with self._lock:
+            if version < self.watermark.max_id:
+                # Table vidée ou recréée : on repart de zéro
+                self._reset()
+            if self.watermark.is_current(version):
+                return 0
+
+            added = 0
+            intervals, watermark = self.watermark.plan(db, version)
+            if intervals:
+                select, dimensions = columnar_select(db)
+                condition, params = id_condition(intervals)
+                for rows in db.iter_chunks(select + f"WHERE {condition}", params, chunk_size):
+                    self._add(decode_chunk(rows, self.stores, self.products, dimensions))
+                    added += len(rows)
+            self.watermark = watermark
+        return added
+
+    def is_current(self, version):
+        """True si le cube contient toutes les lignes jusqu'à version (get_data_version)"""
+        with self._lock:
+            return self.watermark.is_current(version)
+
+    def _grow(self, first_day, last_day):
+        """Agrandit les tableaux pour couvrir les codes connus et les jours [first_day, last_day]"""
+        stores, products, capacity = self.cents.shape
+        if self.first_day is not None:
+            first_day = min(first_day, self.first_day)
+            last_day = max(last_day, self.first_day + self.days - 1)
+            offset = self.first_day - first_day
+        else:
+            offset = 0
+        days = last_day - first_day + 1
+
+        fits = (offset == 0 and days <= capacity
+                and len(self.stores) <= stores and len(self.products) <= products)
+        if not fits:
+            shape = (max(len(self.stores), stores), max(len(self.products), products),
+                     max(days + DAY_SLACK, capacity))
+            for name in ('quantities', 'cents', 'counts'):
+                old = getattr(self, name)
+                new = np.zeros(shape, dtype=old.dtype)
+                new[:stores, :products, offset:offset + capacity] = old
+                setattr(self, name, new)
+        self.first_day = first_day
+        self.days = days
+
+    def _add(self, chunk):
+        days = chunk['jour']
+        self._grow(int(days.min()), int(days.max()))
+        index = (chunk['magasin'], chunk['produit'], days - self.first_day)
+        np.add.at(self.quantities, index, chunk['quantite'])
+        np.add.at(self.cents, index, chunk['quantite'].astype(np.int64) * chunk['prix_centimes'])
+        np.add.at(self.counts, index, 1)
+
+    def _codes(self, codes, names):
+        """Codes à conserver sur un axe (tous si names est vide)"""
+        if not names:
+            return slice(0, len(codes))
+        return np.array([codes[name] for name in names if name in codes], dtype=np.intp)
+
+    def query(self, by=(), start=None, end=None, stores=None, products=None, top=None, measure='montant'):
+        """
+        Agrège le cube selon une combinaison de dimensions
+
+        Args:
+            by (tuple): Dimensions conservées parmi magasin, produit et au plus une de
+                        jour, mois, annee ; () pour le total
+            start, end (str, optional): Bornes de dates incluses (AAAA-MM-JJ)
+            stores, products (list, optional): Magasins / produits à inclure
+            top (int, optional): Ne garder que les top lignes selon measure
+            measure (str): 'montant', 'quantite' ou 'transactions' (tri du top-N)
+
+        Returns:
+            list: Lignes {dimensions..., quantite_totale, total_ventes, nb_transactions}
+                  (periode pour la dimension temporelle)
+        """
+        unknown = [dim for dim in by if dim not in DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Dimensions inconnues: {unknown}")
+        time_dims = [dim for dim in by if dim in TIME_UNITS]
+        if len(time_dims) > 1:
+            raise ValueError("Une seule dimension temporelle par requête (jour, mois ou annee)")
+        if measure not in MEASURES:
+            raise ValueError(f"Mesure inconnue: {measure}")
+
+        with self._lock:
+            return self._query(by, start, end, stores, products, top, measure, time_dims)
+
+    def _query(self, by, start, end, stores, products, top, measure, time_dims):
+        if self.first_day is None:
+            return []
+        first = 0
+        last = self.days
+        if start:
+            first = max(first, int(np.datetime64(start, 'D').astype(np.int64)) - self.first_day)
+        if end:
+            last = min(last, int(np.datetime64(end, 'D').astype(np.int64)) - self.first_day + 1)
+        if last <= first:
+            return []
+
+        store_index = self._codes(self.stores, stores)
+        product_index = self._codes(self.products, products)
+        store_names = np.array(list(self.stores), dtype=object)[store_index]
+        product_names = np.array(list(self.products), dtype=object)[product_index]
+        if not len(store_names) or not len(product_names):
+            return []
+
+        blocks = []
+        for values in (self.quantities, self.cents, self.counts):
+            # Les filtres par liste passent par une indexation avancée (copie), les autres sont des vues
+            block = values[store_index][:, product_index] if stores or products else values
+            blocks.append(block[:len(store_names), :len(product_names), first:last])
+        day_numbers = np.arange(self.first_day + first, self.first_day + last)
+
+        # Réduction des axes non demandés
+        if 'magasin' not in by:
+            blocks = [block.sum(axis=0, keepdims=True) for block in blocks]
+        if 'produit' not in by:
+            blocks = [block.sum(axis=1, keepdims=True) for block in blocks]
+
+        if not time_dims:
+            blocks = [block.sum(axis=2, keepdims=True) for block in blocks]
+            periods = None
+        else:
+            labels = day_numbers.astype('datetime64[D]').astype(f'datetime64[{TIME_UNITS[time_dims[0]]}]')
+            if time_dims[0] != 'jour':
+                # Les jours sont triés : chaque période est un intervalle contigu de l'axe
+                bounds = np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]])
+                blocks = [np.add.reduceat(block, bounds, axis=2) for block in blocks]
+                labels = labels[bounds]
+            periods = labels.astype(str).tolist()
+
+        quantities, cents, counts = blocks
+        cells = np.nonzero(counts)
+        if top is not None:
+            ranking = {'montant': cents, 'quantite': quantities, 'transactions': counts}[measure][cells]
+            order = np.argsort(-ranking, kind='stable')[:top]
+            cells = tuple(axis[order] for axis in cells)
+
+        rows = []
+        for i, j, k in zip(*cells):
+            row = {}
+            if 'magasin' in by:
+                row['magasin'] = store_names[i]
+            if 'produit' in by:
+                row['produit'] = product_names[j]
+            if periods is not None:
+                row['periode'] = periods[k]
+            row['quantite_totale'] = int(quantities[i, j, k])
+            row['total_ventes'] = int(cents[i, j, k]) / 100
+            row['nb_transactions'] = int(counts[i, j, k])
+            rows.append(row)
+        return rows
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'magasins': len(self.stores),
+                'produits': len(self.products),
+                'jours': self.days,
+                'version': self.watermark.max_id,
+                'ids_attendus': sum(last - first + 1 for first, last in self.watermark.gaps),
+                'octets': self.quantities.nbytes + self.cents.nbytes + self.counts.nbytes
+            }
+
+if __name__ == "__main__":
+    from database import DatabaseManager
+
+    db = DatabaseManager()
+    if not db.connect():
+        sys.exit(1)
+    cube = SalesCube()
+    print(f"{cube.refresh(db)} lignes chargées dans le cube ({cube.get_stats()})")
+    for row in cube.query(by=tuple(sys.argv[1:]), top=20):
+        print(row)
+    db.disconnect()
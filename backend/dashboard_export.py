@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Export incrémental des données du tableau de bord
+
+L'état sauvegardé entre deux exports contient le repère des lignes de ventes
+déjà prises en compte (dernier id lu et ids encore attendus, voir watermark.py),
+un numéro de version et le cumul magasin × produit × mois en centimes (entiers,
+donc sans dérive d'arrondi au fil des fusions). Un nouvel export ne lit que les
+lignes non encore prises en compte, les ajoute au cumul et en redéduit les
+facettes avec build_dashboard_facets. La version augmente à chaque export qui
+ajoute des lignes : c'est le data_version des données et du delta.
+
+Fichiers écrits dans frontend/js :
+    dashboard_data.js      const dashboardData = {...}; JSON compact
+    dashboard_delta.json   lignes ajoutées depuis l'export précédent, applicables côté
+                           navigateur avec applyDashboardDelta (js/dashboard_delta.js)
+    *.gz                   copies précompressées (compress=True), servies telles quelles
+                           par un serveur configuré pour (gzip_static)
+
+Le suivi par id suppose que les lignes ne sont ni modifiées ni supprimées ;
+sinon, exporter avec incremental=False.
+"""
+
+import gzip
+import json
+import os
+
+from database import build_dashboard_facets
+from money import to_euros
+from watermark import Watermark
+
+DATA_FILE = 'dashboard_data.js'
+DELTA_FILE = 'dashboard_delta.json'
+
+COMPACT = {'ensure_ascii': False, 'separators': (',', ':')}
+
+def load_state(path):
+    """Renvoie l'état du dernier export {'repere', 'version', 'cumul'} ou None"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"État du tableau de bord illisible, export complet: {e}")
+        return None
+    state['cumul'] = {(m, p, periode): [q, c] for m, p, periode, q, c in state['cumul']}
+    state['repere'] = Watermark.from_state(state)
+    # Un état antérieur au suivi des trous avait pour version son dernier id
+    state.setdefault('version', state['repere'].max_id)
+    return state
+
+def save_state(path, watermark, version, cumul):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(dict(watermark.to_state(), version=version,
+                       cumul=[list(key) + values for key, values in sorted(cumul.items())]), f, **COMPACT)
+    os.replace(tmp_path, path)
+
+def merge_rollup(cumul, rows):
+    """Ajoute des lignes {magasin, produit, periode, quantite_totale, total_centimes} au cumul"""
+    for row in rows:
+        entry = cumul.setdefault((row['magasin'], row['produit'], row['periode']), [0, 0])
+        entry[0] += int(row['quantite_totale'] or 0)
+        entry[1] += int(row['total_centimes'] or 0)
+    return cumul
+
+def facets_from_cumul(cumul):
+    """Facettes du tableau de bord à partir du cumul en centimes (convertis en euros à la fin)"""
+    return build_dashboard_facets([
+        {'magasin': m, 'produit': p, 'periode': periode, 'quantite_totale': q, 'total_centimes': c}
+        for (m, p, periode), (q, c) in cumul.items()
+    ])
+
+def build_delta(since, version, rows):
+    return {
+        'depuis': since,
+        'version': version,
+        'lignes': [[row['magasin'], row['produit'], row['periode'], int(row['quantite_totale'] or 0),
+                    to_euros(row['total_centimes'] or 0)]
+                   for row in rows]
+    }
+
+def write_file(path, content, compress=False):
+    """Écrit content (str) de façon atomique, avec sa copie .gz si demandé"""
+    data = content.encode('utf-8')
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+    if compress:
+        with open(tmp_path, 'wb') as f:
+            # mtime=0 : même contenu, même fichier compressé (ETag stable)
+            f.write(gzip.compress(data, compresslevel=9, mtime=0))
+        os.replace(tmp_path, path + '.gz')
+    elif os.path.exists(path + '.gz'):
+        os.remove(path + '.gz')
+    return len(data)
+
+def remove_file(path):
+    for stale in (path, path + '.gz'):
+        if os.path.exists(stale):
+            os.remove(stale)
@@ -5,20 +5,226 @@
 Module qui gère toutes les interactions avec la base de données (requêtes, connexions)
 """
 
-import mysql.connector
-from mysql.connector import Error
-from config import DB_CONFIG
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from backends import DatabaseError as Error
+from backends import backend_of, connect
+from config import (DB_CONFIG, POOL_SIZE, POOL_IDLE_TIMEOUT, POOL_HEALTH_CHECK,
+                    POOL_CHECKOUT_TIMEOUT, USE_ROLLUPS, WATERMARK_WINDOW)
+from dimensions import DIMENSIONS, KEY_COLUMNS, DimensionCache, dimension_filter, key_columns
+from instrumentation import traced
+from money import AMOUNT_CENTS_SQL, rows_to_euros, to_euros
+from rollups import ROLLUP_TABLE
+from watermark import id_condition
+
+class PooledConnection:
+    """Connexion du pool, avec son curseur dictionnaire réutilisé d'un emprunt à l'autre"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.last_used = time.monotonic()
+        self._cursor = None
+
+    @property
+    def cursor(self):
+        if self._cursor is None:
+            # Curseur bufferisé : un résultat lu partiellement ne bloque pas la requête suivante
+            self._cursor = self.connection.cursor(dictionary=True, buffered=True)
+        return self._cursor
+
+    def close(self):
+        try:
+            if self._cursor is not None:
+                self._cursor.close()
+            self.connection.close()
+        except Error:
+            pass
+
+class ConnectionPool:
+    """
+    Pool de connexions partageable entre plusieurs DatabaseManager
+
+    Les connexions sont ouvertes à la demande jusqu'à size, vérifiées (ping) si elles
+    sont restées inactives plus de health_check secondes et fermées au-delà de
+    idle_timeout. L'emprunt se fait avec le gestionnaire de contexte connection().
+    """
+
+    def __init__(self, config=None, size=POOL_SIZE, idle_timeout=POOL_IDLE_TIMEOUT,
+                 health_check=POOL_HEALTH_CHECK, checkout_timeout=POOL_CHECKOUT_TIMEOUT):
+        self.config = config or DB_CONFIG
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.health_check = health_check
+        self.checkout_timeout = checkout_timeout
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._opened = 0
+        self.metrics = {
+            'checkouts': 0,
+            'attente_totale': 0.0,
+            'attente_max': 0.0,
+            'actives': 0,
+            'actives_max': 0,
+            'ouvertes': 0,
+            'fermees_inactives': 0,
+            'echecs_verification': 0,
+            'delais_depasses': 0
+        }
+
+    def _open(self):
+        connection = connect(self.config)
+        with self._lock:
+            self.metrics['ouvertes'] += 1
+        return PooledConnection(connection)
+
+    def _discard(self, pooled):
+        pooled.close()
+        with self._lock:
+            self._opened -= 1
+
+    def _is_usable(self, pooled):
+        idle = time.monotonic() - pooled.last_used
+        if idle > self.idle_timeout:
+            with self._lock:
+                self.metrics['fermees_inactives'] += 1
+            return False
+        if idle > self.health_check:
+            try:
+                pooled.connection.ping(reconnect=False)
+            except Error:
+                with self._lock:
+                    self.metrics['echecs_verification'] += 1
+                return False
+        return True
+
+    def acquire(self):
+        """Emprunte une connexion (lève queue.Empty si aucune ne se libère à temps)"""
+        start = time.perf_counter()
+        deadline = time.monotonic() + self.checkout_timeout
+
+        while True:
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                pooled = None
+
+            if pooled is None:
+                with self._lock:
+                    can_open = self._opened < self.size
+                    if can_open:
+                        self._opened += 1
+                if can_open:
+                    try:
+                        pooled = self._open()
+                    except Error:
+                        with self._lock:
+                            self._opened -= 1
+                        raise
+                else:
+                    remaining = deadline - time.monotonic()
+                    try:
+                        pooled = self._idle.get(timeout=max(remaining, 0))
+                    except queue.Empty:
+                        with self._lock:
+                            self.metrics['delais_depasses'] += 1
+                        raise
+
+            if not self._is_usable(pooled):
+                self._discard(pooled)
+                continue
+            break
+
+        waited = time.perf_counter() - start
+        with self._lock:
+            self.metrics['checkouts'] += 1
+            self.metrics['attente_totale'] += waited
+            self.metrics['attente_max'] = max(self.metrics['attente_max'], waited)
+            self.metrics['actives'] += 1
+            self.metrics['actives_max'] = max(self.metrics['actives_max'], self.metrics['actives'])
+        return pooled
+
+    def release(self, pooled, broken=False):
+        with self._lock:
+            self.metrics['actives'] -= 1
+        if broken:
+            self._discard(pooled)
+            return
+        pooled.last_used = time.monotonic()
+        self._idle.put(pooled)
+
+    @contextmanager
+    def connection(self):
+        """Emprunte une connexion le temps du bloc with, puis la rend au pool"""
+        pooled = self.acquire()
+        broken = False
+        try:
+            yield pooled
+        except Error:
+            broken = not pooled.connection.is_connected()
+            raise
+        finally:
+            self.release(pooled, broken=broken)
+
+    def get_metrics(self):
+        with self._lock:
+            metrics = dict(self.metrics)
+            metrics['ouvertes_actuellement'] = self._opened
+        metrics['inactives'] = self._idle.qsize()
+        metrics['attente_moyenne'] = (metrics['attente_totale'] / metrics['checkouts']
+                                      if metrics['checkouts'] else 0.0)
+        return metrics
+
+    def close_all(self):
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+def get_shared_pool(config=None):
+    """Renvoie le pool commun au processus (créé au premier appel)"""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = ConnectionPool(config)
+        return _shared_pool
 
 class DatabaseManager:
+    """
+    Accès à la base de ventes
+
+    Sans pool, le gestionnaire garde sa propre connexion et son curseur. Avec
+    pool=ConnectionPool(...) (ou get_shared_pool()), chaque requête emprunte une
+    connexion le temps de son exécution : l'instance peut alors être partagée
+    entre SalesAnalyzer, PDFExporter et plusieurs threads.
+    
+    Avec use_rollups (USE_ROLLUPS par défaut), les agrégations sans filtre plus fin
+    que le jour sont lues dans la table de cumuls journaliers plutôt que dans ventes.
+    
+    En schéma en étoile (voir dimensions.py), les agrégations regroupent sur
+    magasin_id / produit_id et les noms ne sont rattachés qu'aux lignes du résultat.
+    """
     
-    def __init__(self, config=None):
+    def __init__(self, config=None, pool=None, use_rollups=None):
         self.config = config or DB_CONFIG
+        self.pool = pool
+        self.use_rollups = USE_ROLLUPS if use_rollups is None else use_rollups
         self.connection = None
         self.cursor = None
+        self._star = None
+        self._dimensions = None
     
     def connect(self):
+        if self.pool is not None:
+            return True
         try:
-            self.connection = mysql.connector.connect(**self.config)
+            self.connection = connect(self.config)
             if self.connection.is_connected():
                 self.cursor = self.connection.cursor(dictionary=True)
                 return True
@@ -32,8 +238,31 @@ class DatabaseManager:
                 self.cursor.close()
             self.connection.close()
     
+    def _run_pooled(self, query, params=None, commit=False, fetch=None):
+        """Exécute une requête sur une connexion empruntée au pool"""
+        try:
+            with self.pool.connection() as pooled:
+                cursor = pooled.cursor
+                cursor.execute(query, params or ())
+                if commit:
+                    pooled.connection.commit()
+                if fetch == 'all':
+                    return cursor.fetchall()
+                if fetch == 'one':
+                    return cursor.fetchone()
+                return True
+        except queue.Empty:
+            print("Erreur: aucune connexion disponible dans le pool.")
+        except Error as e:
+            print(f"Erreur lors de l'exécution de la requête: {e}")
+        return {'all': [], 'one': None}.get(fetch, False)
+    
+    @traced('db.execute_query')
     def execute_query(self, query, params=None, commit=False):
         """Exécute une requête SQL"""
+        if self.pool is not None:
+            return self._run_pooled(query, params, commit)
+        
         if not self.connection or not self.connection.is_connected():
             if not self.connect():
                 return None
@@ -47,7 +276,50 @@ class DatabaseManager:
             print(f"Erreur lors de l'exécution de la requête: {e}")
             return False
     
+    @traced('db.execute_transaction')
+    def execute_transaction(self, statements):
+        """
+        Exécute plusieurs requêtes sur une même connexion, validées par un seul commit
+
+        Args:
+            statements (list): Requêtes (query, params) ; params peut valoir None
+
+        Returns:
+            bool: True si tout a été validé, False après annulation de la transaction
+        """
+        if self.pool is not None:
+            try:
+                with self.pool.connection() as pooled:
+                    return self._run_transaction(pooled.connection, pooled.cursor, statements)
+            except queue.Empty:
+                print("Erreur: aucune connexion disponible dans le pool.")
+                return False
+
+        if not self.connection or not self.connection.is_connected():
+            if not self.connect():
+                return False
+        return self._run_transaction(self.connection, self.cursor, statements)
+
+    @staticmethod
+    def _run_transaction(connection, cursor, statements):
+        try:
+            for query, params in statements:
+                cursor.execute(query, params or ())
+            connection.commit()
+            return True
+        except Error as e:
+            print(f"Erreur lors de l'exécution de la transaction: {e}")
+            try:
+                connection.rollback()
+            except Error:
+                pass
+            return False
+
+    @traced('db.fetch_all', rows=len)
     def fetch_all(self, query, params=None):
+        if self.pool is not None:
+            return self._run_pooled(query, params, fetch='all')
+        
         if not self.execute_query(query, params):
             return []
         
@@ -57,7 +329,11 @@ class DatabaseManager:
             print(f"Erreur lors de la récupération des résultats: {e}")
             return []
     
+    @traced('db.fetch_one')
     def fetch_one(self, query, params=None):
+        if self.pool is not None:
+            return self._run_pooled(query, params, fetch='one')
+        
         if not self.execute_query(query, params):
             return None
         
@@ -67,66 +343,305 @@ class DatabaseManager:
             print(f"Erreur lors de la récupération du résultat: {e}")
             return None
     
+    @traced('db.iter_chunks', rows=len)
+    def iter_chunks(self, query, params=None, chunk_size=50000):
+        """
+        Exécute une requête et renvoie ses lignes (tuples) par paquets de chunk_size
+        
+        Le curseur n'est ni dictionnaire ni bufferisé : les lignes sont lues au fil
+        de l'eau côté serveur, sans jamais matérialiser tout le résultat.
+        """
+        if self.pool is not None:
+            with self.pool.connection() as pooled:
+                yield from self._iter_cursor(pooled.connection, query, params, chunk_size)
+            return
+        
+        if not self.connection or not self.connection.is_connected():
+            if not self.connect():
+                return
+        yield from self._iter_cursor(self.connection, query, params, chunk_size)
+    
+    @staticmethod
+    def _iter_cursor(connection, query, params, chunk_size):
+        cursor = connection.cursor()
+        try:
+            cursor.execute(query, params or ())
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            # Vide un résultat abandonné en cours de route pour libérer la connexion
+            try:
+                while cursor.fetchmany(chunk_size):
+                    pass
+            except Error:
+                pass
+            cursor.close()
+    
     # Méthodes spécifiques pour l'application
     
+    def is_star_schema(self):
+        """
+        La table ventes est-elle en schéma en étoile (magasin_id, produit_id) ?
+        
+        Vérifié au premier appel seulement ; False tant que la table n'existe pas.
+        """
+        if self._star is not None:
+            return self._star
+        try:
+            if self.pool is not None:
+                with self.pool.connection() as pooled:
+                    cursor = pooled.cursor
+                    self._star = self._detect_star(cursor)
+            elif (self.connection and self.connection.is_connected()) or self.connect():
+                self._star = self._detect_star(self.cursor)
+        except (Error, queue.Empty) as e:
+            print(f"Erreur lors de la lecture du schéma de la table ventes: {e}")
+        return bool(self._star)
+    
+    @staticmethod
+    def _detect_star(cursor):
+        backend = backend_of(cursor)
+        if not backend.table_exists(cursor, 'ventes'):
+            return None
+        return backend.column_exists(cursor, 'ventes', KEY_COLUMNS['magasin'])
+    
+    @property
+    def dimensions(self):
+        """Cache nom <-> identifiant des magasins et produits en schéma en étoile, None sinon"""
+        if self._dimensions is None and self.is_star_schema():
+            self._dimensions = DimensionCache.for_db(self)
+        return self._dimensions
+    
+    def _keys(self):
+        """Colonnes magasin et produit à regrouper (identifiants en schéma en étoile)"""
+        return key_columns(self.is_star_schema())
+    
+    def _named(self, rows):
+        """Rattache les noms de magasins et produits aux lignes du résultat (schéma en étoile)"""
+        dimensions = self.dimensions
+        return dimensions.name_rows(rows) if dimensions is not None else rows
+    
+    def _source(self):
+        """
+        Table à interroger et expressions de quantité et de montant correspondantes
+
+        Le montant est en centimes entiers : les SUM sont exacts, la conversion en
+        euros (money.to_euros) se fait une fois sur le résultat.
+        """
+        if self.use_rollups:
+            return ROLLUP_TABLE, 'quantite_totale', 'total_centimes'
+        return 'ventes', 'quantite', AMOUNT_CENTS_SQL
+    
+    @traced('db.get_total_sales')
     def get_total_sales(self):
-        query = """
-        SELECT SUM(quantite * prix_unitaire) AS total_ventes
-        FROM ventes
+        table, _, amount = self._source()
+        query = f"""
+        SELECT SUM({amount}) AS total_centimes
+        FROM {table}
         """
         result = self.fetch_one(query)
-        return result['total_ventes'] if result else 0
+        return to_euros(result['total_centimes']) if result else 0
     
+    @traced('db.get_sales_by_store')
     def get_sales_by_store(self):
-        query = """
-        SELECT magasin, SUM(quantite * prix_unitaire) AS total_ventes
-        FROM ventes
-        GROUP BY magasin
-        ORDER BY total_ventes DESC
+        table, _, amount = self._source()
+        store, _ = self._keys()
+        query = f"""
+        SELECT {store} AS magasin, SUM({amount}) AS total_centimes
+        FROM {table}
+        GROUP BY {store}
+        ORDER BY total_centimes DESC
         """
-        return self.fetch_all(query)
+        return rows_to_euros(self._named(self.fetch_all(query)))
     
+    @traced('db.get_sales_by_product')
     def get_sales_by_product(self):
-        query = """
-        SELECT produit, SUM(quantite) AS quantite_totale, 
-               SUM(quantite * prix_unitaire) AS total_ventes
-        FROM ventes
-        GROUP BY produit
-        ORDER BY total_ventes DESC
+        table, quantity, amount = self._source()
+        _, product = self._keys()
+        query = f"""
+        SELECT {product} AS produit, SUM({quantity}) AS quantite_totale, 
+               SUM({amount}) AS total_centimes
+        FROM {table}
+        GROUP BY {product}
+        ORDER BY total_centimes DESC
         """
-        return self.fetch_all(query)
+        return rows_to_euros(self._named(self.fetch_all(query)))
     
+    @traced('db.get_sales_by_date')
     def get_sales_by_date(self, period='monthly'):
-        if period == 'daily':
-            date_format = '%Y-%m-%d'
-            group_by = 'date'
-        elif period == 'monthly':
-            date_format = '%Y-%m'
-            group_by = "DATE_FORMAT(date, '%Y-%m')"
-        else:  # yearly
-            date_format = '%Y'
-            group_by = "DATE_FORMAT(date, '%Y')"
+        """
+        Ventes par jour, mois ou année
         
+        Le regroupement se fait d'abord sur la colonne date, dans l'ordre de l'index
+        (idx_date_couvrant, ou la clé primaire des cumuls) ; DATE_FORMAT n'est
+        appliqué qu'aux totaux journaliers, pas à chaque ligne de la table.
+        """
+        date_format = {'daily': '%Y-%m-%d', 'monthly': '%Y-%m'}.get(period, '%Y')
+        table, _, amount = self._source()
         query = f"""
-        SELECT DATE_FORMAT(date, '{date_format}') AS periode,
-               SUM(quantite * prix_unitaire) AS total_ventes
-        FROM ventes
-        GROUP BY {group_by}
+        SELECT DATE_FORMAT(jour, '{date_format}') AS periode, SUM(total_jour) AS total_centimes
+        FROM (SELECT date AS jour, SUM({amount}) AS total_jour FROM {table} GROUP BY date) AS par_jour
+        GROUP BY periode
         ORDER BY periode
         """
-        return self.fetch_all(query)
+        return rows_to_euros(self.fetch_all(query))
     
+    @traced('db.get_best_selling_products')
     def get_best_selling_products(self, limit=5):
-        query = """
-        SELECT produit, SUM(quantite) AS quantite_totale
-        FROM ventes
-        GROUP BY produit
+        table, quantity, _ = self._source()
+        _, product = self._keys()
+        query = f"""
+        SELECT {product} AS produit, SUM({quantity}) AS quantite_totale
+        FROM {table}
+        GROUP BY {product}
         ORDER BY quantite_totale DESC
         LIMIT %s
         """
-        return self.fetch_all(query, (limit,))
+        return self._named(self.fetch_all(query, (limit,)))
     
-    def get_sales_data_for_dashboard(self):
+    @traced('db.get_data_version')
+    def get_data_version(self):
+        """
+        Version des données : dernier id inséré (lecture d'index, quasi gratuite)
+        
+        Un id inférieur validé plus tard par un import concurrent ne le change pas :
+        les lectures incrémentales suivent aussi les ids absents (voir watermark.py),
+        les caches de résultats utilisent get_data_token.
+        """
+        result = self.fetch_one("SELECT MAX(id) AS version FROM ventes")
+        return result['version'] if result and result['version'] is not None else 0
+    
+    @traced('db.get_data_token')
+    def get_data_token(self):
+        """
+        Jeton des caches de résultats (ResultCache, ETag de l'API) : change à chaque import validé
+        
+        Le dernier id seul ne suffit pas : une ligne d'id inférieur validée plus tard
+        ne le change pas. Le jeton y ajoute le nombre de lignes des WATERMARK_WINDOW
+        derniers ids, où une telle ligne arrive (voir watermark.py) : un parcours
+        borné de la clé primaire, et non un COUNT(*) de toute la table.
+        """
+        result = self.fetch_one("""
+        SELECT dernier.version, (SELECT COUNT(*) FROM ventes WHERE id > dernier.version - %s) AS recentes
+        FROM (SELECT MAX(id) AS version FROM ventes) AS dernier
+        """, (WATERMARK_WINDOW,))
+        if not result or result['version'] is None:
+            return '0-0'
+        return f"{result['version']}-{result['recentes']}"
+    
+    @traced('db.get_monthly_rollup')
+    def get_monthly_rollup(self, start=None, end=None, stores=None, products=None):
+        """
+        Ventes agrégées par magasin, produit et mois, en un seul parcours de la table
+
+        Les montants restent en centimes (total_centimes) : ces lignes sont
+        recombinées par build_dashboard_facets et l'export incrémental.
+        """
+        table, quantity, amount = self._source()
+        store, product = self._keys()
+        where, params = build_filters(start, end, stores, products, self.is_star_schema())
+        query = f"""
+        SELECT {store} AS magasin, {product} AS produit, DATE_FORMAT(date, '%Y-%m') AS periode,
+               SUM({quantity}) AS quantite_totale,
+               SUM({amount}) AS total_centimes
+        FROM {table}{where}
+        GROUP BY {store}, {product}, periode
+        """
+        return self._named(self.fetch_all(query, params))
+    
+    @traced('db.get_monthly_rollup_for_ids')
+    def get_monthly_rollup_for_ids(self, intervals):
+        """
+        Cumul magasin × produit × mois des seules lignes dont l'id est dans intervals
+        
+        Lu dans ventes par un parcours de la clé primaire : le coût dépend du nombre
+        de lignes demandées (voir watermark.py), pas de la taille de l'historique.
+        
+        Args:
+            intervals (list): Intervalles d'ids inclus [(premier, dernier), ...]
+        """
+        if not intervals:
+            return []
+        store, product = self._keys()
+        condition, params = id_condition(intervals)
+        query = f"""
+        SELECT {store} AS magasin, {product} AS produit, DATE_FORMAT(date, '%Y-%m') AS periode,
+               SUM(quantite) AS quantite_totale,
+               SUM({AMOUNT_CENTS_SQL}) AS total_centimes
+        FROM ventes
+        WHERE {condition}
+        GROUP BY {store}, {product}, periode
+        """
+        return self._named(self.fetch_all(query, params))
+    
+    @traced('db.get_sales_summary')
+    def get_sales_summary(self, dimension=None, start=None, end=None, stores=None, products=None,
+                          limit=None, offset=0, order_by='total_ventes'):
+        """
+        Agrégation filtrée selon une dimension
+        
+        Args:
+            dimension (str, optional): 'magasin', 'produit', 'jour', 'mois', 'annee' ou None (total)
+            start, end (str, optional): Bornes de dates incluses (AAAA-MM-JJ)
+            stores, products (list, optional): Magasins / produits à inclure
+            limit, offset (int, optional): Pagination des groupes
+            order_by (str): 'total_ventes', 'quantite_totale' ou 'periode' (ordre chronologique)
+        
+        Returns:
+            list: Lignes {dimension, quantite_totale, total_ventes, nb_transactions}
+        """
+        table, quantity, amount = self._source()
+        count = 'nb_transactions' if self.use_rollups else '1'
+        star = self.is_star_schema()
+        where, params = build_filters(start, end, stores, products, star)
+        
+        group_expr = SUMMARY_DIMENSIONS[dimension]
+        if star and dimension in KEY_COLUMNS:
+            group_expr = KEY_COLUMNS[dimension]
+        if dimension in DATE_DIMENSIONS:
+            # Totaux par jour d'abord (ordre de l'index sur la date), puis par période
+            table = f"""(
+            SELECT date, SUM({quantity}) AS quantite_jour, SUM({amount}) AS total_jour,
+                   SUM({count}) AS transactions_jour
+            FROM {table}{where}
+            GROUP BY date) AS par_jour"""
+            quantity, amount, count, where = 'quantite_jour', 'total_jour', 'transactions_jour', ''
+        select = f"{group_expr} AS {dimension}, " if dimension else ""
+        group_by = f" GROUP BY {group_expr}" if dimension else ""
+        order = ""
+        if dimension:
+            direction = "ASC" if order_by == 'periode' else "DESC"
+            order_column = {'periode': dimension, 'total_ventes': 'total_centimes'}.get(order_by, order_by)
+            if order_by == 'periode' and star and dimension in KEY_COLUMNS:
+                # Ordre des noms : sous-requête évaluée une fois par groupe, pas par ligne
+                order_column = f"(SELECT nom FROM {DIMENSIONS[dimension]} WHERE id = {group_expr})"
+            order = f" ORDER BY {order_column} {direction}"
+        
+        query = f"""
+        SELECT {select}SUM({quantity}) AS quantite_totale, SUM({amount}) AS total_centimes,
+               SUM({count}) AS nb_transactions
+        FROM {table}{where}{group_by}{order}
+        """
+        if limit is not None:
+            query += " LIMIT %s OFFSET %s"
+            params = params + [int(limit), int(offset)]
+        return rows_to_euros(self._named(self.fetch_all(query, params)))
+    
+    @traced('db.get_sales_data_for_dashboard')
+    def get_sales_data_for_dashboard(self, single_pass=True):
+        """
+        Données du tableau de bord
+        
+        Par défaut, toutes les facettes sont déduites d'un unique GROUP BY
+        magasin × produit × mois (voir build_dashboard_facets) ; single_pass=False
+        conserve l'ancien chemin à cinq requêtes, utile pour comparer.
+        """
+        if single_pass:
+            return build_dashboard_facets(self.get_monthly_rollup())
+        
         return {
             'total_sales': self.get_total_sales(),
             'sales_by_store': self.get_sales_by_store(),
@@ -136,6 +651,95 @@ class DatabaseManager:
         }
 
 
+# Dimensions calendaires : regroupées par jour puis par période (voir get_sales_summary)
+DATE_DIMENSIONS = ('jour', 'mois', 'annee')
+
+# Expressions de regroupement acceptées par get_sales_summary
+SUMMARY_DIMENSIONS = {
+    None: None,
+    'magasin': 'magasin',
+    'produit': 'produit',
+    'jour': "DATE_FORMAT(date, '%Y-%m-%d')",
+    'mois': "DATE_FORMAT(date, '%Y-%m')",
+    'annee': "DATE_FORMAT(date, '%Y')"
+}
+
+def build_filters(start=None, end=None, stores=None, products=None, star=False):
+    """
+    Construit la clause WHERE (et ses paramètres) des filtres date / magasin / produit
+    
+    En schéma en étoile (star), les noms filtrent les identifiants par une sous-requête
+    sur les tables de dimension.
+    """
+    where_clauses = []
+    params = []
+    
+    if start:
+        where_clauses.append("date >= %s")
+        params.append(start)
+    if end:
+        where_clauses.append("date <= %s")
+        params.append(end)
+    if stores:
+        where_clauses.append(dimension_filter('magasin', len(stores)) if star
+                             else f"magasin IN ({', '.join(['%s'] * len(stores))})")
+        params.extend(stores)
+    if products:
+        where_clauses.append(dimension_filter('produit', len(products)) if star
+                             else f"produit IN ({', '.join(['%s'] * len(products))})")
+        params.extend(products)
+    
+    where = " WHERE " + " AND ".join(where_clauses) if where_clauses else ""
+    return where, params
+
+def build_dashboard_facets(rollup, limit=5):
+    """
+    Calcule les cinq facettes du tableau de bord à partir du cumul magasin × produit × mois
+    
+    Args:
+        rollup (list): Lignes {magasin, produit, periode, quantite_totale, total_centimes}
+        limit (int): Nombre de produits dans best_selling_products
+    
+    Returns:
+        dict: Même structure que l'ancien get_sales_data_for_dashboard
+    """
+    total_sales = 0
+    by_store = {}
+    by_product = {}
+    by_month = {}
+    
+    for row in rollup:
+        amount = int(row['total_centimes'] or 0)
+        quantity = int(row['quantite_totale'] or 0)
+        total_sales += amount
+        by_store[row['magasin']] = by_store.get(row['magasin'], 0) + amount
+        product = by_product.setdefault(row['produit'], [0, 0])
+        product[0] += quantity
+        product[1] += amount
+        by_month[row['periode']] = by_month.get(row['periode'], 0) + amount
+    
+    # Sommes exactes en centimes, converties en euros une seule fois
+    sales_by_store = [{'magasin': store, 'total_ventes': to_euros(amount)}
+                      for store, amount in by_store.items()]
+    sales_by_store.sort(key=lambda x: x['total_ventes'], reverse=True)
+    
+    sales_by_product = [{'produit': name, 'quantite_totale': quantity, 'total_ventes': to_euros(amount)}
+                        for name, (quantity, amount) in by_product.items()]
+    sales_by_product.sort(key=lambda x: x['total_ventes'], reverse=True)
+    
+    best_selling = sorted(sales_by_product, key=lambda x: x['quantite_totale'], reverse=True)[:limit]
+    
+    return {
+        'total_sales': to_euros(total_sales) if rollup else None,
+        'sales_by_store': sales_by_store,
+        'sales_by_product': sales_by_product,
+        'monthly_sales': [{'periode': period, 'total_ventes': to_euros(by_month[period])}
+                          for period in sorted(by_month)],
+        'best_selling_products': [{'produit': p['produit'], 'quantite_totale': p['quantite_totale']}
+                                  for p in best_selling]
+    }
+
+
 # Exemple d'utilisation
 if __name__ == "__main__":
     db = DatabaseManager()
@@ -149,4 +753,11 @@ if __name__ == "__main__":
         # Fermeture de la connexion
         db.disconnect()
     else:
-        print("Échec de la connexion.")
\ No newline at end of file
+        print("Échec de la connexion.")
+    
+    # Exemple avec le pool partagé (à passer à SalesAnalyzer(pool=...) / PDFExporter(pool=...))
+    pool = get_shared_pool()
+    pooled_db = DatabaseManager(pool=pool)
+    pooled_db.get_sales_by_store()
+    print(f"Métriques du pool: {pool.get_metrics()}")
+    pool.close_all()
\ No newline at end of file
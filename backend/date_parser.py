@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Analyse rapide des dates du CSV
+
+Le format de la colonne est détecté une seule fois sur un échantillon, puis chaque
+valeur est lue avec une expression régulière compilée pour ce format. Les dates
+déjà rencontrées sont mémorisées (seule la partie date sert de clé, l'heure étant
+ignorée) et les valeurs atypiques repassent par l'ancienne cascade format_date.
+"""
+
+import datetime
+import re
+
+# Motifs reconnus, dans l'ordre de priorité de la cascade historique.
+# Chaque entrée : (nom, regex, position des groupes année/mois/jour, format pandas)
+DATE_PATTERNS = [
+    ('iso', re.compile(r'(?P<date>(\d{4})-(\d{1,2})-(\d{1,2}))(?:[ T].*)?$'), (1, 2, 3), '%Y-%m-%d'),
+    ('jj/mm/aaaa', re.compile(r'(?P<date>(\d{1,2})/(\d{1,2})/(\d{4}))(?: .*)?$'), (3, 2, 1), '%d/%m/%Y'),
+    ('mm/jj/aaaa', re.compile(r'(?P<date>(\d{1,2})/(\d{1,2})/(\d{4}))(?: .*)?$'), (3, 1, 2), '%m/%d/%Y'),
+    ('jj-mm-aaaa', re.compile(r'(?P<date>(\d{1,2})-(\d{1,2})-(\d{4}))(?: .*)?$'), (3, 2, 1), '%d-%m-%Y'),
+    ('jj.mm.aaaa', re.compile(r'(?P<date>(\d{1,2})\.(\d{1,2})\.(\d{4}))(?: .*)?$'), (3, 2, 1), '%d.%m.%Y'),
+]
+
+def format_date(date_str):
+    """Convertit une date au format français en format SQL"""
+    try:
+        formats = [
+            '%Y-%m-%d %H:%M:%S.%f',
+            '%Y-%m-%d %H:%M:%S',
+            '%Y-%m-%dT%H:%M:%S.%f',
+            '%Y-%m-%dT%H:%M:%S',
+            '%d/%m/%Y %H:%M:%S',     # 16/12/2023 06:32:43 (format français avec heure)
+            '%d/%m/%Y',              # 16/12/2023 (format français)
+            '%Y-%m-%d',              # 2023-12-16 (format SQL)
+            '%m/%d/%Y',              # 12/16/2023 (format américain)
+            '%d-%m-%Y',              # 16-12-2023 (format avec tirets)
+            '%d.%m.%Y'               # 16.12.2023 (format avec points)
+        ]
+
+        # Essai de chaque format
+        for fmt in formats:
+            try:
+                date_obj = datetime.datetime.strptime(date_str.strip(), fmt)
+                return date_obj.strftime('%Y-%m-%d')  # renvoie en SQL
+            except (ValueError, TypeError):
+                continue
+
+        if ' ' in date_str:
+            date_part = date_str.split(' ')[0]
+            for fmt in ['%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%d-%m-%Y', '%d.%m.%Y']:
+                try:
+                    date_obj = datetime.datetime.strptime(date_part.strip(), fmt)
+                    return date_obj.strftime('%Y-%m-%d')
+                except (ValueError, TypeError):
+                    continue
+
+        raise ValueError(f"Format de date non reconnu: {date_str}")
+
+    except Exception as e:
+        print(f"Erreur lors du formatage de la date {date_str}: {e}")
+        return None
+
+class DateParser:
+    """Lecteur de dates spécialisé pour le format d'une colonne"""
+
+    def __init__(self, sample=None, cache_size=100000):
+        self.pattern = None
+        self.cache_size = cache_size
+        self._cache = {}
+        self.stats = {'rapides': 0, 'cache': 0, 'cascade': 0}
+        if sample:
+            self.detect(sample)
+
+    @property
+    def format_name(self):
+        return self.pattern[0] if self.pattern else None
+
+    @property
+    def pandas_format(self):
+        """Format strptime équivalent, utilisable avec pd.to_datetime (partie date seule)"""
+        return self.pattern[3] if self.pattern else None
+
+    def detect(self, sample):
+        """
+        Choisit le motif qui reconnaît le plus de valeurs de l'échantillon
+
+        Entre jj/mm/aaaa et mm/jj/aaaa, un jour supérieur à 12 tranche ;
+        à égalité, jj/mm/aaaa l'emporte comme dans la cascade.
+        """
+        best, best_score = None, 0
+        for pattern in DATE_PATTERNS:
+            score = sum(1 for value in sample
+                        if value and self._convert(pattern, value.strip()) is not None)
+            if score > best_score:
+                best, best_score = pattern, score
+
+        self.pattern = best
+        self._cache.clear()
+        return self.format_name
+
+    @staticmethod
+    def _convert(pattern, value):
+        match = pattern[1].match(value)
+        if match is None:
+            return None
+        year_idx, month_idx, day_idx = pattern[2]
+        try:
+            return datetime.date(int(match.group(year_idx + 1)),
+                                 int(match.group(month_idx + 1)),
+                                 int(match.group(day_idx + 1))).isoformat()
+        except ValueError:
+            return None
+
+    def parse(self, date_str):
+        """Renvoie la date au format SQL (AAAA-MM-JJ) ou None si elle est invalide"""
+        if self.pattern is None or date_str is None:
+            self.stats['cascade'] += 1
+            return format_date(date_str) if date_str is not None else None
+
+        value = date_str.strip()
+        match = self.pattern[1].match(value)
+        if match is None:
+            self.stats['cascade'] += 1
+            return format_date(date_str)
+
+        key = match.group('date')
+        result = self._cache.get(key)
+        if result is not None:
+            self.stats['cache'] += 1
+            return result
+
+        result = self._convert(self.pattern, key)
+        if result is None:
+            self.stats['cascade'] += 1
+            return format_date(date_str)
+
+        if len(self._cache) >= self.cache_size:
+            self._cache.clear()
+        self._cache[key] = result
+        self.stats['rapides'] += 1
+        return result
+
+    def parse_many(self, values):
+        parse = self.parse
+        return [parse(value) for value in values]
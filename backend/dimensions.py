@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Schéma en étoile : magasins et produits codés par des identifiants entiers
+
+En mode étoile (STAR_SCHEMA de config.py, choisi à la création de la table
+ventes), ventes et ses cumuls journaliers ne répètent plus les noms sur chaque
+ligne : ils portent magasin_id et produit_id, identifiants des tables de
+dimension magasins et produits. Les lignes, les index et les GROUP BY portent
+alors sur des entiers de 4 octets au lieu de VARCHAR(100) / VARCHAR(200).
+
+    - L'import traduit les noms en identifiants avec un DimensionCache en mémoire :
+      les noms nouveaux sont ajoutés en une requête par lot (INSERT IGNORE, sans
+      conflit entre écrivains concurrents) puis relus avec leurs identifiants.
+    - Les lectures (DatabaseManager, PDFExporter, API, chargement en colonnes)
+      agrègent sur les identifiants et ne rattachent les noms qu'au résultat,
+      avec le même cache ; un identifiant inconnu recharge les tables de dimension.
+    - Les filtres par nom deviennent magasin_id IN (SELECT id FROM magasins WHERE nom IN ...).
+
+Le schéma d'une base existante est celui de sa table ventes (uses_star_schema) :
+changer STAR_SCHEMA ne convertit pas une base déjà créée. Les identifiants ne
+sont pas déclarés en FOREIGN KEY : InnoDB refuse les clés étrangères sur une
+table partitionnée, et l'import garantit déjà que chaque identifiant existe.
+"""
+
+import os
+import sys
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+from backends import AUTO_ID, backend_of
+
+# Colonne de nom -> table de dimension et colonne d'identifiant dans ventes
+DIMENSIONS = {'magasin': 'magasins', 'produit': 'produits'}
+KEY_COLUMNS = {'magasin': 'magasin_id', 'produit': 'produit_id'}
+
+DIMENSION_COLUMNS = {
+    'magasins': [('id', AUTO_ID), ('nom', 'VARCHAR(100) NOT NULL')],
+    'produits': [('id', AUTO_ID), ('nom', 'VARCHAR(200) NOT NULL')]
+}
+
+# Noms recherchés par requête lors de l'ajout de nouveaux membres
+LOOKUP_CHUNK = 500
+
+def key_columns(star):
+    """Colonnes magasin et produit de ventes et des cumuls selon le schéma"""
+    if star:
+        return KEY_COLUMNS['magasin'], KEY_COLUMNS['produit']
+    return 'magasin', 'produit'
+
+def uses_star_schema(cursor):
+    """La table ventes existante porte-t-elle des identifiants (magasin_id) plutôt que des noms ?"""
+    backend = backend_of(cursor)
+    return backend.table_exists(cursor, 'ventes') and backend.column_exists(cursor, 'ventes', 'magasin_id')
+
+def create_dimension_tables(cursor):
+    """Crée les tables magasins et produits si besoin (celles de vente_db.sql conviennent)"""
+    backend = backend_of(cursor)
+    for table, columns in DIMENSION_COLUMNS.items():
+        if not backend.table_exists(cursor, table):
+            print(f"Création de la table de dimension '{table}'...")
+            for statement in backend.create_table_sql(table, columns,
+                                                      unique_indexes=[(f'idx_{table}_nom', ('nom',))]):
+                cursor.execute(statement)
+
+def dimension_filter(dimension, count):
+    """Condition SQL sur l'identifiant d'une dimension à partir de count noms (paramètres %s)"""
+    return (f"{KEY_COLUMNS[dimension]} IN (SELECT id FROM {DIMENSIONS[dimension]} "
+            f"WHERE nom IN ({', '.join(['%s'] * count)}))")
+
+class MemberNames(dict):
+    """Identifiant -> nom d'une dimension ; un identifiant absent recharge le cache"""
+
+    def __init__(self, cache, dimension):
+        super().__init__()
+        self.cache = cache
+        self.dimension = dimension
+
+    def __missing__(self, member_id):
+        # Membre ajouté par un autre import depuis le dernier chargement
+        self.cache.refresh()
+        names = self.cache.names[self.dimension]
+        return dict.get(names, member_id)
+
+class DimensionCache:
+    """
+    Correspondance nom <-> identifiant des magasins et produits
+
+    Args:
+        fetch (callable): fetch(requête) -> liste de (id, nom) ; voir for_cursor et for_db
+    """
+
+    def __init__(self, fetch):
+        self._fetch = fetch
+        self.ids = {dimension: {} for dimension in DIMENSIONS}
+        self.names = {dimension: MemberNames(self, dimension) for dimension in DIMENSIONS}
+        self.refresh()
+
+    @classmethod
+    def for_cursor(cls, cursor):
+        """Cache alimenté par un curseur (tuples), côté import"""
+        def fetch(query):
+            cursor.execute(query)
+            return cursor.fetchall()
+        return cls(fetch)
+
+    @classmethod
+    def for_db(cls, db):
+        """Cache alimenté par un DatabaseManager (lignes dictionnaires), côté lecture"""
+        return cls(lambda query: [(row['id'], row['nom']) for row in db.fetch_all(query)])
+
+    def refresh(self):
+        """Recharge les tables de dimension (quelques centaines de lignes)"""
+        for dimension, table in DIMENSIONS.items():
+            names = MemberNames(self, dimension)
+            for member_id, name in self._fetch(f"SELECT id, nom FROM {table}"):
+                names[member_id] = name
+            # Remplacement en une affectation : les lecteurs d'autres threads voient
+            # l'ancien ou le nouveau dictionnaire complet
+            self.ids[dimension] = {name: member_id for member_id, name in names.items()}
+            self.names[dimension] = names
+
+    def _add_members(self, conn, cursor, dimension, names):
+        """Ajoute des noms inconnus à leur table de dimension et lit leurs identifiants"""
+        table = DIMENSIONS[dimension]
+        names = sorted(names)
+        # Ordre stable : deux écrivains ajoutant les mêmes noms verrouillent dans le même ordre
+        cursor.executemany(backend_of(cursor).insert_ignore_sql(table, ['nom']), [(name,) for name in names])
+        # Validé à part : un lot de ventes annulé ne doit pas emporter des identifiants déjà en cache
+        conn.commit()
+        ids = dict(self.ids[dimension])
+        member_names = self.names[dimension]
+        for i in range(0, len(names), LOOKUP_CHUNK):
+            chunk = names[i:i + LOOKUP_CHUNK]
+            cursor.execute(f"SELECT id, nom FROM {table} WHERE nom IN ({', '.join(['%s'] * len(chunk))})", chunk)
+            for member_id, name in cursor.fetchall():
+                ids[name] = member_id
+                member_names[member_id] = name
+        self.ids[dimension] = ids
+
+    def resolve(self, conn, cursor, rows):
+        """
+        Remplace magasin et produit par leurs identifiants dans des lignes
+        (date, magasin, produit, quantite, prix en centimes[, empreinte])
+
+        Les noms encore inconnus sont d'abord ajoutés aux tables de dimension
+        (transaction validée séparément, avant l'insertion du lot).
+        """
+        for position, dimension in ((1, 'magasin'), (2, 'produit')):
+            known = self.ids[dimension]
+            missing = {row[position] for row in rows} - known.keys()
+            if missing:
+                self._add_members(conn, cursor, dimension, missing)
+        store_ids, product_ids = self.ids['magasin'], self.ids['produit']
+        return [(row[0], store_ids[row[1]], product_ids[row[2]]) + row[3:] for row in rows]
+
+    def name_rows(self, rows, columns=('magasin', 'produit')):
+        """Remplace, dans des lignes de résultat (dictionnaires), les identifiants par les noms"""
+        present = [column for column in columns if rows and column in rows[0]]
+        for column in present:
+            names = self.names[column]
+            for row in rows:
+                row[column] = names[row[column]]
+        return rows
@@ -1,26 +1,124 @@
 """
 Module pour gérer l'exportation des données en format PDF
-Ce module servira dans le cas où l'on souhaite générer les PDF côté serveur
+Prépare les données des rapports et les rend en PDF côté serveur (pdf_renderer.py)
 """
 
 import os
 import sys
-import json
-from datetime import datetime
+from datetime import datetime, timedelta
 
 # Assurez-vous que les imports peuvent fonctionner même si le script est exécuté depuis un autre dossier
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(current_dir)
 
-from database import DatabaseManager
+from database import DatabaseManager, build_filters
+from dimensions import key_columns
+from instrumentation import instrumented_run, traced
+from money import AMOUNT_CENTS_SQL
+from pdf_renderer import render_report_pdf, render_reports
+from rollups import ROLLUP_TABLE
+
+def _is_month_end(day):
+    """'AAAA-MM-JJ' est-il le dernier jour de son mois ?"""
+    try:
+        return (datetime.strptime(day, '%Y-%m-%d') + timedelta(days=1)).day == 1
+    except ValueError:
+        return False
+
+class ReportAccumulator:
+    """
+    Cumuls incrémentaux d'un rapport de ventes (par magasin, produit et mois)
+    
+    Les montants sont cumulés en centimes entiers, donc sans erreur d'arrondi, et
+    convertis en euros une seule fois dans to_report().
+    """
+    
+    def __init__(self):
+        self.total_cents = 0
+        self.rows = 0
+        self.by_store = {}
+        self.by_product = {}
+        self.by_month = {}
+    
+    def add(self, store, product, period, quantity, amount_cents):
+        self.rows += 1
+        self.total_cents += amount_cents
+        
+        entry = self.by_store.get(store)
+        if entry is None:
+            self.by_store[store] = [quantity, amount_cents]
+        else:
+            entry[0] += quantity
+            entry[1] += amount_cents
+        
+        entry = self.by_product.get(product)
+        if entry is None:
+            self.by_product[product] = [quantity, amount_cents]
+        else:
+            entry[0] += quantity
+            entry[1] += amount_cents
+        
+        self.by_month[period] = self.by_month.get(period, 0) + amount_cents
+    
+    def to_report(self):
+        if not self.rows:
+            return {"error": "Aucune donnée trouvée pour les critères spécifiés."}
+        
+        # Convertir les dictionnaires en listes pour faciliter le tri
+        stores_list = [{'name': k, 'quantity': int(q), 'amount': c / 100} for k, (q, c) in self.by_store.items()]
+        products_list = [{'name': k, 'quantity': int(q), 'amount': c / 100} for k, (q, c) in self.by_product.items()]
+        
+        # Trier par montant décroissant
+        stores_list.sort(key=lambda x: x['amount'], reverse=True)
+        products_list.sort(key=lambda x: x['amount'], reverse=True)
+        
+        # Préparer les données de tendance mensuelle
+        trend_data = [{'period': k, 'amount': v / 100} for k, v in self.by_month.items()]
+        trend_data.sort(key=lambda x: x['period'])
+        
+        # Assembler les données du rapport
+        return {
+            'date_generated': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'total_sales': self.total_cents / 100,
+            'sales_by_store': stores_list,
+            'sales_by_product': products_list,
+            'monthly_trend': trend_data
+        }
 
 class PDFExporter:
-    def __init__(self, db_manager=None):
-        self.db = db_manager or DatabaseManager()
+    def __init__(self, db_manager=None, pool=None):
+        self.db = db_manager or DatabaseManager(pool=pool)
         if not self.db.connection or not self.db.connection.is_connected():
             self.db.connect()
     
-    def generate_sales_report_data(self, date_range=None, store_filter=None, product_filter=None):
+    @staticmethod
+    def _build_where(date_range=None, store_filter=None, product_filter=None, star=False):
+        """Construit la condition WHERE et ses paramètres à partir des filtres du rapport"""
+        if not (date_range and 'start' in date_range and 'end' in date_range):
+            date_range = {}
+        return build_filters(date_range.get('start'), date_range.get('end'),
+                             store_filter if isinstance(store_filter, list) else None,
+                             product_filter if isinstance(product_filter, list) else None,
+                             star)
+    
+    def _iter_named(self, query, params):
+        """
+        Paquets de tuples (magasin, produit, ...) lus par iter_chunks, avec les noms
+        
+        En schéma en étoile, les deux premières colonnes sont des identifiants,
+        traduits par le cache des dimensions (rechargé avant la lecture).
+        """
+        dimensions = self.db.dimensions
+        if dimensions is None:
+            yield from self.db.iter_chunks(query, params)
+            return
+        dimensions.refresh()
+        stores, products = dimensions.names['magasin'], dimensions.names['produit']
+        for rows in self.db.iter_chunks(query, params):
+            yield [(stores[row[0]], products[row[1]]) + tuple(row[2:]) for row in rows]
+    
+    @traced('pdf.generate_sales_report_data')
+    def generate_sales_report_data(self, date_range=None, store_filter=None, product_filter=None, mode='sql'):
         """
         Prépare les données pour un rapport de ventes en PDF
         
@@ -28,128 +126,179 @@ class PDFExporter:
             date_range (dict, optional): Période de dates à considérer {'start': '2022-01-01', 'end': '2022-12-31'}
             store_filter (list, optional): Liste des magasins à inclure
             product_filter (list, optional): Liste des produits à inclure
+            mode (str): 'sql' agrège dans la base (GROUP BY magasin, produit, mois) ;
+                        'stream' lit les lignes par paquets et les cumule au fil de l'eau.
+                        Dans les deux cas la mémoire reste indépendante de la période.
             
         Returns:
             dict: Données formatées pour le rapport
         """
         try:
-            # Construire la condition WHERE pour la requête SQL
-            where_clauses = []
-            params = []
-            
-            if date_range and 'start' in date_range and 'end' in date_range:
-                where_clauses.append("date BETWEEN %s AND %s")
-                params.extend([date_range['start'], date_range['end']])
-            
-            if store_filter and isinstance(store_filter, list) and len(store_filter) > 0:
-                placeholders = ', '.join(['%s'] * len(store_filter))
-                where_clauses.append(f"magasin IN ({placeholders})")
-                params.extend(store_filter)
-            
-            if product_filter and isinstance(product_filter, list) and len(product_filter) > 0:
-                placeholders = ', '.join(['%s'] * len(product_filter))
-                where_clauses.append(f"produit IN ({placeholders})")
-                params.extend(product_filter)
-            
-            # Construire la requête
-            query = "SELECT * FROM ventes"
-            if where_clauses:
-                query += " WHERE " + " AND ".join(where_clauses)
-            
-            # Exécuter la requête
-            results = self.db.fetch_all(query, params)
-            
-            if not results:
-                return {"error": "Aucune donnée trouvée pour les critères spécifiés."}
-            
-            # Organiser les données
-            total_sales = 0
-            sales_by_store = {}
-            sales_by_product = {}
-            sales_by_date = {}
-            
-            for sale in results:
-                # Calculer le montant total
-                amount = float(sale['quantite']) * float(sale['prix_unitaire'])
-                total_sales += amount
-                
-                # Ventes par magasin
-                store = sale['magasin']
-                if store not in sales_by_store:
-                    sales_by_store[store] = {'quantity': 0, 'amount': 0}
-                sales_by_store[store]['quantity'] += int(sale['quantite'])
-                sales_by_store[store]['amount'] += amount
-                
-                # Ventes par produit
-                product = sale['produit']
-                if product not in sales_by_product:
-                    sales_by_product[product] = {'quantity': 0, 'amount': 0}
-                sales_by_product[product]['quantity'] += int(sale['quantite'])
-                sales_by_product[product]['amount'] += amount
-                
-                # Ventes par date
-                date_str = sale['date'].strftime('%Y-%m')
-                if date_str not in sales_by_date:
-                    sales_by_date[date_str] = 0
-                sales_by_date[date_str] += amount
-            
-            # Convertir les dictionnaires en listes pour faciliter le tri
-            stores_list = [{'name': k, **v} for k, v in sales_by_store.items()]
-            products_list = [{'name': k, **v} for k, v in sales_by_product.items()]
-            
-            # Trier par montant décroissant
-            stores_list.sort(key=lambda x: x['amount'], reverse=True)
-            products_list.sort(key=lambda x: x['amount'], reverse=True)
-            
-            # Préparer les données de tendance mensuelle
-            trend_data = [{'period': k, 'amount': v} for k, v in sales_by_date.items()]
-            trend_data.sort(key=lambda x: x['period'])
-            
-            # Assembler les données du rapport
-            report_data = {
-                'date_generated': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'total_sales': total_sales,
-                'sales_by_store': stores_list,
-                'sales_by_product': products_list,
-                'monthly_trend': trend_data
-            }
+            star = self.db.is_star_schema()
+            store_key, product_key = key_columns(star)
+            where, params = self._build_where(date_range, store_filter, product_filter, star)
+            accumulator = ReportAccumulator()
+            
+            if mode == 'stream':
+                query = f"""
+                SELECT {store_key}, {product_key}, DATE_FORMAT(date, '%Y-%m') AS periode, quantite,
+                       {AMOUNT_CENTS_SQL} AS montant_centimes
+                FROM ventes{where}
+                """
+            else:
+                # Les filtres portent sur le jour, le magasin et le produit : les cumuls
+                # journaliers suffisent quand ils sont disponibles
+                table = ROLLUP_TABLE if self.db.use_rollups else 'ventes'
+                quantity, amount = (('quantite_totale', 'total_centimes') if self.db.use_rollups
+                                    else ('quantite', AMOUNT_CENTS_SQL))
+                query = f"""
+                SELECT {store_key}, {product_key}, DATE_FORMAT(date, '%Y-%m') AS periode,
+                       SUM({quantity}) AS quantite,
+                       SUM({amount}) AS montant_centimes
+                FROM {table}{where}
+                GROUP BY {store_key}, {product_key}, periode
+                """
             
-            return report_data
+            for rows in self._iter_named(query, params):
+                for store, product, period, quantity, amount_cents in rows:
+                    accumulator.add(store, product, period, int(quantity), int(amount_cents))
+            
+            return accumulator.to_report()
             
         except Exception as e:
             print(f"Erreur lors de la génération des données du rapport: {e}")
             return {"error": str(e)}
     
-    def export_pdf(self, output_path, data=None, options=None):
+    @staticmethod
+    def _spec_filters(spec):
+        """Filtres d'une spec, normalisés comme dans _build_where : (début, fin, magasins, produits)"""
+        date_range = spec.get('date_range')
+        if not (date_range and 'start' in date_range and 'end' in date_range):
+            date_range = {}
+        stores = spec.get('store_filter')
+        products = spec.get('product_filter')
+        start, end = date_range.get('start'), date_range.get('end')
+        return (str(start) if start else None, str(end) if end else None,
+                frozenset(stores) if isinstance(stores, list) and stores else None,
+                frozenset(products) if isinstance(products, list) and products else None)
+    
+    @traced('pdf.generate_sales_reports_data')
+    def generate_sales_reports_data(self, specs, mode='sql'):
         """
-        Génère un fichier PDF à partir des données
+        Prépare les données de plusieurs rapports en un seul parcours des ventes
         
-        Cette méthode est un placeholder pour l'intégration future d'une bibliothèque
-        de génération de PDF côté serveur comme ReportLab
+        Une seule requête couvre l'union des filtres (période la plus large, magasins
+        et produits réunis) et renvoie les ventes par magasin, produit et jour ; chaque
+        ligne est ensuite ajoutée aux cumuls de tous les rapports qu'elle concerne.
+        Les rapports qui se recoupent ne coûtent donc pas un parcours chacun.
+        
+        Args:
+            specs (list): Dictionnaires {'date_range', 'store_filter', 'product_filter'}
+                          (mêmes filtres que generate_sales_report_data)
+            mode (str): 'sql' (lignes agrégées par jour dans la base) ou 'stream'
+                        (lignes brutes de ventes lues par paquets)
+            
+        Returns:
+            list: Données de chaque rapport, dans l'ordre des specs
+        """
+        if not specs:
+            return []
+        try:
+            filters = [self._spec_filters(spec) for spec in specs]
+            accumulators = [ReportAccumulator() for _ in specs]
+            
+            # Union des filtres : un filtre absent d'une spec lève ce filtre pour toutes
+            starts = [start for start, _, _, _ in filters]
+            ends = [end for _, end, _, _ in filters]
+            store_sets = [stores for _, _, stores, _ in filters]
+            product_sets = [products for _, _, _, products in filters]
+            star = self.db.is_star_schema()
+            store_key, product_key = key_columns(star)
+            where, params = build_filters(
+                None if None in starts else min(starts),
+                None if None in ends else max(ends),
+                None if None in store_sets else sorted(set().union(*store_sets)),
+                None if None in product_sets else sorted(set().union(*product_sets)),
+                star)
+            
+            # Périodes toutes en mois entiers : regroupement par mois, sinon par jour
+            by_month = (all(start is None or start.endswith('-01') for start in starts)
+                        and all(end is None or _is_month_end(end) for end in ends))
+            period_format = '%Y-%m' if by_month else '%Y-%m-%d'
+            if mode == 'stream':
+                query = f"""
+                SELECT {store_key}, {product_key}, DATE_FORMAT(date, '{period_format}') AS periode, quantite,
+                       {AMOUNT_CENTS_SQL} AS montant_centimes
+                FROM ventes{where}
+                """
+            else:
+                table = ROLLUP_TABLE if self.db.use_rollups else 'ventes'
+                quantity, amount = (('quantite_totale', 'total_centimes') if self.db.use_rollups
+                                    else ('quantite', AMOUNT_CENTS_SQL))
+                query = f"""
+                SELECT {store_key}, {product_key}, DATE_FORMAT(date, '{period_format}') AS periode,
+                       SUM({quantity}) AS quantite,
+                       SUM({amount}) AS montant_centimes
+                FROM {table}{where}
+                GROUP BY {store_key}, {product_key}, periode
+                """
+            
+            # Bornes ramenées au format des périodes lues ('AAAA-MM' ou 'AAAA-MM-JJ')
+            size = len('AAAA-MM') if by_month else len('AAAA-MM-JJ')
+            bounds = [(start[:size] if start else None, end[:size] if end else None, stores, products)
+                      for start, end, stores, products in filters]
+            
+            # Rapports concernés par un (magasin, période), calculés une fois par couple ;
+            # le filtre produit, plus rare, est vérifié ligne par ligne
+            targets = {}
+            for rows in self._iter_named(query, params):
+                for store, product, period, quantity, amount_cents in rows:
+                    matches = targets.get((store, period))
+                    if matches is None:
+                        matches = targets[(store, period)] = [
+                            (accumulators[i], products) for i, (start, end, stores, products) in enumerate(bounds)
+                            if (stores is None or store in stores)
+                            and (start is None or period >= start) and (end is None or period <= end)]
+                    if not matches:
+                        continue
+                    month = period[:7]
+                    quantity = int(quantity)
+                    amount_cents = int(amount_cents)
+                    for accumulator, products in matches:
+                        if products is None or product in products:
+                            accumulator.add(store, product, month, quantity, amount_cents)
+            
+            return [accumulator.to_report() for accumulator in accumulators]
+            
+        except Exception as e:
+            print(f"Erreur lors de la génération des données des rapports: {e}")
+            return [{"error": str(e)} for _ in specs]
+    
+    @traced('pdf.export_pdf')
+    def export_pdf(self, output_path, data=None, options=None):
+        """
+        Génère un fichier PDF vectoriel à partir des données (voir pdf_renderer.py)
         
         Args:
             output_path (str): Chemin où sauvegarder le PDF
             data (dict, optional): Données à inclure dans le PDF
-            options (dict, optional): Options de mise en page
+            options (dict, optional): Options de mise en page ({'title': ...})
             
         Returns:
-            str: Chemin du fichier généré ou message d'erreur
+            dict: Statut et chemin du fichier généré ou message d'erreur
         """
         try:
             # Si aucune donnée n'est fournie, générer des données par défaut
             if not data:
                 data = self.generate_sales_report_data()
             
-            # Écrire les données en JSON comme solution temporaire
-            # Dans une implémentation réelle, nous utiliserions ReportLab ou WeasyPrint
-            json_path = output_path.replace('.pdf', '.json')
-            with open(json_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=4)
+            title = (options or {}).get('title', "Rapport des ventes")
+            pdf_path = render_report_pdf(data, output_path, title)
             
             return {
                 "status": "success",
-                "message": "Les données ont été exportées en JSON. L'exportation en PDF n'est pas encore implémentée côté serveur.",
-                "json_path": json_path
+                "message": "Le rapport PDF a été généré.",
+                "pdf_path": pdf_path
             }
         
         except Exception as e:
@@ -158,29 +307,50 @@ class PDFExporter:
                 "status": "error",
                 "message": f"Erreur lors de l'exportation: {str(e)}"
             }
+    
+    @traced('pdf.export_pdfs')
+    def export_pdfs(self, specs, output_dir, workers=None):
+        """
+        Génère plusieurs rapports PDF, rendus en parallèle
+        
+        Args:
+            specs (list): Dictionnaires {'filename', 'title', 'date_range', 'store_filter', 'product_filter'}
+            output_dir (str): Dossier de destination
+            workers (int, optional): Nombre de processus de rendu
+            
+        Returns:
+            list: Statut de chaque rapport, dans l'ordre des specs
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        # Données de tous les rapports en un seul parcours (generate_sales_reports_data)
+        reports = self.generate_sales_reports_data(specs)
+        jobs = [(data, os.path.join(output_dir, spec['filename']), spec.get('title', "Rapport des ventes"))
+                for spec, data in zip(specs, reports)]
+        return render_reports(jobs, workers)
 
 if __name__ == "__main__":
-    # Exemple d'utilisation
-    exporter = PDFExporter()
-    
-    # Exemple avec filtres
-    date_range = {'start': '2022-01-01', 'end': '2023-12-31'}
-    store_filter = ['Magasin_1', 'Magasin_2']
-    
-    # Générer les données
-    report_data = exporter.generate_sales_report_data(
-        date_range=date_range,
-        store_filter=store_filter
-    )
-    
-    # Chemin pour le fichier de sortie
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    output_dir = os.path.dirname(script_dir)
-    output_path = os.path.join(output_dir, 'rapport_ventes.pdf')
-    
-    # Exporter les données
-    result = exporter.export_pdf(output_path, report_data)
-    print(result)
-    
-    # Fermer la connexion à la base de données
-    exporter.db.disconnect()
\ No newline at end of file
+    with instrumented_run('rapport_pdf'):
+        # Exemple d'utilisation
+        exporter = PDFExporter()
+    
+        # Exemple avec filtres
+        date_range = {'start': '2022-01-01', 'end': '2023-12-31'}
+        store_filter = ['Magasin_1', 'Magasin_2']
+    
+        # Générer les données
+        report_data = exporter.generate_sales_report_data(
+            date_range=date_range,
+            store_filter=store_filter
+        )
+    
+        # Chemin pour le fichier de sortie
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        output_dir = os.path.dirname(script_dir)
+        output_path = os.path.join(output_dir, 'rapport_ventes.pdf')
+    
+        # Exporter les données
+        result = exporter.export_pdf(output_path, report_data)
+        print(result)
+    
+        # Fermer la connexion à la base de données
+        exporter.db.disconnect()
\ No newline at end of file
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Empreintes des lignes et des fichiers importés (import idempotent)
+
+Chaque ligne importée reçoit une empreinte de 63 bits (BLAKE2b) calculée sur ses
+valeurs (date telle qu'écrite dans le fichier, magasin, produit, quantité, prix
+en centimes) et sur son rang parmi les lignes identiques qui la précèdent dans
+le fichier : deux ventes identiques d'un même fichier restent deux ventes, mais
+réimporter le fichier, ou un fichier qui le recoupe, ne les ajoute pas une
+seconde fois. L'index unique (date, empreinte) de ventes garantit l'absence de
+doublons ; chaque lot est d'abord filtré par une requête sur cet index.
+
+Le rang est compté exactement, sans faux positif (sinon une même ligne pourrait
+avoir un rang différent dans deux fichiers qui se recoupent) : les hachages déjà
+vus sont rangés dans une table à adressage ouvert d'entiers de 64 bits (environ
+16 octets par ligne), seules les lignes répétées passent par un dictionnaire.
+
+Un fichier entièrement importé est enregistré dans fichiers_importes avec
+l'empreinte SHA-256 de son contenu : le réimporter ne relit aucune ligne.
+
+L'index unique commence par la date de la vente : les clés d'un fichier
+chronologique tombent dans une petite zone de l'index au lieu d'être dispersées
+sur tout l'arbre, ce qui garde l'insertion et la vérification des lots en cache
+quand la table grossit. Les 63 bits de l'empreinte sont tous des bits de
+hachage : même à 10 millions de ventes par jour, le risque que deux lignes
+différentes d'un même jour partagent une empreinte (la seconde serait écartée
+comme doublon) reste d'environ 1 sur 200 000 par jour.
+"""
+
+import hashlib
+import os
+import sys
+from array import array
+from datetime import datetime
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+from backends import backend_of
+
+FINGERPRINT_COLUMN = 'empreinte'
+# Date en tête : voir ci-dessus ; sous MySQL, l'index unique d'une table partitionnée doit la contenir
+FINGERPRINT_INDEX = 'idx_date_empreinte'
+FINGERPRINT_KEY = ('date', FINGERPRINT_COLUMN)
+# Index des versions précédentes (empreinte seule, ou (empreinte, date) sur une table partitionnée)
+OBSOLETE_FINGERPRINT_INDEX = 'idx_empreinte'
+IMPORTED_FILES_TABLE = 'fichiers_importes'
+
+IMPORTED_FILES_COLUMNS = [
+    ('empreinte', 'CHAR(64) NOT NULL'),
+    ('fichier', 'VARCHAR(255) NOT NULL'),
+    ('taille', 'BIGINT NOT NULL'),
+    ('lignes', 'INT NOT NULL'),
+    ('date_import', 'DATETIME NOT NULL')
+]
+
+# Nombre d'empreintes par requête de vérification d'un lot
+LOOKUP_CHUNK = 1000
+
+# Table des hachages vus : taux de remplissage maximal avant doublement
+COUNTER_LOAD = 0.7
+# Taille moyenne d'une ligne de CSV de ventes, pour estimer le nombre de lignes d'un fichier
+AVERAGE_LINE_BYTES = 40
+
+class OccurrenceCounter:
+    """Rang d'une ligne parmi les lignes de même contenu déjà vues (0 pour la première)"""
+
+    def __init__(self, data_bytes):
+        expected = max(1, data_bytes // AVERAGE_LINE_BYTES)
+        self._allocate(1 << max(16, int(expected / COUNTER_LOAD).bit_length()))
+        self.count = 0
+        self.repeats = {}
+
+    def _allocate(self, size):
+        # 0 marque une case vide (un hachage nul est compté comme 1)
+        self.slots = array('Q', bytes(8 * size))
+        self.mask = size - 1
+        self.limit = int(size * COUNTER_LOAD)
+
+    def _grow(self):
+        keys = [key for key in self.slots if key]
+        self._allocate((self.mask + 1) * 2)
+        slots, mask = self.slots, self.mask
+        for key in keys:
+            i = key & mask
+            while slots[i]:
+                i = (i + 1) & mask
+            slots[i] = key
+
+    def rank(self, key):
+        """key: empreinte du contenu, entier non signé de 64 bits"""
+        key = key or 1
+        slots, mask = self.slots, self.mask
+        i = key & mask
+        while True:
+            current = slots[i]
+            if not current:
+                slots[i] = key
+                self.count += 1
+                if self.count > self.limit:
+                    self._grow()
+                return 0
+            if current == key:
+                rank = self.repeats.get(key, 0) + 1
+                self.repeats[key] = rank
+                return rank
+            i = (i + 1) & mask
+
+# Empreinte positive de 63 bits (colonne BIGINT signée)
+HASH_MASK = (1 << 63) - 1
+
+def content_key(date_text, parsed):
+    """
+    Hachage de 64 bits du contenu d'une ligne nettoyée, clé de l'OccurrenceCounter
+
+    Args:
+        date_text (str): Date telle qu'écrite dans le fichier (avec l'heure éventuelle)
+        parsed (tuple): (date, magasin, produit, quantite, prix en centimes)
+    """
+    _, magasin, produit, quantite, prix_centimes = parsed[:5]
+    content = f"{date_text.strip()}\x1f{magasin}\x1f{produit}\x1f{quantite}\x1f{prix_centimes}".encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(content, digest_size=8).digest(), 'big')
+
+def ranked_fingerprint(key, rank):
+    """Empreinte de la ligne de contenu key précédée de rank lignes identiques dans le fichier"""
+    if rank:
+        key = int.from_bytes(hashlib.blake2b(key.to_bytes(8, 'big') + f"\x1f{rank}".encode('ascii'),
+                                             digest_size=8).digest(), 'big')
+    return key & HASH_MASK
+
+def row_fingerprint(date_text, parsed, counter):
+    """
+    Empreinte d'une ligne nettoyée (tuple de parse_row)
+
+    Args:
+        date_text (str): Date telle qu'écrite dans le fichier (avec l'heure éventuelle)
+        parsed (tuple): (date, magasin, produit, quantite, prix en centimes)
+        counter (OccurrenceCounter): Compteur des rangs du fichier en cours, lu dans l'ordre
+
+    Returns:
+        int: Entier positif de 63 bits au plus (colonne BIGINT)
+    """
+    key = content_key(date_text, parsed)
+    return ranked_fingerprint(key, counter.rank(key))
+
+def file_fingerprint(path, block_size=1024 * 1024):
+    """Empreinte SHA-256 (hexadécimale) du contenu d'un fichier"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def ensure_fingerprint_schema(cursor):
+    """Ajoute la colonne empreinte (et son index unique) à ventes et crée fichiers_importes si besoin"""
+    backend = backend_of(cursor)
+    if not backend.column_exists(cursor, 'ventes', FINGERPRINT_COLUMN):
+        print("Ajout de la colonne 'empreinte' à la table 'ventes'...")
+        cursor.execute(f"ALTER TABLE ventes ADD COLUMN {FINGERPRINT_COLUMN} BIGINT NULL")
+    if not backend.index_exists(cursor, 'ventes', FINGERPRINT_INDEX):
+        print(f"Création de l'index unique '{FINGERPRINT_INDEX}' sur 'ventes'...")
+        cursor.execute(backend.create_index_sql('ventes', FINGERPRINT_INDEX, FINGERPRINT_KEY, unique=True))
+    if backend.index_exists(cursor, 'ventes', OBSOLETE_FINGERPRINT_INDEX):
+        # Les empreintes déjà en base (jour + 48 bits) ne seront plus retrouvées par un réimport
+        # ligne à ligne ; les fichiers déjà importés en entier restent reconnus
+        print(f"Suppression de l'index '{OBSOLETE_FINGERPRINT_INDEX}' (remplacé) sur 'ventes'...")
+        cursor.execute(backend.drop_index_sql('ventes', OBSOLETE_FINGERPRINT_INDEX))
+    if not backend.table_exists(cursor, IMPORTED_FILES_TABLE):
+        for statement in backend.create_table_sql(IMPORTED_FILES_TABLE, IMPORTED_FILES_COLUMNS, ('empreinte',)):
+            cursor.execute(statement)
+
+def is_file_imported(cursor, digest):
+    cursor.execute(f"SELECT fichier FROM {IMPORTED_FILES_TABLE} WHERE empreinte = %s", (digest,))
+    return cursor.fetchone() is not None
+
+def record_imported_file(cursor, digest, path, rows):
+    """Enregistre un fichier entièrement importé (dans la transaction courante)"""
+    if is_file_imported(cursor, digest):
+        return
+    cursor.execute(f"""
+    INSERT INTO {IMPORTED_FILES_TABLE} (empreinte, fichier, taille, lignes, date_import)
+    VALUES (%s, %s, %s, %s, %s)
+    """, (digest, os.path.basename(path), os.path.getsize(path), rows,
+          datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+
+def drop_known_rows(cursor, batch):
+    """
+    Retire d'un lot les lignes dont le couple (date, empreinte) est déjà en base
+
+    L'empreinte est le dernier élément de chaque ligne. La recherche est bornée aux
+    dates du lot : elle suit l'index unique (date, empreinte) et, sur une table
+    partitionnée par mois (partitions.py), n'interroge que les partitions de ces dates.
+
+    Returns:
+        tuple: (lignes nouvelles, nombre de doublons écartés)
+    """
+    keys = [row[-1] for row in batch]
+    known = set()
+    for i in range(0, len(keys), LOOKUP_CHUNK):
+        part = keys[i:i + LOOKUP_CHUNK]
+        dates = [row[0] for row in batch[i:i + LOOKUP_CHUNK]]
+        cursor.execute(f"SELECT date, {FINGERPRINT_COLUMN} FROM ventes WHERE date >= %s AND date <= %s "
+                       f"AND {FINGERPRINT_COLUMN} IN ({', '.join(['%s'] * len(part))})",
+                       [min(dates), max(dates)] + part)
+        known.update((str(day)[:10], key) for day, key in cursor.fetchall())
+    if not known:
+        return batch, 0
+    fresh = [row for row in batch if (str(row[0])[:10], row[-1]) not in known]
+    return fresh, len(batch) - len(fresh)
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Générateur de fichiers de ventes synthétiques, au format de donnees_ventes.csv
+
+Les données sont déterministes (même graine, mêmes fichiers) et réalistes :
+chaque produit a un prix de référence, les magasins ont des volumes inégaux,
+les ventes suivent une saisonnalité (pic de fin d'année, creux d'août) et un
+effet jour de la semaine. On peut faire varier le format des dates, le
+délimiteur, l'encodage et injecter une proportion de lignes invalides pour
+éprouver l'import.
+
+Usage: python backend/generateur_donnees.py fichier.csv [lignes] [format_date] [delimiteur] [encodage] [taux_invalides]
+Exemple: python backend/generateur_donnees.py ventes_1M.csv 1000000 jj/mm/aaaa ";" cp1252 0.01
+"""
+
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+HEADER = ['Date', 'Magasin', 'Produit', 'Quantité vendue', 'Prix unitaire']
+
+# Formats d'écriture des dates (noms des motifs de date_parser.DATE_PATTERNS)
+DATE_FORMATS = {
+    'iso': '%Y-%m-%d %H:%M:%S.%f',
+    'iso_jour': '%Y-%m-%d',
+    'jj/mm/aaaa': '%d/%m/%Y %H:%M:%S',
+    'mm/jj/aaaa': '%m/%d/%Y',
+    'jj-mm-aaaa': '%d-%m-%Y',
+    'jj.mm.aaaa': '%d.%m.%Y'
+}
+
+# Coefficients de saisonnalité par mois (janvier à décembre) et par jour (lundi à dimanche)
+MONTH_WEIGHTS = np.array([0.85, 0.8, 0.95, 1.0, 1.0, 1.05, 1.0, 0.7, 1.0, 1.05, 1.2, 1.6])
+WEEKDAY_WEIGHTS = np.array([0.8, 0.85, 0.9, 0.95, 1.15, 1.45, 0.9])
+
+# Anomalies injectées dans les lignes invalides : valeurs illisibles, puis lignes lisibles
+# mais refusées par les règles de validation (voir validation.py)
+DIRTY_KINDS = ['date', 'quantite', 'prix', 'colonnes', 'vide',
+               'quantite_nulle', 'prix_nul', 'date_future', 'prix_aberrant']
+
+GENERATION_CHUNK = 500000
+
+def _day_weights(start, days):
+    """Probabilité de vente de chaque jour de la période (saisonnalité et jour de la semaine)"""
+    dates = pd.date_range(start, periods=days, freq='D')
+    weights = MONTH_WEIGHTS[dates.month - 1] * WEEKDAY_WEIGHTS[dates.dayofweek]
+    return weights / weights.sum()
+
+def generate_sales_csv(path, rows, stores=5, products=10, start='2022-01-01', days=3 * 365,
+                       date_format='iso', delimiter=',', encoding='utf-8', dirty_ratio=0.0,
+                       seed=42, sorted_dates=True):
+    """
+    Écrit un CSV de ventes synthétiques
+
+    Args:
+        path (str): Fichier à écrire
+        rows (int): Nombre de lignes de données
+        stores, products (int): Nombre de magasins (Magasin_1...) et de produits (Produit_1...)
+        start (str): Premier jour (AAAA-MM-JJ) ; days (int): nombre de jours couverts
+        date_format (str): Clé de DATE_FORMATS
+        delimiter (str): ',' ou ';' (avec ';', les prix s'écrivent avec une virgule décimale)
+        encoding (str): Encodage du fichier (utf-8, cp1252, iso-8859-1...)
+        dirty_ratio (float): Proportion de lignes invalides (dates, nombres, colonnes...)
+        seed (int): Graine : mêmes paramètres, même fichier
+        sorted_dates (bool): Lignes dans l'ordre chronologique, comme un export de caisse
+
+    Returns:
+        dict: Lignes écrites et lignes invalides injectées
+    """
+    rng = np.random.default_rng(seed)
+    start_ts = pd.Timestamp(start)
+    fmt = DATE_FORMATS[date_format]
+    decimal_comma = delimiter == ';'
+
+    # Caractéristiques fixes : prix de référence par produit, volume relatif par magasin
+    base_prices = np.round(rng.lognormal(mean=2.6, sigma=0.6, size=products), 2).clip(0.5, 500)
+    store_weights = 1.0 / np.arange(1, stores + 1) ** 0.6
+    store_weights /= store_weights.sum()
+    product_weights = rng.dirichlet(np.full(products, 2.0))
+    day_weights = _day_weights(start_ts, days)
+    store_names = np.array([f"Magasin_{i}" for i in range(1, stores + 1)], dtype=object)
+    product_names = np.array([f"Produit_{i}" for i in range(1, products + 1)], dtype=object)
+
+    dirty_total = 0
+    with open(path, 'w', newline='', encoding=encoding) as f:
+        f.write(delimiter.join(HEADER) + '\n')
+        for offset in range(0, rows, GENERATION_CHUNK):
+            count = min(GENERATION_CHUNK, rows - offset)
+            day = rng.choice(days, size=count, p=day_weights)
+            # Heure d'ouverture des magasins (8 h - 21 h)
+            seconds = day * 86400 + rng.integers(8 * 3600, 21 * 3600, size=count)
+            if sorted_dates:
+                seconds.sort()
+            moments = start_ts + pd.to_timedelta(seconds, unit='s')
+            store = rng.choice(stores, size=count, p=store_weights)
+            product = rng.choice(products, size=count, p=product_weights)
+            quantity = rng.geometric(0.08, size=count).clip(1, 500)
+            # Prix autour du prix de référence (promotions, arrondis de caisse)
+            cents = np.rint(base_prices[product] * rng.uniform(85, 110, size=count)).astype(np.int64).clip(1)
+
+            # Peu de prix distincts : on formate chaque valeur une seule fois
+            price_values, price_codes = np.unique(cents, return_inverse=True)
+            separator = ',' if decimal_comma else '.'
+            price_text = np.array([f"{c // 100}{separator}{c % 100:02d}" for c in price_values], dtype=object)
+            chunk = pd.DataFrame({
+                'Date': pd.Series(moments).dt.strftime(fmt),
+                'Magasin': store_names[store],
+                'Produit': product_names[product],
+                'Quantité vendue': quantity.astype(str),
+                'Prix unitaire': price_text[price_codes]
+            })
+            if date_format == 'iso':
+                # Même précision (nanosecondes) que l'export d'origine
+                chunk['Date'] = chunk['Date'] + '000'
+
+            if dirty_ratio > 0:
+                dirty_total += _make_dirty(chunk, rng, dirty_ratio, fmt, separator)
+
+            chunk.to_csv(f, sep=delimiter, header=False, index=False, lineterminator='\n')
+
+    return {'lignes': rows, 'invalides': dirty_total}
+
+def _make_dirty(chunk, rng, ratio, fmt='%Y-%m-%d', separator='.'):
+    """Remplace une proportion ratio des lignes par des lignes invalides de natures variées"""
+    future = pd.Timestamp(2099, 6, 1, 12).strftime(fmt)
+    dirty = np.flatnonzero(rng.random(len(chunk)) < ratio)
+    kinds = rng.integers(0, len(DIRTY_KINDS), size=len(dirty))
+    for index, kind in zip(dirty, kinds):
+        kind = DIRTY_KINDS[kind]
+        if kind == 'date':
+            chunk.iat[index, 0] = rng.choice(['31/02/2023', '2023-13-45', 'hier', ''])
+        elif kind == 'quantite':
+            chunk.iat[index, 3] = rng.choice(['', 'dix', 'NaN'])
+        elif kind == 'prix':
+            chunk.iat[index, 4] = rng.choice(['', 'gratuit', '12.3.4'])
+        elif kind == 'quantite_nulle':
+            chunk.iat[index, 3] = rng.choice(['0', '-1', '-12'])
+        elif kind == 'prix_nul':
+            chunk.iat[index, 4] = rng.choice(['0', f'0{separator}00', f'-1{separator}50'])
+        elif kind == 'date_future':
+            chunk.iat[index, 0] = future
+        elif kind == 'prix_aberrant':
+            # Erreur de saisie classique : virgule oubliée, prix multiplié par 100
+            units, _, decimals = chunk.iat[index, 4].partition(separator)
+            chunk.iat[index, 4] = f"{units}{decimals}{separator}00"
+        elif kind == 'colonnes':
+            chunk.iat[index, 2] = ''
+            chunk.iat[index, 3] = ''
+            chunk.iat[index, 4] = ''
+        else:
+            chunk.iloc[index] = ''
+    return len(dirty)
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    path = sys.argv[1]
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    date_format = sys.argv[3] if len(sys.argv) > 3 else 'iso'
+    delimiter = sys.argv[4] if len(sys.argv) > 4 else ','
+    encoding = sys.argv[5] if len(sys.argv) > 5 else 'utf-8'
+    dirty_ratio = float(sys.argv[6]) if len(sys.argv) > 6 else 0.0
+
+    started = datetime.now()
+    result = generate_sales_csv(path, rows, date_format=date_format, delimiter=delimiter,
+                                encoding=encoding, dirty_ratio=dirty_ratio)
+    elapsed = (datetime.now() - started).total_seconds()
+    print(f"{result['lignes']} lignes écrites dans {path} ({result['invalides']} invalides) en {elapsed:.1f} s")
@@ -1,18 +1,24 @@
 """
-Script pour importer les données du fichier CSV vers la base de données MySQL
+Script pour importer les données du fichier CSV vers la base de données (MySQL ou SQLite, voir backends.py)
 """
 
 import csv
-import datetime
-import mysql.connector
+import glob
+import json
 import os
+import queue
 import sys
+import threading
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(current_dir)
 
 try:
-    from config import DB_CONFIG
+    from config import (DB_CONFIG, IMPORT_BATCH_SIZE, IMPORT_CHUNK_BYTES, IMPORT_IDEMPOTENT, IMPORT_VALIDATION,
+                        IMPORT_WRITERS, STAR_SCHEMA)
 except ImportError:
     DB_CONFIG = {
         'host': 'localhost',
@@ -20,201 +26,974 @@ except ImportError:
         'password': '',
         'database': 'ventes_db'
     }
+    IMPORT_BATCH_SIZE = 5000
+    IMPORT_CHUNK_BYTES = 16 * 1024 * 1024
+    IMPORT_WRITERS = 2
+    IMPORT_IDEMPOTENT = True
+    IMPORT_VALIDATION = True
+    STAR_SCHEMA = False
 
-def format_date(date_str):
-    """Convertit une date au format français en format SQL"""
-    try:
-        formats = [
-            '%Y-%m-%d %H:%M:%S.%f',  
-            '%Y-%m-%d %H:%M:%S',     
-            '%Y-%m-%dT%H:%M:%S.%f',  
-            '%Y-%m-%dT%H:%M:%S',     
-            '%d/%m/%Y %H:%M:%S',     # 16/12/2023 06:32:43 (format français avec heure)
-            '%d/%m/%Y',              # 16/12/2023 (format français)
-            '%Y-%m-%d',              # 2023-12-16 (format SQL)
-            '%m/%d/%Y',              # 12/16/2023 (format américain)
-            '%d-%m-%Y',              # 16-12-2023 (format avec tirets)
-            '%d.%m.%Y'               # 16.12.2023 (format avec points)
-        ]
-
-        # Essai de chaque format
-        for fmt in formats:
-            try:
-                date_obj = datetime.datetime.strptime(date_str.strip(), fmt)
-                return date_obj.strftime('%Y-%m-%d')  # renvoie en SQL 
-            except (ValueError, TypeError):
-                continue
-                
-        if ' ' in date_str:
-            date_part = date_str.split(' ')[0]
-            for fmt in ['%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%d-%m-%Y', '%d.%m.%Y']:
-                try:
-                    date_obj = datetime.datetime.strptime(date_part.strip(), fmt)
-                    return date_obj.strftime('%Y-%m-%d')
-                except (ValueError, TypeError):
-                    continue
-                    
-        raise ValueError(f"Format de date non reconnu: {date_str}")
-        
-    except Exception as e:
-        print(f"Erreur lors du formatage de la date {date_str}: {e}")
-        return None
+from backends import AUTO_ID, DatabaseError, backend_of, connect, ensure_indexes
+from date_parser import DateParser, format_date
+from dimensions import KEY_COLUMNS, DimensionCache, create_dimension_tables, key_columns, uses_star_schema
+from fingerprints import (FINGERPRINT_INDEX, FINGERPRINT_KEY, OccurrenceCounter, content_key,
+                          drop_known_rows, ensure_fingerprint_schema, file_fingerprint, is_file_imported,
+                          ranked_fingerprint, record_imported_file, row_fingerprint)
+from instrumentation import instrumented_run, record, span, stage_timer, traced
+from money import PRICE_FROM_CENTS_SQL, parse_cents
+from partitions import ensure_partitions, ventes_partitioning
+from rollups import add_to_rollup, apply_rollup_delta, create_rollup_table, update_rollups
+from validation import REJECT_SUFFIX, BatchValidator, RejectFile
+
+EXPECTED_FIELDS = ['Date', 'Magasin', 'Produit', 'Quantité vendue', 'Prix unitaire']
+
+# Le prix est transmis en centimes entiers (voir money.py)
+INSERT_SQL = f"""
+INSERT INTO ventes (date, magasin, produit, quantite, prix_unitaire)
+VALUES (%s, %s, %s, %s, {PRICE_FROM_CENTS_SQL})
+"""
 
-def create_tables_if_not_exist(cursor):
-    """Crée les tables nécessaires si elles n'existent pas déjà"""
+# Import idempotent : chaque ligne porte son empreinte (voir fingerprints.py)
+INSERT_FINGERPRINT_SQL = f"""
+INSERT INTO ventes (date, magasin, produit, quantite, prix_unitaire, empreinte)
+VALUES (%s, %s, %s, %s, {PRICE_FROM_CENTS_SQL}, %s)
+"""
+
+# Schéma en étoile : identifiants des tables de dimension à la place des noms (voir dimensions.py)
+INSERT_STAR_SQL = INSERT_SQL.replace('magasin, produit', ', '.join(key_columns(True)))
+INSERT_STAR_FINGERPRINT_SQL = INSERT_FINGERPRINT_SQL.replace('magasin, produit', ', '.join(key_columns(True)))
+
+VENTES_COLUMNS = [
+    ('id', AUTO_ID),
+    ('date', 'DATE NOT NULL'),
+    ('magasin', 'VARCHAR(100) NOT NULL'),
+    ('produit', 'VARCHAR(200) NOT NULL'),
+    ('quantite', 'INT NOT NULL'),
+    ('prix_unitaire', 'DECIMAL(10, 2) NOT NULL'),
+    ('empreinte', 'BIGINT NULL')
+]
+# Index couvrants : chacun contient toutes les colonnes lues par les agrégations de
+# DatabaseManager et PDFExporter (SUM(quantite * prix_unitaire) par magasin, produit,
+# jour ou mois), qui sont servies par l'index seul, sans lecture de la table
+#   - date en tête : requêtes bornées par des dates, regroupements par jour ou mois ;
+#   - magasin / produit en tête : regroupement par magasin / produit, filtres
+#     magasin IN (...) / produit IN (...) combinés à une période.
+VENTES_INDEXES = [
+    ('idx_date_couvrant', ('date', 'magasin', 'produit', 'quantite', 'prix_unitaire')),
+    ('idx_magasin_date', ('magasin', 'date', 'produit', 'quantite', 'prix_unitaire')),
+    ('idx_produit_date', ('produit', 'date', 'magasin', 'quantite', 'prix_unitaire'))
+]
+# Index à une colonne des versions précédentes, remplacés par les index couvrants
+OBSOLETE_VENTES_INDEXES = ('idx_date', 'idx_magasin', 'idx_produit')
+VENTES_UNIQUE_INDEXES = [(FINGERPRINT_INDEX, FINGERPRINT_KEY)]
+
+VENTES_STAR_COLUMNS = [
+    ('id', AUTO_ID),
+    ('date', 'DATE NOT NULL'),
+    ('magasin_id', 'INT NOT NULL'),
+    ('produit_id', 'INT NOT NULL'),
+    ('quantite', 'INT NOT NULL'),
+    ('prix_unitaire', 'DECIMAL(10, 2) NOT NULL'),
+    ('empreinte', 'BIGINT NULL')
+]
+VENTES_STAR_INDEXES = [(name, tuple(KEY_COLUMNS.get(column, column) for column in columns))
+                       for name, columns in VENTES_INDEXES]
+
+def create_tables_if_not_exist(cursor, star=None):
+    """
+    Crée les tables nécessaires si elles n'existent pas déjà
+
+    Met aussi à niveau les index de ventes (index couvrants) et crée d'avance les
+    partitions des prochains mois (voir partitions.py).
+
+    Args:
+        star (bool, optional): Schéma d'une table ventes à créer (STAR_SCHEMA par défaut) ;
+                               une table existante garde le sien
+    """
     try:
-        cursor.execute("SHOW TABLES LIKE 'ventes'")
-        if cursor.fetchone() is None:
-            print("La table 'ventes' n'existe pas. Création de la table...")
-            
-            create_table_sql = """
-            CREATE TABLE IF NOT EXISTS ventes (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                date DATE NOT NULL,
-                magasin VARCHAR(100) NOT NULL,
-                produit VARCHAR(200) NOT NULL,
-                quantite INT NOT NULL,
-                prix_unitaire DECIMAL(10, 2) NOT NULL,
-                INDEX idx_date (date),
-                INDEX idx_magasin (magasin),
-                INDEX idx_produit (produit)
-            ) ENGINE=InnoDB;
-            """
-            cursor.execute(create_table_sql)
+        backend = backend_of(cursor)
+        if not backend.table_exists(cursor, 'ventes'):
+            star = STAR_SCHEMA if star is None else star
+            print(f"La table 'ventes' n'existe pas. Création de la table{' (schéma en étoile)' if star else ''}...")
+            columns, indexes = (VENTES_STAR_COLUMNS, VENTES_STAR_INDEXES) if star else (VENTES_COLUMNS, VENTES_INDEXES)
+            for statement in backend.create_table_sql('ventes', columns, indexes=indexes,
+                                                      unique_indexes=VENTES_UNIQUE_INDEXES,
+                                                      partitions=ventes_partitioning(cursor)):
+                cursor.execute(statement)
             print("Table 'ventes' créée avec succès!")
-            
+        star = uses_star_schema(cursor)
+        if star:
+            create_dimension_tables(cursor)
+        ensure_indexes(cursor, 'ventes', VENTES_STAR_INDEXES if star else VENTES_INDEXES, OBSOLETE_VENTES_INDEXES)
+        ensure_partitions(cursor)
+
+        ensure_fingerprint_schema(cursor)
+        create_rollup_table(cursor, star)
         return True
-    except mysql.connector.Error as err:
+    except DatabaseError as err:
         print(f"Erreur lors de la vérification/création des tables: {err}")
         return False
 
-def import_data(csv_file):
-    """Importe les données du fichier CSV vers la base de données"""
-    
+def detect_encoding(csv_file):
+    """Renvoie le premier encodage capable de décoder le début du fichier"""
+    encodings = ['utf-8', 'iso-8859-1', 'latin1', 'cp1252']
+
+    for encoding in encodings:
+        try:
+            with open(csv_file, 'r', encoding=encoding) as f:
+                f.read(1024)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return encodings[-1]
+
+def detect_delimiter(sample):
+    """Choisit entre ',' et ';' selon le nombre d'occurrences dans l'échantillon"""
+    if sample.count(';') > sample.count(','):
+        return ';'
+    return ','
+
+def map_columns(field_names):
+    """Associe les colonnes attendues aux colonnes réelles du CSV (None si incomplet)"""
+    field_mapping = {}
+
+    for expected in EXPECTED_FIELDS:
+        if expected in field_names:
+            field_mapping[expected] = expected
+        else:
+            for field in field_names:
+                if expected.lower() in field.lower():
+                    field_mapping[expected] = field
+                    break
+
+    print(f"Mapping des colonnes: {field_mapping}")
+
+    if len(field_mapping) < len(EXPECTED_FIELDS):
+        missing = [exp for exp in EXPECTED_FIELDS if exp not in field_mapping]
+        print(f"Colonnes manquantes: {missing}")
+        print("Assurez-vous que votre CSV contient ces colonnes.")
+        return None
+    return field_mapping
+
+def parse_row(row, field_mapping, date_parser=None):
+    """
+    Nettoie une ligne du CSV et renvoie le tuple à insérer
+
+    Le prix est lu en centimes entiers, sans passer par un float (voir money.py).
+    Lève une ValueError avec le motif du rejet si la ligne est invalide
+    """
+    date_str = row[field_mapping['Date']]
+    date = date_parser.parse(date_str) if date_parser else format_date(date_str)
+    if date is None:
+        raise ValueError("date invalide")
+
+    magasin = row[field_mapping['Magasin']].strip()
+    produit = row[field_mapping['Produit']].strip()
+
+    try:
+        quantite_str = row[field_mapping['Quantité vendue']].replace(' ', '').replace(',', '.')
+        quantite = int(float(quantite_str))
+    except (ValueError, OverflowError, KeyError, AttributeError):
+        raise ValueError("impossible de lire la quantité")
+
+    try:
+        prix_centimes = parse_cents(row[field_mapping['Prix unitaire']])
+    except (ValueError, KeyError, AttributeError):
+        raise ValueError("impossible de lire le prix")
+
+    return (date, magasin, produit, quantite, prix_centimes)
+
+def build_date_parser(csv_file, encoding, delimiter, date_index, sample_size=1000):
+    """Détecte le format de la colonne date sur les premières lignes du fichier"""
+    sample = []
+    with open(csv_file, 'r', encoding=encoding, newline='') as f:
+        reader = csv.reader(f, delimiter=delimiter)
+        next(reader, None)
+        for values in reader:
+            if len(values) > date_index and values[date_index]:
+                sample.append(values[date_index])
+            if len(sample) >= sample_size:
+                break
+
+    parser = DateParser(sample)
+    print(f"Format de date détecté: {parser.format_name or 'inconnu (cascade)'}")
+    return parser
+
+@traced('import.inspect_csv')
+def inspect_csv(csv_file):
+    """
+    Détecte l'encodage, le délimiteur, les colonnes et le format de date d'un CSV
+
+    Returns:
+        dict: Description du fichier (dont data_offset, position en octets de la
+              première ligne de données) ou None si le fichier est inutilisable
+    """
+    encoding = detect_encoding(csv_file)
+    print(f"Utilisation de l'encodage {encoding}")
+
+    with open(csv_file, 'r', encoding=encoding) as f:
+        delimiter = detect_delimiter(f.read(1024))
+    print(f"Détection du délimiteur: '{delimiter}'")
+
+    with open(csv_file, 'rb') as f:
+        position = {'offset': 0}
+        header_reader = csv.reader(_iter_lines(f, encoding, position), delimiter=delimiter)
+        field_names = next(header_reader, None)
+    if not field_names:
+        print("Erreur: le fichier CSV est vide.")
+        return None
+    field_names = [name.lstrip('\ufeff') for name in field_names]
+    print(f"Colonnes détectées: {field_names}")
+
+    field_mapping = map_columns(field_names)
+    if field_mapping is None:
+        return None
+
+    date_index = field_names.index(field_mapping['Date'])
+    return {
+        'encoding': encoding,
+        'delimiter': delimiter,
+        'field_names': field_names,
+        'field_mapping': field_mapping,
+        'date_parser': build_date_parser(csv_file, encoding, delimiter, date_index),
+        'data_offset': position['offset']
+    }
+
+def _iter_lines(f, encoding, position):
+    """
+    Lit le fichier binaire ligne à ligne en tenant à jour l'offset en octets
+
+    csv.reader ne consomme que les lignes nécessaires à chaque enregistrement :
+    après chaque ligne CSV, position['offset'] pointe donc sur le début de la suivante.
+    """
+    for raw in iter(f.readline, b''):
+        position['offset'] += len(raw)
+        yield raw.decode(encoding)
+
+CHECKPOINT_SUFFIX = '.checkpoint'
+
+def _checkpoint_path(csv_file):
+    return csv_file + CHECKPOINT_SUFFIX
+
+def load_checkpoint(csv_file):
+    """Renvoie le point de reprise enregistré pour ce fichier, ou None"""
+    path = _checkpoint_path(csv_file)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Point de reprise illisible, import depuis le début: {e}")
+        return None
+
+    stat = os.stat(csv_file)
+    # Un fichier remplacé ou modifié depuis (même nom) ne reprend pas à l'offset d'un autre contenu
+    # (un point de reprise d'une version antérieure n'a que l'offset)
+    if checkpoint.get('offset', 0) > stat.st_size \
+            or checkpoint.get('taille', stat.st_size) != stat.st_size \
+            or checkpoint.get('modifie', stat.st_mtime_ns) != stat.st_mtime_ns:
+        print("Point de reprise incohérent avec le fichier, import depuis le début.")
+        return None
+    return checkpoint
+
+def save_checkpoint(csv_file, offset, line_number, imported):
+    """Enregistre l'offset et le numéro de ligne du dernier lot validé, avec la taille et la date du fichier"""
+    path = _checkpoint_path(csv_file)
+    tmp_path = path + '.tmp'
+    stat = os.stat(csv_file)
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'offset': offset, 'ligne': line_number, 'importees': imported,
+                   'taille': stat.st_size, 'modifie': stat.st_mtime_ns}, f)
+    os.replace(tmp_path, path)
+
+def clear_checkpoint(csv_file):
+    path = _checkpoint_path(csv_file)
+    if os.path.exists(path):
+        os.remove(path)
+
+def insert_batch(conn, cursor, batch, idempotent=False, dimensions=None):
+    """
+    Insère un lot de lignes en une seule requête multi-lignes puis valide la transaction
+
+    Si le lot est refusé (trigger, contrainte, doublon d'empreinte...), il est rejoué
+    ligne par ligne pour ne perdre que les lignes fautives. Les cumuls journaliers
+    sont mis à jour dans la même transaction.
+
+    Args:
+        idempotent (bool): Les lignes se terminent par leur empreinte
+        dimensions (DimensionCache, optional): Schéma en étoile : traduit magasins et produits
+                                               en identifiants avant l'insertion
+
+    Returns:
+        int: Nombre de lignes effectivement insérées
+    """
+    if not batch:
+        return 0
+    star = dimensions is not None
+    if star:
+        with span('import.dimensions'):
+            batch = dimensions.resolve(conn, cursor, batch)
+        insert_sql = INSERT_STAR_FINGERPRINT_SQL if idempotent else INSERT_STAR_SQL
+    else:
+        insert_sql = INSERT_FINGERPRINT_SQL if idempotent else INSERT_SQL
+    try:
+        with span('import.insertion') as current:
+            cursor.executemany(insert_sql, batch)
+            update_rollups(cursor, batch, star)
+            current.add_rows(len(batch))
+        with span('import.commit'):
+            conn.commit()
+        return len(batch)
+    except DatabaseError as err:
+        conn.rollback()
+        print(f"Lot refusé ({err}), nouvel essai ligne par ligne...")
+
+    inserted = []
+    for values in batch:
+        try:
+            cursor.execute(insert_sql, values)
+            inserted.append(values)
+        except DatabaseError as err:
+            print(f"Erreur lors de l'insertion de la ligne {values}: {err}")
+    update_rollups(cursor, inserted, star)
+    conn.commit()
+    return len(inserted)
+
+def validate_batch(validator, batch, sources, reject_file):
+    """
+    Écarte d'un lot les lignes refusées par le validateur (voir validation.py)
+
+    Args:
+        sources (list): (position, valeurs d'origine) de chaque ligne du lot
+        reject_file (RejectFile): Fichier où écrire les lignes refusées
+
+    Returns:
+        tuple: (lignes valides, nombre de lignes refusées)
+    """
+    with span('import.validation') as current:
+        clean, refused = validator.split(batch)
+        current.add_rows(len(batch))
+    for index, reason in refused:
+        position, values = sources[index]
+        reject_file.write(position, reason, values)
+    return clean, len(refused)
+
+def print_rejections(validator, reject_files):
+    """Résume les motifs de rejet et le débit de la validation"""
+    if validator.rows:
+        print(f"Validation: {validator.rows} lignes contrôlées ({validator.rate():,.0f} lignes/s)")
+    if validator.reasons:
+        print("Motifs de rejet: " + ', '.join(f"{reason} ({count})"
+                                              for reason, count in validator.reasons.most_common()))
+    for reject_file in reject_files:
+        if reject_file.count:
+            print(f"{reject_file.count} lignes rejetées écrites dans {reject_file.path}")
+
+@traced('import.import_data')
+def import_data(csv_file, batch_size=IMPORT_BATCH_SIZE, resume=True, row_by_row=False, db_config=None,
+                idempotent=None, skip_known_files=True, validate=None):
+    """
+    Importe les données du fichier CSV vers la base de données
+
+    Le fichier est lu en flux et envoyé par lots de batch_size lignes ; chaque lot
+    est validé séparément et un point de reprise (offset en octets + numéro de ligne)
+    est écrit à côté du CSV, ce qui permet de reprendre un import interrompu.
+
+    Avant l'envoi, chaque lot est contrôlé en entier (validation.py) : seules les
+    lignes valides partent vers la base. Les lignes refusées et les lignes
+    illisibles sont écrites avec leur motif dans <fichier>.rejets.csv.
+
+    En mode idempotent, chaque ligne reçoit une empreinte (fingerprints.py) : les
+    lignes déjà présentes en base sont écartées et un fichier déjà importé en
+    entier n'est pas relu.
+
+    Args:
+        csv_file (str): Chemin du fichier CSV
+        batch_size (int): Nombre de lignes par lot
+        resume (bool): Reprendre depuis le dernier point de reprise s'il existe
+        row_by_row (bool): Ancien mode, un INSERT par ligne et un seul commit final (non idempotent)
+        db_config (dict, optional): Paramètres de connexion (DB_CONFIG par défaut)
+        idempotent (bool, optional): Écarter les doublons (IMPORT_IDEMPOTENT par défaut)
+        skip_known_files (bool): Ignorer un fichier dont le contenu a déjà été importé
+        validate (bool, optional): Valider les lots avant l'envoi (IMPORT_VALIDATION par défaut)
+
+    Returns:
+        dict: Résumé de l'import (lignes importées, rejetées et leurs motifs, doublons,
+              durée, débit de l'import et de la validation) ou None
+    """
+    idempotent = IMPORT_IDEMPOTENT if idempotent is None else idempotent
+    idempotent = idempotent and not row_by_row
+    validate = IMPORT_VALIDATION if validate is None else validate
+
     if not os.path.exists(csv_file):
         print(f"Erreur: Le fichier {csv_file} n'existe pas.")
-        return
-    
+        return None
+
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
+        conn = connect(db_config or DB_CONFIG)
         cursor = conn.cursor()
         print("Connexion à la base de données réussie!")
-        
+
         if not create_tables_if_not_exist(cursor):
             cursor.close()
             conn.close()
-            return
-            
-    except mysql.connector.Error as err:
+            return None
+
+    except DatabaseError as err:
         print(f"Erreur de connexion à la base de données: {err}")
-        return
-    
+        return None
+
+    count = 0
+    rejected = 0
+    duplicates = 0
+    reject_file = None
+    start_time = time.perf_counter()
+
     try:
-        encodings = ['utf-8', 'iso-8859-1', 'latin1', 'cp1252']
-        
-        for encoding in encodings:
-            try:
-                with open(csv_file, 'r', encoding=encoding) as f:
-                    f.read(1024)  
-                print(f"Utilisation de l'encodage {encoding}")
-                break
-            except UnicodeDecodeError:
-                continue
-        
-        with open(csv_file, 'r', encoding=encoding) as f:
-            sample = f.read(1024)
-            f.seek(0)
-            
-            delimiter = ','
-            if sample.count(';') > sample.count(','):
-                delimiter = ';'
-            print(f"Détection du délimiteur: '{delimiter}'")
-            
-            csv_reader = csv.DictReader(f, delimiter=delimiter)
-            count = 0
-            
-            field_names = csv_reader.fieldnames
-            print(f"Colonnes détectées: {field_names}")
-            
-            field_mapping = {}
-            expected_fields = ['Date', 'Magasin', 'Produit', 'Quantité vendue', 'Prix unitaire']
-            
-            for expected in expected_fields:
-                if expected in field_names:
-                    field_mapping[expected] = expected
+        digest = None
+        if idempotent:
+            with span('import.empreinte_fichier'):
+                digest = file_fingerprint(csv_file)
+            if skip_known_files and is_file_imported(cursor, digest):
+                print(f"Le fichier {csv_file} a déjà été importé, rien à faire.")
+                clear_checkpoint(csv_file)
+                return {'fichier': csv_file, 'importees': 0, 'rejetees': 0, 'doublons': 0,
+                        'deja_importe': True, 'duree': time.perf_counter() - start_time,
+                        'lignes_par_seconde': 0.0}
+
+        layout = inspect_csv(csv_file)
+        if layout is None:
+            return None
+        field_names = layout['field_names']
+        field_mapping = layout['field_mapping']
+        date_parser = layout['date_parser']
+        encoding = layout['encoding']
+        delimiter = layout['delimiter']
+        # Le validateur compte aussi les lignes illisibles, même sans validation des lots
+        validator = BatchValidator.for_cursor(cursor) if validate else BatchValidator()
+        dimensions = DimensionCache.for_cursor(cursor) if uses_star_schema(cursor) else None
+
+        with open(csv_file, 'rb') as f:
+            position = {'offset': layout['data_offset']}
+            f.seek(position['offset'])
+
+            line_number = 1
+            # Rangs des lignes identiques : comptés depuis le début du fichier, même en reprise
+            counter = OccurrenceCounter(os.path.getsize(csv_file) - position['offset']) if idempotent else None
+            replay_until = 0
+            checkpoint = load_checkpoint(csv_file) if resume and not row_by_row else None
+            reject_file = RejectFile(csv_file + REJECT_SUFFIX, field_names, delimiter, encoding,
+                                     append=checkpoint is not None)
+            if checkpoint and checkpoint['offset'] >= position['offset']:
+                count = checkpoint['importees']
+                if idempotent:
+                    # Les lignes déjà validées sont relues sans être insérées pour retrouver les rangs
+                    replay_until = checkpoint['offset']
                 else:
-                    for field in field_names:
-                        if expected.lower() in field.lower():
-                            field_mapping[expected] = field
-                            break
-            
-            print(f"Mapping des colonnes: {field_mapping}")
-            
-            if len(field_mapping) < len(expected_fields):
-                missing = [exp for exp in expected_fields if exp not in field_mapping]
-                print(f"Colonnes manquantes: {missing}")
-                print("Assurez-vous que votre CSV contient ces colonnes.")
-                return
-            
-            for row in csv_reader:
-                date = format_date(row[field_mapping['Date']])
-                if date is None:
-                    print(f"Erreur avec la ligne {count+2}: date invalide")
+                    position['offset'] = checkpoint['offset']
+                    line_number = checkpoint['ligne']
+                    f.seek(position['offset'])
+                print(f"Reprise de l'import à la ligne {checkpoint['ligne'] + 1} ({count} lignes déjà importées)")
+
+            csv_reader = csv.reader(_iter_lines(f, encoding, position), delimiter=delimiter)
+            batch = []
+            # Numéro de ligne et valeurs d'origine de chaque ligne du lot (fichier de rejets)
+            sources = []
+            rollup_delta = {}
+            # Temps de lecture/décodage et d'analyse/validation cumulés sur toute la boucle
+            stages = stage_timer('import')
+
+            for values in csv_reader:
+                if stages:
+                    stages.lap('decodage', rows=1)
+                line_number += 1
+                replaying = position['offset'] <= replay_until
+                if not values:
                     continue
-                    
-                magasin = row[field_mapping['Magasin']].strip()
-                produit = row[field_mapping['Produit']].strip()
-                
-                try:
-                    quantite_str = row[field_mapping['Quantité vendue']].replace(' ', '').replace(',', '.')
-                    quantite = int(float(quantite_str))
-                except (ValueError, KeyError):
-                    print(f"Erreur avec la ligne {count+2}: impossible de lire la quantité")
+                if len(values) < len(field_names):
+                    if not replaying:
+                        reject_file.write(line_number, "ligne incomplète", values)
+                        validator.add_parse_error("ligne incomplète")
+                        rejected += 1
+                    if stages:
+                        stages.lap('validation', error=True)
                     continue
-                
+                row = dict(zip(field_names, values))
+
                 try:
-                    prix_str = row[field_mapping['Prix unitaire']].replace(' ', '').replace(',', '.')
-                    prix = float(prix_str)
-                except (ValueError, KeyError):
-                    print(f"Erreur avec la ligne {count+2}: impossible de lire le prix")
+                    parsed = parse_row(row, field_mapping, date_parser)
+                except ValueError as e:
+                    if not replaying:
+                        reject_file.write(line_number, str(e), values)
+                        validator.add_parse_error(str(e))
+                        rejected += 1
+                    if stages:
+                        stages.lap('validation', error=True)
                     continue
-                
-                sql = """
-                INSERT INTO ventes (date, magasin, produit, quantite, prix_unitaire)
-                VALUES (%s, %s, %s, %s, %s)
-                """
-                values = (date, magasin, produit, quantite, prix)
-                
-                try:
-                    cursor.execute(sql, values)
-                    count += 1
-                    if count % 100 == 0:
-                        print(f"{count} lignes importées...")
-                except mysql.connector.Error as err:
-                    print(f"Erreur lors de l'insertion de la ligne {count+1}: {err}")
+                if idempotent:
+                    parsed += (row_fingerprint(row[field_mapping['Date']], parsed, counter),)
+                    if replaying:
+                        continue
+                if stages:
+                    stages.lap('analyse', rows=1)
+
+                if row_by_row:
+                    try:
+                        if dimensions is not None:
+                            parsed = dimensions.resolve(conn, cursor, [parsed])[0]
+                        cursor.execute(INSERT_SQL if dimensions is None else INSERT_STAR_SQL, parsed)
+                        add_to_rollup(rollup_delta, parsed)
+                        count += 1
+                        if count % 100 == 0:
+                            print(f"{count} lignes importées...")
+                    except DatabaseError as err:
+                        print(f"Erreur lors de l'insertion de la ligne {line_number}: {err}")
                     continue
-            
+
+                batch.append(parsed)
+                sources.append((line_number, values))
+                if len(batch) >= batch_size:
+                    if validate:
+                        batch, refused = validate_batch(validator, batch, sources, reject_file)
+                        rejected += refused
+                    if idempotent:
+                        with span('import.doublons'):
+                            batch, known = drop_known_rows(cursor, batch)
+                        duplicates += known
+                    count += insert_batch(conn, cursor, batch, idempotent, dimensions)
+                    save_checkpoint(csv_file, position['offset'], line_number, count)
+                    batch = []
+                    sources = []
+                    elapsed = time.perf_counter() - start_time
+                    print(f"{count} lignes importées... ({count / elapsed:.0f} lignes/s)")
+                    if stages:
+                        stages.skip()
+
+            if batch and validate:
+                batch, refused = validate_batch(validator, batch, sources, reject_file)
+                rejected += refused
+            if batch and idempotent:
+                with span('import.doublons'):
+                    batch, known = drop_known_rows(cursor, batch)
+                duplicates += known
+            if batch:
+                count += insert_batch(conn, cursor, batch, idempotent, dimensions)
+            apply_rollup_delta(cursor, rollup_delta, dimensions is not None)
+            if idempotent:
+                record_imported_file(cursor, digest, csv_file, count)
             conn.commit()
-            print(f"Importation terminée! {count} lignes importées avec succès.")
-    
+            with span('import.statistiques'):
+                backend_of(cursor).update_statistics(cursor)
+                conn.commit()
+            clear_checkpoint(csv_file)
+            reject_file.close()
+            if stages:
+                stages.flush()
+
+            elapsed = time.perf_counter() - start_time
+            rate = count / elapsed if elapsed > 0 else 0.0
+            print(f"Importation terminée! {count} lignes importées avec succès "
+                  f"({rejected} rejetées, {duplicates} doublons écartés, {elapsed:.1f} s, {rate:.0f} lignes/s).")
+            print_rejections(validator, [reject_file])
+
+            return {
+                'fichier': csv_file,
+                'importees': count,
+                'rejetees': rejected,
+                'motifs': dict(validator.reasons),
+                'fichier_rejets': reject_file.path if reject_file.count else None,
+                'doublons': duplicates,
+                'duree': elapsed,
+                'lignes_par_seconde': rate,
+                'validation_lignes_par_seconde': validator.rate()
+            }
+
     except Exception as e:
         print(f"Erreur lors de l'importation: {e}")
-    
+        if count:
+            print("Les lots déjà validés sont conservés ; relancez l'import pour reprendre.")
+        return None
+
     finally:
+        if reject_file is not None:
+            reject_file.close()
         cursor.close()
         conn.close()
         print("Connexion fermée.")
 
+def expand_csv_paths(patterns):
+    """Transforme une liste de fichiers, dossiers ou motifs glob en liste de CSV"""
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths.extend(sorted(glob.glob(os.path.join(pattern, '*.csv'))))
+        elif glob.has_magic(pattern):
+            paths.extend(sorted(glob.glob(pattern)))
+        else:
+            paths.append(pattern)
+    return paths
+
+def _split_ranges(csv_file, data_offset, chunk_bytes):
+    """Découpe la partie données du fichier en plages d'octets d'environ chunk_bytes"""
+    size = os.path.getsize(csv_file)
+    ranges = []
+    start = data_offset
+    while start < size:
+        end = min(start + chunk_bytes, size)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+def _parse_range(csv_file, layout, start, end, idempotent=False, validator=None):
+    """
+    Lit et nettoie les lignes qui commencent dans la plage [start, end[ du fichier
+
+    Exécutée dans un processus du pool. Une plage qui ne débute pas sur un début de
+    ligne saute la ligne entamée, traitée par la plage précédente (les champs
+    contenant des retours à la ligne ne sont donc pas pris en charge dans ce mode).
+    En mode idempotent, chaque ligne lue porte le hachage de son contenu ; le rang
+    parmi les lignes identiques, qui dépend de tout ce qui précède dans le fichier,
+    est appliqué ensuite par rank_rows dans le processus principal.
+    Avec un validateur, toute la plage est validée en une fois ; les lignes
+    refusées sont relues dans le fichier pour le fichier de rejets.
+
+    Returns:
+        tuple: (lignes valides, hachages de contenu de toutes les lignes lues (idempotent),
+               rejets (position en octets, motif, valeurs d'origine), validateur avec ses
+               compteurs, mesures des étapes si l'instrumentation est active) ; en mode
+               idempotent, chaque ligne valide se termine par l'indice de son hachage
+    """
+    field_names = layout['field_names']
+    field_mapping = layout['field_mapping']
+    date_parser = layout['date_parser']
+    encoding = layout['encoding']
+    delimiter = layout['delimiter']
+
+    rows = []
+    # Position en octets du début de chaque ligne retenue
+    offsets = array('q')
+    rejects = []
+    validate = validator is not None
+    # Sans validation des lots, le validateur ne sert qu'à compter les lignes illisibles
+    validator = validator if validate else BatchValidator()
+    stages = stage_timer('import')
+    # Hachages de toutes les lignes lues, refusées par la validation comprises (comme import_data)
+    keys = array('Q')
+    date_field = field_mapping['Date']
+
+    with open(csv_file, 'rb') as f:
+        if start > layout['data_offset']:
+            f.seek(start - 1)
+            f.readline()
+        else:
+            f.seek(start)
+        position = {'offset': f.tell()}
+
+        def lines():
+            while position['offset'] < end:
+                raw = f.readline()
+                if not raw:
+                    break
+                position['offset'] += len(raw)
+                yield raw.decode(encoding)
+
+        line_start = position['offset']
+        for values in csv.reader(lines(), delimiter=delimiter):
+            if stages:
+                stages.lap('decodage', rows=1)
+            if not values:
+                line_start = position['offset']
+                continue
+            try:
+                if len(values) < len(field_names):
+                    raise ValueError("ligne incomplète")
+                row = dict(zip(field_names, values))
+                parsed = parse_row(row, field_mapping, date_parser)
+                if idempotent:
+                    parsed += (len(keys),)
+                    keys.append(content_key(row[date_field], parsed))
+                rows.append(parsed)
+                offsets.append(line_start)
+                if stages:
+                    stages.lap('analyse', rows=1)
+            except ValueError as e:
+                rejects.append((line_start, str(e), values))
+                validator.add_parse_error(str(e))
+                if stages:
+                    stages.lap('validation', error=True)
+            line_start = position['offset']
+
+        if validate and rows:
+            rows, refused = validator.split(rows)
+            for index, reason in refused:
+                f.seek(offsets[index])
+                values = next(csv.reader([f.readline().decode(encoding)], delimiter=delimiter))
+                rejects.append((offsets[index], reason, values))
+    rejects.sort(key=lambda reject: reject[0])
+
+    return rows, keys, rejects, validator, stages.entries() if stages else []
+
+def rank_rows(rows, keys, counter):
+    """
+    Remplace l'indice de hachage des lignes d'une plage (_parse_range) par leur empreinte
+
+    Les plages d'un fichier doivent passer dans l'ordre du fichier avec le même
+    compteur : les rangs, donc les empreintes, sont alors ceux d'import_data,
+    quel que soit le découpage en plages.
+    """
+    ranks = [counter.rank(key) for key in keys]
+    return [row[:-1] + (ranked_fingerprint(keys[row[-1]], ranks[row[-1]]),) for row in rows]
+
+def _writer_loop(tasks, stats, lock, db_config, idempotent=False, star=False):
+    """Thread d'écriture : vide la file des lots avec sa propre connexion"""
+    conn = connect(db_config)
+    cursor = conn.cursor()
+    try:
+        # Cache propre à chaque écrivain : les ajouts concurrents sont réglés par INSERT IGNORE
+        dimensions = DimensionCache.for_cursor(cursor) if star else None
+        while True:
+            item = tasks.get()
+            if item is None:
+                break
+            csv_file, batch = item
+            known = 0
+            failed = False
+            try:
+                if idempotent:
+                    with span('import.doublons'):
+                        fresh, known = drop_known_rows(cursor, batch)
+                else:
+                    fresh = batch
+                inserted = insert_batch(conn, cursor, fresh, idempotent, dimensions)
+            except DatabaseError as err:
+                print(f"Erreur lors de l'écriture d'un lot de {csv_file}: {err}")
+                conn.rollback()
+                inserted = 0
+                failed = True
+            with lock:
+                file_stats = stats[csv_file]
+                file_stats['importees'] += inserted
+                file_stats['doublons'] += known
+                file_stats['rejetees'] += len(batch) - known - inserted
+                file_stats['echecs'] += failed
+                file_stats['fin'] = time.perf_counter()
+    finally:
+        cursor.close()
+        conn.close()
+
+@traced('import.import_files')
+def import_files(patterns, workers=None, writers=IMPORT_WRITERS, batch_size=IMPORT_BATCH_SIZE,
+                 chunk_bytes=IMPORT_CHUNK_BYTES, db_config=None, idempotent=None, skip_known_files=True,
+                 validate=None):
+    """
+    Importe plusieurs fichiers CSV en parallèle
+
+    La lecture, le nettoyage et la validation des lignes (dates, quantités, prix,
+    colonnes, règles de validation.py) sont répartis par plages d'octets sur un
+    ProcessPoolExecutor ; les lots valides sont ensuite écrits par un nombre borné
+    de connexions (writers), alimentées par une file de taille limitée pour que la
+    lecture ne prenne pas trop d'avance. Le mode idempotent est celui d'import_data :
+    doublons écartés, fichiers déjà importés ignorés. Les plages d'un fichier sont
+    traitées dans l'ordre du fichier pour que les rangs des lignes identiques, donc
+    les empreintes, soient ceux d'import_data quel que soit chunk_bytes. Les lignes
+    refusées sont écrites dans <fichier>.rejets.csv, repérées par leur position en
+    octets.
+
+    Args:
+        patterns (list): Fichiers, dossiers ou motifs glob à importer
+        workers (int, optional): Nombre de processus de lecture (nombre de cœurs par défaut)
+        writers (int): Nombre de connexions d'écriture simultanées
+        batch_size (int): Nombre de lignes par lot inséré
+        chunk_bytes (int): Taille des plages d'octets confiées à chaque processus
+        db_config (dict, optional): Paramètres de connexion (DB_CONFIG par défaut)
+        idempotent (bool, optional): Écarter les doublons (IMPORT_IDEMPOTENT par défaut)
+        skip_known_files (bool): Ignorer les fichiers dont le contenu a déjà été importé
+        validate (bool, optional): Valider les lignes avant l'envoi (IMPORT_VALIDATION par défaut)
+
+    Returns:
+        dict: Résumé par fichier (lignes importées, rejetées et leurs motifs, doublons, durée, débit)
+    """
+    db_config = db_config or DB_CONFIG
+    idempotent = IMPORT_IDEMPOTENT if idempotent is None else idempotent
+    validate = IMPORT_VALIDATION if validate is None else validate
+    workers = workers or os.cpu_count() or 1
+    csv_files = [path for path in expand_csv_paths(patterns) if os.path.exists(path)]
+    if not csv_files:
+        print("Aucun fichier CSV à importer.")
+        return {}
+
+    digests = {}
+    validator = None
+    star = False
+    try:
+        conn = connect(db_config)
+        cursor = conn.cursor()
+        ok = create_tables_if_not_exist(cursor)
+        star = ok and uses_star_schema(cursor)
+        if ok and validate:
+            # Copié dans chaque processus de lecture, qui renvoie ses compteurs
+            validator = BatchValidator.for_cursor(cursor)
+        if ok and idempotent:
+            for csv_file in csv_files:
+                digests[csv_file] = file_fingerprint(csv_file)
+                if skip_known_files and is_file_imported(cursor, digests[csv_file]):
+                    print(f"Le fichier {csv_file} a déjà été importé, il est ignoré.")
+                    del digests[csv_file]
+            csv_files = [csv_file for csv_file in csv_files if csv_file in digests]
+        cursor.close()
+        conn.close()
+        if not ok:
+            return {}
+    except DatabaseError as err:
+        print(f"Erreur de connexion à la base de données: {err}")
+        return {}
+
+    stats = {}
+    reject_files = {}
+    totals = BatchValidator()
+    lock = threading.Lock()
+    pending_ranges = []
+    # Rangs des lignes identiques, comptés sur tout le fichier dans l'ordre du fichier
+    counters = {}
+    for csv_file in csv_files:
+        print(f"Préparation du fichier: {csv_file}")
+        layout = inspect_csv(csv_file)
+        if layout is None:
+            continue
+        stats[csv_file] = {'importees': 0, 'rejetees': 0, 'doublons': 0, 'echecs': 0, 'motifs': {},
+                           'debut': None, 'fin': None}
+        reject_files[csv_file] = RejectFile(csv_file + REJECT_SUFFIX, layout['field_names'], layout['delimiter'],
+                                            layout['encoding'], position='octet')
+        if idempotent:
+            counters[csv_file] = OccurrenceCounter(os.path.getsize(csv_file) - layout['data_offset'])
+        for index, (start, end) in enumerate(_split_ranges(csv_file, layout['data_offset'], chunk_bytes)):
+            pending_ranges.append((csv_file, layout, index, start, end))
+
+    tasks = queue.Queue(maxsize=writers * 4)
+    writer_threads = [threading.Thread(target=_writer_loop, args=(tasks, stats, lock, db_config, idempotent, star),
+                                       daemon=True)
+                      for _ in range(writers)]
+    for thread in writer_threads:
+        thread.start()
+
+    start_time = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        running = {}
+        # Plages lues qui attendent que les plages précédentes du même fichier soient traitées
+        finished = {}
+        next_range = {csv_file: 0 for csv_file in stats}
+        pending_ranges.reverse()
+
+        while pending_ranges or running:
+            # Au plus deux plages en cours ou en attente par processus pour borner la mémoire
+            while pending_ranges and len(running) + len(finished) < workers * 2:
+                csv_file, layout, index, start, end = pending_ranges.pop()
+                with lock:
+                    if stats[csv_file]['debut'] is None:
+                        stats[csv_file]['debut'] = time.perf_counter()
+                running[executor.submit(_parse_range, csv_file, layout, start, end, idempotent,
+                                        validator)] = (csv_file, index)
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                csv_file, index = running.pop(future)
+                try:
+                    finished[csv_file, index] = future.result()
+                except Exception as e:
+                    print(f"Erreur lors de la lecture de {csv_file}: {e}")
+                    with lock:
+                        stats[csv_file]['echecs'] += 1
+                    finished[csv_file, index] = None
+
+            for csv_file in sorted({key[0] for key in finished}):
+                while (csv_file, next_range[csv_file]) in finished:
+                    result = finished.pop((csv_file, next_range[csv_file]))
+                    next_range[csv_file] += 1
+                    if result is None:
+                        continue
+                    rows, keys, rejects, range_validator, timings = result
+                    if idempotent:
+                        rows = rank_rows(rows, keys, counters[csv_file])
+                    # Les étapes mesurées dans le processus de lecture sont reportées ici
+                    for entry in timings:
+                        record(*entry)
+                    if range_validator.rows:
+                        record('import.validation', range_validator.elapsed, rows=range_validator.rows)
+                    totals.merge(range_validator)
+                    for offset, reason, values in rejects:
+                        reject_files[csv_file].write(offset, reason, values)
+                    with lock:
+                        stats[csv_file]['rejetees'] += len(rejects)
+                        motifs = stats[csv_file]['motifs']
+                        for _, reason, _ in rejects:
+                            motifs[reason] = motifs.get(reason, 0) + 1
+                    for i in range(0, len(rows), batch_size):
+                        # Temps passé à attendre une place dans la file : écrivains saturés
+                        with span('import.attente_ecriture'):
+                            tasks.put((csv_file, rows[i:i + batch_size]))
+
+    for _ in writer_threads:
+        tasks.put(None)
+    for thread in writer_threads:
+        thread.join()
+    for reject_file in reject_files.values():
+        reject_file.close()
+
+    if stats:
+        try:
+            conn = connect(db_config)
+            cursor = conn.cursor()
+            if idempotent:
+                # Seuls les fichiers importés sans erreur d'écriture sont considérés comme acquis
+                for csv_file, file_stats in stats.items():
+                    if not file_stats['echecs']:
+                        record_imported_file(cursor, digests[csv_file], csv_file, file_stats['importees'])
+                conn.commit()
+            with span('import.statistiques'):
+                backend_of(cursor).update_statistics(cursor)
+                conn.commit()
+            cursor.close()
+            conn.close()
+        except DatabaseError as err:
+            print(f"Erreur lors de la finalisation de l'import: {err}")
+
+    total_elapsed = time.perf_counter() - start_time
+    total_rows = 0
+    print("\n=== Résumé de l'import ===")
+    for csv_file, file_stats in stats.items():
+        elapsed = (file_stats['fin'] or time.perf_counter()) - (file_stats['debut'] or start_time)
+        file_stats['duree'] = elapsed
+        file_stats['lignes_par_seconde'] = file_stats['importees'] / elapsed if elapsed > 0 else 0.0
+        total_rows += file_stats['importees']
+        print(f"{os.path.basename(csv_file)}: {file_stats['importees']} importées, "
+              f"{file_stats['rejetees']} rejetées, {file_stats['doublons']} doublons, "
+              f"{file_stats['lignes_par_seconde']:.0f} lignes/s")
+    print(f"Total: {total_rows} lignes en {total_elapsed:.1f} s "
+          f"({total_rows / total_elapsed if total_elapsed > 0 else 0:.0f} lignes/s, "
+          f"{workers} processus, {writers} connexions d'écriture)")
+    print_rejections(totals, reject_files.values())
+
+    return stats
+
 if __name__ == "__main__":
     script_dir = os.path.dirname(os.path.abspath(__file__))
     project_dir = os.path.dirname(script_dir)
-    
+
     csv_file = os.path.join(project_dir, 'donnees_ventes.csv')
-    
-    if len(sys.argv) > 1:
-        csv_file = sys.argv[1]
-    
-    print(f"Importation du fichier: {csv_file}")
-    
-    import_data(csv_file)
-    print("Script d'importation terminé!")
\ No newline at end of file
+
+    with instrumented_run('import'):
+        # Plusieurs fichiers, un dossier ou un motif glob : import parallèle
+        targets = sys.argv[1:]
+        if len(targets) > 1 or (targets and (os.path.isdir(targets[0]) or glob.has_magic(targets[0]))):
+            print(f"Importation parallèle de: {', '.join(targets)}")
+            import_files(targets)
+        else:
+            if targets:
+                csv_file = targets[0]
+
+            print(f"Importation du fichier: {csv_file}")
+
+            import_data(csv_file)
+    print("Script d'importation terminé!")
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Service d'ingestion : surveille un dossier de dépôt et importe les CSV qui y arrivent
+
+Remplace l'enchaînement manuel import_csv.py puis analysis.py. Le service tourne
+en continu sur une boucle asyncio :
+    - le guetteur parcourt le dossier toutes les INGESTION_POLL_INTERVAL secondes et
+      place dans une file bornée chaque nouveau CSV dont la taille ne bouge plus
+      (fichier entièrement copié) ; file pleine, il attend : la lecture du dossier
+      ne prend pas d'avance sur l'import ;
+    - l'importeur vide la file, fichier par fichier (import_data, idempotent), puis
+      range le fichier, avec son fichier de rejets, dans importes/ ou erreurs/ ;
+    - le rapporteur régénère rapport_ventes.json et dashboard_data.js au plus une
+      fois par INGESTION_REPORT_INTERVAL secondes : une rafale de fichiers ne
+      déclenche qu'une régénération, après le dernier import de l'intervalle.
+
+Le SalesAnalyzer (connexion, cache des résultats, pandas déjà importé) est créé
+une fois et réutilisé d'une régénération à l'autre. Les traitements bloquants
+(import, rapports) s'exécutent dans des threads, la boucle reste disponible pour
+le guetteur et les mesures.
+
+Mesures (get_metrics, et INGESTION_METRICS_PATH au format texte de Prometheus,
+réécrit à chaque tour du guetteur) : profondeur de la file, retard entre le dépôt
+d'un fichier et son import, retard des rapports sur le dernier import, fichiers
+importés et en erreur.
+
+Usage: python backend/ingestion.py [dossier_de_depot]
+"""
+
+import asyncio
+import os
+import shutil
+import signal
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+from analysis import SalesAnalyzer
+from config import (DB_CONFIG, INGESTION_DIR, INGESTION_METRICS_PATH, INGESTION_POLL_INTERVAL,
+                    INGESTION_QUEUE_SIZE, INGESTION_REPORT_INTERVAL)
+from database import DatabaseManager
+from import_csv import CHECKPOINT_SUFFIX, import_data
+from instrumentation import record
+from validation import REJECT_SUFFIX
+
+DONE_DIR = 'importes'
+ERROR_DIR = 'erreurs'
+
+class IngestionService:
+    """
+    Ingestion continue d'un dossier de dépôt (voir l'en-tête du module)
+
+    Args:
+        drop_dir (str): Dossier surveillé
+        db_config (dict, optional): Paramètres de connexion (DB_CONFIG par défaut)
+        queue_size (int): Fichiers en attente d'import au maximum
+        poll_interval (float): Secondes entre deux parcours du dossier
+        report_interval (float): Secondes minimales entre deux régénérations des rapports
+        analyzer (SalesAnalyzer, optional): Analyseur réutilisé pour les rapports
+    """
+
+    def __init__(self, drop_dir=INGESTION_DIR, db_config=None, queue_size=INGESTION_QUEUE_SIZE,
+                 poll_interval=INGESTION_POLL_INTERVAL, report_interval=INGESTION_REPORT_INTERVAL,
+                 analyzer=None, metrics_path=INGESTION_METRICS_PATH):
+        self.drop_dir = drop_dir
+        self.db_config = db_config or DB_CONFIG
+        self.queue_size = queue_size
+        self.poll_interval = poll_interval
+        self.report_interval = report_interval
+        self.metrics_path = metrics_path
+        self.analyzer = analyzer
+        # Un thread pour les imports, un pour les rapports : ils peuvent se chevaucher
+        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='ingestion')
+        self.queue = None
+        self.stopping = None
+        self.reports_due = None
+        self.closing = False
+        # Fichiers vus au parcours précédent (chemin -> (taille, date de modification))
+        self.candidates = {}
+        # Fichiers en file ou en cours d'import
+        self.pending = set()
+        self.last_report = 0.0
+        self.first_unreported = None
+        self.metrics = {'fichiers_importes': 0, 'fichiers_en_erreur': 0, 'lignes_importees': 0,
+                        'lignes_rejetees': 0, 'doublons': 0, 'rapports_generes': 0, 'retard_import': 0.0,
+                        'retard_import_max': 0.0, 'retard_rapport': 0.0, 'dernier_import': None,
+                        'dernier_rapport': None}
+
+    def get_metrics(self):
+        metrics = dict(self.metrics)
+        metrics['profondeur_file'] = self.queue.qsize() if self.queue is not None else 0
+        metrics['capacite_file'] = self.queue_size
+        metrics['fichiers_en_attente'] = len(self.pending)
+        # Retard courant des rapports : ventes importées mais pas encore publiées
+        metrics['rapport_en_retard_de'] = (time.time() - self.first_unreported
+                                           if self.first_unreported is not None else 0.0)
+        return metrics
+
+    def prometheus_text(self, prefix='ventes_ingestion'):
+        lines = []
+        for name, value in sorted(self.get_metrics().items()):
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                lines.append(f"{prefix}_{name} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def write_metrics(self):
+        if not self.metrics_path:
+            return
+        os.makedirs(os.path.dirname(self.metrics_path), exist_ok=True)
+        tmp_path = self.metrics_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, self.metrics_path)
+
+    def scan(self):
+        """
+        CSV du dossier prêts à être importés : présents au parcours précédent avec la
+        même taille et la même date de modification (copie terminée)
+        """
+        ready = []
+        seen = {}
+        with os.scandir(self.drop_dir) as entries:
+            for entry in entries:
+                if not entry.is_file() or not entry.name.lower().endswith('.csv'):
+                    continue
+                if entry.name.endswith(REJECT_SUFFIX):
+                    continue
+                if entry.path in self.pending:
+                    continue
+                stat = entry.stat()
+                seen[entry.path] = (stat.st_size, stat.st_mtime)
+                if self.candidates.get(entry.path) == seen[entry.path]:
+                    ready.append((stat.st_mtime, entry.path))
+        self.candidates = seen
+        # Ordre de dépôt
+        return [path for _, path in sorted(ready)]
+
+    async def watch(self):
+        """Guetteur : alimente la file avec les fichiers déposés"""
+        while not self.stopping.is_set():
+            try:
+                ready = self.scan()
+            except OSError as e:
+                print(f"Erreur lors du parcours de {self.drop_dir}: {e}")
+                ready = []
+            for path in ready:
+                self.pending.add(path)
+                self.candidates.pop(path, None)
+                # File pleine : on attend que l'importeur libère une place
+                await self.queue.put((path, time.time()))
+            self.write_metrics()
+            try:
+                await asyncio.wait_for(self.stopping.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _move(self, path, folder):
+        target_dir = os.path.join(self.drop_dir, folder)
+        os.makedirs(target_dir, exist_ok=True)
+        target = os.path.join(target_dir, os.path.basename(path))
+        if os.path.exists(target):
+            stem, extension = os.path.splitext(os.path.basename(path))
+            target = os.path.join(target_dir, f"{stem}-{time.strftime('%Y%m%d-%H%M%S')}{extension}")
+        shutil.move(path, target)
+        # Le fichier de rejets et le point de reprise suivent le CSV : un fichier corrigé
+        # déposé plus tard sous le même nom ne doit pas reprendre à l'offset de celui-ci
+        for companion in (REJECT_SUFFIX, CHECKPOINT_SUFFIX):
+            if os.path.exists(path + companion):
+                shutil.move(path + companion, target + companion)
+
+    async def ingest(self):
+        """Importeur : importe les fichiers de la file un par un"""
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self.queue.get()
+            if item is None:
+                break
+            path, queued_at = item
+            try:
+                landed_at = os.path.getmtime(path)
+            except OSError:
+                landed_at = queued_at
+            print(f"[ingestion] Import de {os.path.basename(path)} "
+                  f"({self.queue.qsize()} fichier(s) en attente)")
+            try:
+                summary = await loop.run_in_executor(
+                    self.executor, lambda: import_data(path, db_config=self.db_config))
+            except Exception as e:
+                print(f"[ingestion] Erreur lors de l'import de {path}: {e}")
+                summary = None
+
+            lag = time.time() - landed_at
+            record('ingestion.retard_import', lag, rows=summary['importees'] if summary else 0,
+                   errors=int(summary is None))
+            self.metrics['retard_import'] = lag
+            self.metrics['retard_import_max'] = max(self.metrics['retard_import_max'], lag)
+            try:
+                if summary is None:
+                    self.metrics['fichiers_en_erreur'] += 1
+                    self._move(path, ERROR_DIR)
+                else:
+                    self.metrics['fichiers_importes'] += 1
+                    self.metrics['lignes_importees'] += summary['importees']
+                    self.metrics['lignes_rejetees'] += summary['rejetees']
+                    self.metrics['doublons'] += summary.get('doublons', 0)
+                    self.metrics['dernier_import'] = time.time()
+                    self._move(path, DONE_DIR)
+                    if summary['importees']:
+                        if self.first_unreported is None:
+                            self.first_unreported = time.time()
+                        self.reports_due.set()
+            except OSError as e:
+                print(f"[ingestion] Impossible de ranger {path}: {e}")
+            finally:
+                self.pending.discard(path)
+                self.queue.task_done()
+
+    def regenerate_reports(self):
+        """Régénère le rapport JSON et les données du tableau de bord (thread des rapports)"""
+        if self.analyzer is None:
+            self.analyzer = SalesAnalyzer(db_manager=DatabaseManager(self.db_config))
+        self.analyzer.generate_full_report(output_format='json')
+        self.analyzer.export_data_for_dashboard()
+
+    async def report(self):
+        """Rapporteur : une régénération au plus par intervalle, quel que soit le nombre d'imports"""
+        loop = asyncio.get_running_loop()
+        while True:
+            # À l'arrêt, plus rien ne positionne reports_due : les imports restants sont
+            # publiés sans l'attendre
+            if not self.closing:
+                await self.reports_due.wait()
+            if self.closing and self.first_unreported is None:
+                break
+            # Les imports qui arrivent pendant l'attente sont regroupés dans la même régénération
+            delay = self.last_report + self.report_interval - time.monotonic()
+            if delay > 0 and not self.stopping.is_set():
+                try:
+                    await asyncio.wait_for(self.stopping.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+            self.reports_due.clear()
+            waiting_since = self.first_unreported
+            self.first_unreported = None
+            start = time.perf_counter()
+            try:
+                await loop.run_in_executor(self.executor, self.regenerate_reports)
+            except Exception as e:
+                print(f"[ingestion] Erreur lors de la régénération des rapports: {e}")
+            self.last_report = time.monotonic()
+            self.metrics['rapports_generes'] += 1
+            self.metrics['dernier_rapport'] = time.time()
+            if waiting_since is not None:
+                self.metrics['retard_rapport'] = time.time() - waiting_since
+            print(f"[ingestion] Rapports régénérés en {time.perf_counter() - start:.1f} s")
+
+    def stop(self):
+        """Arrêt propre : le fichier en cours est terminé, la file vidée puis les rapports régénérés"""
+        if self.stopping is not None:
+            self.stopping.set()
+
+    async def run(self):
+        os.makedirs(self.drop_dir, exist_ok=True)
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.stopping = asyncio.Event()
+        self.reports_due = asyncio.Event()
+
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError):
+                # Windows, ou boucle hors du thread principal
+                pass
+
+        print(f"[ingestion] Surveillance de {self.drop_dir} (file de {self.queue_size} fichiers, "
+              f"rapports toutes les {self.report_interval:.0f} s au plus)")
+        importer = asyncio.create_task(self.ingest())
+        reporter = asyncio.create_task(self.report())
+        await self.watch()
+
+        await self.queue.put(None)
+        await importer
+        # Dernière régénération si des ventes importées n'ont pas encore été publiées
+        self.closing = True
+        self.reports_due.set()
+        await reporter
+        self.write_metrics()
+        self.executor.shutdown(wait=True)
+        if self.analyzer is not None:
+            self.analyzer.db.disconnect()
+        print("[ingestion] Service arrêté.")
+
+if __name__ == "__main__":
+    drop_dir = sys.argv[1] if len(sys.argv) > 1 else INGESTION_DIR
+    asyncio.run(IngestionService(drop_dir).run())
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Mesures de temps et de volumes sur les chemins critiques du backend
+
+Les "spans" chronométrent un bloc de code (requête, étape d'import, méthode
+d'analyse, rendu PDF) et comptent les lignes traitées. Chaque span alimente :
+    - des statistiques cumulées par nom (nombre, durée totale et max, lignes, erreurs),
+      exportables au format texte de Prometheus ;
+    - un journal d'événements JSON (un objet par ligne), borné en mémoire.
+
+Désactivée par défaut (VENTES_INSTRUMENTATION=1 ou enable() pour l'activer),
+l'instrumentation se réduit alors à un test de booléen par appel.
+
+Profilage : avec VENTES_PROFIL=cprofile ou VENTES_PROFIL=echantillons, les
+scripts enveloppés dans instrumented_run() écrivent aussi un profil complet
+(fichier .prof pour pstats/snakeviz) ou un profil par échantillonnage (piles
+agrégées au format flamegraph).
+"""
+
+import cProfile
+import functools
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+from config import INSTRUMENTATION, INSTRUMENTATION_DIR, PROFILE_MODE
+
+MAX_EVENTS = 100000
+
+_enabled = INSTRUMENTATION
+_lock = threading.Lock()
+_stats = {}
+_events = deque(maxlen=MAX_EVENTS)
+_local = threading.local()
+
+def enable(flag=True):
+    global _enabled
+    _enabled = flag
+
+def is_enabled():
+    return _enabled
+
+def reset():
+    with _lock:
+        _stats.clear()
+        _events.clear()
+
+def record(name, duration, rows=0, errors=0, started=None, parent=None):
+    """Enregistre une mesure (utilisé par Span, ou directement pour des durées cumulées)"""
+    with _lock:
+        stat = _stats.get(name)
+        if stat is None:
+            stat = _stats[name] = {'nombre': 0, 'duree_totale': 0.0, 'duree_max': 0.0,
+                                   'lignes': 0, 'erreurs': 0}
+        stat['nombre'] += 1
+        stat['duree_totale'] += duration
+        stat['duree_max'] = max(stat['duree_max'], duration)
+        stat['lignes'] += rows
+        stat['erreurs'] += errors
+        _events.append({
+            'span': name,
+            'debut': started if started is not None else time.time() - duration,
+            'duree': round(duration, 6),
+            'lignes': rows,
+            'erreurs': errors,
+            'parent': parent,
+            'thread': threading.current_thread().name,
+            'pid': os.getpid()
+        })
+
+class Span:
+    """Chronomètre un bloc : with span('db.fetch_all') as s: ... s.add_rows(n)"""
+
+    __slots__ = ('name', 'rows', '_start', '_wall', '_parent')
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = 0
+
+    def add_rows(self, count):
+        self.rows += count
+
+    def __enter__(self):
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        self._parent = stack[-1] if stack else None
+        stack.append(self.name)
+        self._wall = time.time()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self._start
+        _local.stack.pop()
+        record(self.name, duration, self.rows, int(exc_type is not None), self._wall, self._parent)
+        return False
+
+class _NullSpan:
+    """Span inactif : aucune mesure"""
+
+    __slots__ = ()
+
+    def add_rows(self, count):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+def span(name):
+    return Span(name) if _enabled else _NULL_SPAN
+
+def traced(name, rows=None):
+    """
+    Décorateur : mesure chaque appel de la fonction sous le nom donné
+
+    Args:
+        name (str): Nom du span
+        rows (callable, optional): Nombre de lignes à partir du résultat (len, par
+                                   exemple) ; pour un générateur, appliqué à chaque
+                                   élément produit et cumulé
+    """
+    def decorator(func):
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                if not _enabled:
+                    yield from func(*args, **kwargs)
+                    return
+                with Span(name) as current:
+                    for item in func(*args, **kwargs):
+                        if rows is not None:
+                            current.add_rows(rows(item))
+                        yield item
+            return generator_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with Span(name) as current:
+                result = func(*args, **kwargs)
+                if rows is not None and result is not None:
+                    current.add_rows(rows(result))
+                return result
+        return wrapper
+    return decorator
+
+class StageTimer:
+    """
+    Cumule le temps passé dans des étapes entrelacées d'une boucle (lecture,
+    analyse...) sans créer un span par itération : lap(étape) attribue à l'étape
+    le temps écoulé depuis le tour précédent ; flush() enregistre les totaux.
+    """
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.totals = {}
+        self.rows = {}
+        self.errors = {}
+        self._mark = time.perf_counter()
+
+    def lap(self, stage, rows=0, error=False):
+        now = time.perf_counter()
+        self.totals[stage] = self.totals.get(stage, 0.0) + now - self._mark
+        self.rows[stage] = self.rows.get(stage, 0) + rows
+        self.errors[stage] = self.errors.get(stage, 0) + int(error)
+        self._mark = now
+
+    def skip(self):
+        """Ignore le temps écoulé depuis le dernier tour (mesuré ailleurs)"""
+        self._mark = time.perf_counter()
+
+    def entries(self):
+        """Mesures cumulées (nom, durée, lignes, erreurs), transmissibles à record() d'un autre processus"""
+        return [(f"{self.prefix}.{stage}", total, self.rows[stage], self.errors[stage])
+                for stage, total in self.totals.items()]
+
+    def flush(self):
+        for entry in self.entries():
+            record(*entry)
+        self.totals.clear()
+        self.rows.clear()
+        self.errors.clear()
+
+def stage_timer(prefix):
+    """StageTimer si l'instrumentation est active, None sinon (tester avant chaque lap)"""
+    return StageTimer(prefix) if _enabled else None
+
+def get_stats():
+    with _lock:
+        return {name: dict(stat) for name, stat in _stats.items()}
+
+def export_json(path):
+    """Ajoute les événements mémorisés au fichier (JSON, un objet par ligne) et les oublie"""
+    with _lock:
+        events = list(_events)
+        _events.clear()
+    with open(path, 'a', encoding='utf-8') as f:
+        for event in events:
+            f.write(json.dumps(event, ensure_ascii=False) + '\n')
+    return len(events)
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"')
+
+def prometheus_text(prefix='ventes'):
+    """Statistiques des spans au format texte d'exposition de Prometheus"""
+    stats = get_stats()
+    lines = [
+        f"# HELP {prefix}_span_duree_secondes Durée des spans instrumentés",
+        f"# TYPE {prefix}_span_duree_secondes summary"
+    ]
+    for name, stat in sorted(stats.items()):
+        lines.append(f'{prefix}_span_duree_secondes_count{{span="{_label(name)}"}} {stat["nombre"]}')
+        lines.append(f'{prefix}_span_duree_secondes_sum{{span="{_label(name)}"}} {stat["duree_totale"]:.6f}')
+    for metric, key, kind, help_text in [
+        ('span_duree_max_secondes', 'duree_max', 'gauge', "Durée maximale d'un span"),
+        ('span_lignes_total', 'lignes', 'counter', "Lignes traitées dans les spans"),
+        ('span_erreurs_total', 'erreurs', 'counter', "Spans terminés en erreur")
+    ]:
+        lines.append(f"# HELP {prefix}_{metric} {help_text}")
+        lines.append(f"# TYPE {prefix}_{metric} {kind}")
+        for name, stat in sorted(stats.items()):
+            value = f"{stat[key]:.6f}" if isinstance(stat[key], float) else stat[key]
+            lines.append(f'{prefix}_{metric}{{span="{_label(name)}"}} {value}')
+    return '\n'.join(lines) + '\n'
+
+def export_prometheus(path):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(prometheus_text())
+    os.replace(tmp_path, path)
+
+class SamplingProfiler:
+    """
+    Profil par échantillonnage : un thread relève régulièrement la pile de chaque
+    thread et compte les piles identiques (format "a;b;c nombre" de flamegraph.pl)
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                key = ';'.join(reversed(stack))
+                self.samples[key] = self.samples.get(key, 0) + 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='profil-echantillons', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def dump(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in sorted(self.samples.items(), key=lambda item: -item[1]):
+                f.write(f"{stack} {count}\n")
+
+@contextmanager
+def profiling(path, mode='cprofile'):
+    """Profile le bloc et écrit le résultat dans path ('cprofile' ou 'echantillons')"""
+    profiler = cProfile.Profile() if mode == 'cprofile' else SamplingProfiler()
+    if mode == 'cprofile':
+        profiler.enable()
+    else:
+        profiler.start()
+    try:
+        yield profiler
+    finally:
+        if mode == 'cprofile':
+            profiler.disable()
+            profiler.dump_stats(path)
+        else:
+            profiler.stop()
+            profiler.dump(path)
+        print(f"Profil écrit dans {path}")
+
+@contextmanager
+def instrumented_run(run_name, output_dir=INSTRUMENTATION_DIR, profile_mode=PROFILE_MODE):
+    """
+    Enveloppe l'exécution d'un script : profil optionnel, puis écriture des mesures
+    (<run_name>-<horodatage>.jsonl et .prom) si l'instrumentation est active
+    """
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    base = os.path.join(output_dir, f"{run_name}-{stamp}")
+    if _enabled or profile_mode:
+        os.makedirs(output_dir, exist_ok=True)
+
+    try:
+        if profile_mode:
+            extension = 'prof' if profile_mode == 'cprofile' else 'txt'
+            with profiling(f"{base}.{extension}", profile_mode):
+                with span(f"{run_name}.total"):
+                    yield
+        else:
+            with span(f"{run_name}.total"):
+                yield
+    finally:
+        if _enabled:
+            count = export_json(base + '.jsonl')
+            export_prometheus(base + '.prom')
+            print(f"Mesures écrites dans {base}.jsonl ({count} événements) et {base}.prom")
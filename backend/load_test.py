@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test de charge de l'API (backend/api.py)
+
+Envoie des requêtes GET concurrentes sur un mélange de routes et affiche les
+latences p50/p95/p99 et le débit. Avec --conditionnel, chaque client renvoie
+l'ETag reçu (If-None-Match), comme le fait un navigateur qui revalide.
+
+Usage: python backend/load_test.py [url] [nombre de requêtes] [concurrence] [--conditionnel]
+Exemple: python backend/load_test.py http://127.0.0.1:5000 2000 16
+"""
+
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROUTES = [
+    '/api/dashboard',
+    '/api/total',
+    '/api/magasins',
+    '/api/produits?par_page=20',
+    '/api/tendance?periode=mois',
+    '/api/tendance?periode=jour&page=2',
+    '/api/populaires?limite=10',
+    '/api/dashboard?debut=2023-01-01&fin=2023-06-30',
+    '/api/ventes?par_page=500'
+]
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def run_load_test(base_url, total_requests=1000, concurrency=8, conditional=False, routes=ROUTES):
+    """
+    Returns:
+        dict: requetes, erreurs, non_modifiees, duree, requetes_par_seconde, p50/p95/p99 (ms)
+    """
+    etags = {}
+    etags_lock = threading.Lock()
+
+    def one_request(i):
+        route = routes[i % len(routes)]
+        req = urllib.request.Request(base_url.rstrip('/') + route)
+        if conditional:
+            with etags_lock:
+                etag = etags.get(route)
+            if etag:
+                req.add_header('If-None-Match', etag)
+
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=30) as response:
+                response.read()
+                status = response.status
+                etag = response.headers.get('ETag')
+        except urllib.error.HTTPError as e:
+            status = e.code
+            etag = e.headers.get('ETag')
+        except (urllib.error.URLError, OSError):
+            status = None
+            etag = None
+        elapsed = time.perf_counter() - start
+
+        if conditional and etag:
+            with etags_lock:
+                etags[route] = etag
+        return status, elapsed
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(one_request, range(total_requests)))
+    duration = time.perf_counter() - start
+
+    latencies = sorted(elapsed * 1000 for _, elapsed in results)
+    return {
+        'requetes': total_requests,
+        'erreurs': sum(1 for status, _ in results if status not in (200, 304)),
+        'non_modifiees': sum(1 for status, _ in results if status == 304),
+        'duree': duration,
+        'requetes_par_seconde': total_requests / duration if duration else 0.0,
+        'p50': percentile(latencies, 0.50),
+        'p95': percentile(latencies, 0.95),
+        'p99': percentile(latencies, 0.99)
+    }
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    base_url = args[0] if len(args) > 0 else 'http://127.0.0.1:5000'
+    total_requests = int(args[1]) if len(args) > 1 else 1000
+    concurrency = int(args[2]) if len(args) > 2 else 8
+    conditional = '--conditionnel' in sys.argv
+
+    print(f"{total_requests} requêtes sur {base_url} ({concurrency} clients"
+          f"{', requêtes conditionnelles' if conditional else ''})...")
+    stats = run_load_test(base_url, total_requests, concurrency, conditional)
+    print(f"  durée: {stats['duree']:.2f} s, {stats['requetes_par_seconde']:.0f} requêtes/s")
+    print(f"  latence p50: {stats['p50']:.1f} ms, p95: {stats['p95']:.1f} ms, p99: {stats['p99']:.1f} ms")
+    print(f"  304: {stats['non_modifiees']}, erreurs: {stats['erreurs']}")
+    sys.exit(1 if stats['erreurs'] else 0)
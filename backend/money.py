@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Montants en centimes entiers (virgule fixe) de l'import jusqu'à l'affichage
+
+Les prix sont lus du CSV directement en centimes (sans passer par un float),
+les cumuls et les agrégations SQL additionnent des entiers (SUM sur des BIGINT,
+exact sous MySQL comme sous SQLite), les DataFrames portent des colonnes int64
+additionnées par NumPy. La conversion en euros n'a lieu qu'une fois, sur le
+résultat final (to_euros, rows_to_euros) : aucun arrondi ne s'accumule et
+aucun Decimal n'est converti valeur par valeur.
+"""
+
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+import numpy as np
+
+# Prix unitaire et montant d'une ligne de ventes en centimes, dans le dialecte MySQL
+# (CAST ... AS SIGNED est traduit pour SQLite, voir backends.py)
+PRICE_CENTS_SQL = "CAST(ROUND(prix_unitaire * 100) AS SIGNED)"
+AMOUNT_CENTS_SQL = f"quantite * {PRICE_CENTS_SQL}"
+
+# Valeur d'insertion de prix_unitaire à partir d'un paramètre en centimes (produit exact
+# en DECIMAL sous MySQL ; sous SQLite, où la colonne stocke un REAL, ROUND ramène
+# le produit au double le plus proche du prix : 57 centimes donnent 0.57, pas 0.5700000000000001)
+PRICE_FROM_CENTS_SQL = "ROUND(%s * 0.01, 2)"
+
+UNIT = Decimal(1)
+
+def parse_cents(text):
+    """
+    Lit un prix écrit en euros ('12.34', '12,3', '1 299', '-0.5') en centimes entiers
+
+    Au-delà de deux décimales, le prix est arrondi au centime (demi vers le haut,
+    comme une colonne DECIMAL(10, 2)). Lève une ValueError si le texte n'est pas un nombre.
+    """
+    text = text.replace(' ', '').replace(',', '.')
+    sign, digits = (-1, text[1:]) if text[:1] == '-' else (1, text[1:] if text[:1] == '+' else text)
+    units, _, decimals = digits.partition('.')
+    if (units or decimals) and len(decimals) <= 2 and (units + decimals).isascii() \
+            and (units + decimals).isdigit():
+        return sign * (int(units or 0) * 100 + int(decimals.ljust(2, '0')))
+
+    try:
+        value = Decimal(text)
+    except InvalidOperation:
+        raise ValueError(f"montant illisible: {text!r}")
+    if not value.is_finite():
+        raise ValueError(f"montant illisible: {text!r}")
+    return int((value * 100).quantize(UNIT, rounding=ROUND_HALF_UP))
+
+def cents_from_float(values):
+    """Centimes int64 d'une colonne de prix en euros (float) : un seul arrondi vectorisé"""
+    return np.rint(np.asarray(values, dtype=np.float64) * 100).astype(np.int64)
+
+def to_euros(cents):
+    """Conversion finale d'un montant en centimes (int, Decimal entier ou None)"""
+    return None if cents is None else int(cents) / 100
+
+def rows_to_euros(rows, cents_key='total_centimes', euros_key='total_ventes'):
+    """Remplace, dans des lignes de résultat, la colonne en centimes par le montant en euros"""
+    for row in rows:
+        row[euros_key] = to_euros(row.pop(cents_key))
+    return rows
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Partitionnement mensuel de la table ventes (MySQL)
+
+Sous MySQL, ventes est partitionnée par RANGE COLUMNS(date), une partition par
+mois : une requête bornée par des dates (date >= ... AND date <= ...) ne lit
+que les partitions des mois concernés (élagage visible dans la colonne
+partitions d'EXPLAIN). Les partitions sont :
+    - p_anterieur : ventes antérieures à PARTITION_FIRST_MONTH ;
+    - pAAAAMM : un mois, jusqu'à PARTITION_MONTHS_AHEAD mois après le mois courant ;
+    - p_futur : tout le reste (MAXVALUE), normalement vide, les dates futures
+      étant refusées par le trigger et par la validation.
+Chaque import appelle ensure_partitions, qui découpe p_futur pour garder
+d'avance les mois à venir ; l'opération est immédiate tant que p_futur est vide.
+
+MySQL exige que la clé primaire et chaque index unique contiennent la colonne de
+partitionnement : la clé de ventes est (id, date), et l'index des empreintes
+(date, empreinte) commence déjà par la date (fingerprints.py).
+
+SQLite ne partitionne pas : les index couvrants commençant par la date
+(import_csv.VENTES_INDEXES) y bornent de même la lecture aux jours demandés.
+
+Usage:
+    python backend/partitions.py                # liste les partitions de ventes
+    python backend/partitions.py avancer        # crée les partitions des prochains mois
+    python backend/partitions.py partitionner   # partitionne une table ventes existante
+"""
+
+import os
+import sys
+from datetime import date
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+from backends import DatabaseError, backend_of
+from fingerprints import ensure_fingerprint_schema
+
+try:
+    from config import PARTITION_FIRST_MONTH, PARTITION_MONTHS_AHEAD, PARTITION_VENTES
+except ImportError:
+    PARTITION_VENTES = True
+    PARTITION_FIRST_MONTH = '2020-01'
+    PARTITION_MONTHS_AHEAD = 3
+
+PARTITION_COLUMN = 'date'
+FIRST_PARTITION = 'p_anterieur'
+LAST_PARTITION = 'p_futur'
+
+def add_months(month, count):
+    """Mois 'AAAA-MM' décalé de count mois"""
+    year, number = map(int, month.split('-'))
+    index = year * 12 + number - 1 + count
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+def month_range(first, last):
+    """Mois 'AAAA-MM' de first à last inclus"""
+    months = []
+    while first <= last:
+        months.append(first)
+        first = add_months(first, 1)
+    return months
+
+def monthly_partitions(months):
+    """Partitions (nom, borne exclue) d'une liste de mois"""
+    return [(f"p{month.replace('-', '')}", f"{add_months(month, 1)}-01") for month in months]
+
+def horizon(today=None, ahead=PARTITION_MONTHS_AHEAD):
+    """Dernier mois devant disposer de sa partition"""
+    return add_months((today or date.today()).strftime('%Y-%m'), ahead)
+
+def initial_partitions(first=PARTITION_FIRST_MONTH, today=None):
+    """Partitions d'une table ventes à créer : p_anterieur, un mois par partition, p_futur"""
+    return ([(FIRST_PARTITION, f"{first}-01")] + monthly_partitions(month_range(first, horizon(today)))
+            + [(LAST_PARTITION, None)])
+
+def ventes_partitioning(cursor):
+    """Argument partitions de create_table_sql pour ventes (None si désactivé ou non pris en charge)"""
+    if not (PARTITION_VENTES and backend_of(cursor).partitioning):
+        return None
+    return PARTITION_COLUMN, initial_partitions()
+
+def ensure_partitions(cursor, today=None, ahead=PARTITION_MONTHS_AHEAD):
+    """
+    Crée les partitions mensuelles manquantes jusqu'à ahead mois après le mois courant
+
+    Sans effet si ventes n'est pas partitionnée. Un échec (import concurrent qui
+    vient de les créer...) est signalé sans interrompre l'appelant : les ventes
+    concernées iraient simplement dans p_futur.
+
+    Returns:
+        list: Noms des partitions créées
+    """
+    backend = backend_of(cursor)
+    try:
+        names = backend.list_partitions(cursor, 'ventes')
+        if not names or names[-1] != LAST_PARTITION:
+            return []
+        monthly = [name for name in names if name not in (FIRST_PARTITION, LAST_PARTITION)]
+        last = f"{monthly[-1][1:5]}-{monthly[-1][5:7]}" if monthly else add_months(PARTITION_FIRST_MONTH, -1)
+        added = monthly_partitions(month_range(add_months(last, 1), horizon(today, ahead)))
+        if not added:
+            return []
+        cursor.execute(backend.split_partition_sql('ventes', LAST_PARTITION, added + [(LAST_PARTITION, None)]))
+    except DatabaseError as e:
+        print(f"Erreur lors de la création des partitions de 'ventes': {e}")
+        return []
+    print(f"Partitions ajoutées à 'ventes': {', '.join(name for name, _ in added)}")
+    return [name for name, _ in added]
+
+def partition_table(cursor, today=None):
+    """
+    Partitionne une table ventes existante (réécriture complète de la table)
+
+    La clé primaire devient (id, date) ; l'index des empreintes est d'abord mis au
+    format (date, empreinte). Le premier mois partitionné est le plus ancien des
+    données ou PARTITION_FIRST_MONTH.
+
+    Returns:
+        bool: True si la table a été partitionnée
+    """
+    backend = backend_of(cursor)
+    if not backend.partitioning:
+        print(f"Le moteur {backend.name} ne partitionne pas les tables.")
+        return False
+    if backend.list_partitions(cursor, 'ventes'):
+        print("La table 'ventes' est déjà partitionnée.")
+        return False
+
+    cursor.execute(f"SELECT MIN({PARTITION_COLUMN}) FROM ventes")
+    oldest = cursor.fetchone()[0]
+    first = min(PARTITION_FIRST_MONTH, oldest.strftime('%Y-%m')) if oldest else PARTITION_FIRST_MONTH
+    ensure_fingerprint_schema(cursor)
+    print("Partitionnement de la table 'ventes' par mois...")
+    cursor.execute(f"ALTER TABLE ventes DROP PRIMARY KEY, ADD PRIMARY KEY (id, {PARTITION_COLUMN})")
+    cursor.execute(f"ALTER TABLE ventes {backend.partition_clause(PARTITION_COLUMN, initial_partitions(first, today))}")
+    return True
+
+if __name__ == "__main__":
+    from backends import connect
+    from config import DB_CONFIG
+
+    command = sys.argv[1] if len(sys.argv) > 1 else 'lister'
+    try:
+        conn = connect(DB_CONFIG)
+    except DatabaseError as e:
+        print(f"Erreur de connexion à la base de données: {e}")
+        sys.exit(1)
+    cursor = conn.cursor()
+
+    if command == 'partitionner':
+        partition_table(cursor)
+    elif command == 'avancer':
+        ensure_partitions(cursor)
+    names = backend_of(cursor).list_partitions(cursor, 'ventes')
+    if names:
+        print(f"{len(names)} partitions: {names[0]} ... {names[-1]}")
+    else:
+        print("La table 'ventes' n'est pas partitionnée.")
+
+    cursor.close()
+    conn.close()
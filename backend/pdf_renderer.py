@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Rendu PDF côté serveur des rapports produits par PDFExporter.generate_sales_report_data
+
+Les pages sont dessinées avec matplotlib (déjà utilisé par le projet) et son
+moteur PDF, qui produit des documents vectoriels : textes, tableaux et
+graphiques restent nets à tout niveau de zoom. Plusieurs rapports peuvent être
+rendus en parallèle avec render_reports() ; chaque processus prépare une fois
+ses polices et sa mise en page, puis les réutilise pour tous ses rendus.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.backends.backend_pdf import PdfPages
+from matplotlib.figure import Figure
+
+from instrumentation import traced
+
+# Mêmes couleurs que le tableau de bord (frontend/js/charts.js)
+COLORS = {
+    'primary': '#3498db',
+    'secondary': '#2ecc71',
+    'accent': '#f39c12',
+    'dark': '#2c3e50',
+    'light': '#ecf0f1'
+}
+
+PAGE_SIZE = (8.27, 11.69)  # A4 portrait, en pouces
+TABLE_ROWS = 15
+
+STYLE = {
+    'pdf.fonttype': 3,            # sous-ensembles Type 3 : bien plus rapides à embarquer que Type 42
+    'font.family': 'DejaVu Sans',
+    'font.size': 9,
+    'axes.edgecolor': COLORS['dark'],
+    'axes.titleweight': 'bold',
+    'axes.titlesize': 11
+}
+
+_warmed_up = False
+
+def warm_up():
+    """Applique le style et charge les polices une fois par processus"""
+    global _warmed_up
+    if _warmed_up:
+        return
+    matplotlib.rcParams.update(STYLE)
+    # Un premier rendu remplit le cache de polices de matplotlib
+    figure = Figure(figsize=(1, 1))
+    figure.text(0.5, 0.5, 'é€0')
+    figure.canvas.draw()
+    _warmed_up = True
+
+def format_euro(value):
+    return f"{value:,.2f} €".replace(',', ' ').replace('.', ',')
+
+def _new_page(title, subtitle=None):
+    figure = Figure(figsize=PAGE_SIZE)
+    figure.text(0.08, 0.95, title, fontsize=16, fontweight='bold', color=COLORS['dark'])
+    if subtitle:
+        figure.text(0.08, 0.925, subtitle, fontsize=9, color='#7f8c8d')
+    return figure
+
+def _draw_table(figure, rect, headers, rows):
+    ax = figure.add_axes(rect)
+    ax.axis('off')
+    if not rows:
+        ax.text(0, 0.5, "Aucune donnée", color='#7f8c8d')
+        return
+    table = ax.table(cellText=rows, colLabels=headers, loc='upper center', cellLoc='left')
+    table.auto_set_font_size(False)
+    table.set_fontsize(8)
+    for (row, _), cell in table.get_celld().items():
+        cell.set_edgecolor(COLORS['light'])
+        if row == 0:
+            cell.set_facecolor(COLORS['dark'])
+            cell.get_text().set_color('white')
+            cell.get_text().set_fontweight('bold')
+
+def _draw_bars(figure, rect, title, items, color):
+    ax = figure.add_axes(rect)
+    ax.set_title(title, loc='left')
+    items = items[:TABLE_ROWS]
+    names = [item['name'] for item in items][::-1]
+    amounts = [item['amount'] for item in items][::-1]
+    ax.barh(names, amounts, color=color)
+    ax.tick_params(labelsize=8)
+    ax.spines[['top', 'right']].set_visible(False)
+
+def _summary_page(report, title, subtitle):
+    figure = _new_page(title, subtitle)
+    figure.text(0.08, 0.87, "Chiffre d'affaires total", fontsize=10, color='#7f8c8d')
+    figure.text(0.08, 0.84, format_euro(report['total_sales']), fontsize=20,
+                fontweight='bold', color=COLORS['primary'])
+
+    stores = report['sales_by_store']
+    _draw_bars(figure, [0.25, 0.50, 0.67, 0.28], "Ventes par magasin", stores, COLORS['primary'])
+    _draw_table(figure, [0.08, 0.05, 0.84, 0.38], ['Magasin', 'Quantité', 'Montant'],
+                [[s['name'], f"{s['quantity']:,}".replace(',', ' '), format_euro(s['amount'])]
+                 for s in stores[:TABLE_ROWS]])
+    return figure
+
+def _products_page(report, title):
+    figure = _new_page(f"{title} - produits")
+    products = report['sales_by_product']
+    _draw_bars(figure, [0.25, 0.55, 0.67, 0.33], "Ventes par produit", products, COLORS['secondary'])
+    _draw_table(figure, [0.08, 0.05, 0.84, 0.43], ['Produit', 'Quantité', 'Montant'],
+                [[p['name'], f"{p['quantity']:,}".replace(',', ' '), format_euro(p['amount'])]
+                 for p in products[:TABLE_ROWS]])
+    return figure
+
+def _trend_page(report, title):
+    figure = _new_page(f"{title} - tendance mensuelle")
+    trend = report['monthly_trend']
+    ax = figure.add_axes([0.1, 0.55, 0.82, 0.33])
+    ax.set_title("Évolution mensuelle des ventes", loc='left')
+    ax.plot([t['period'] for t in trend], [t['amount'] for t in trend],
+            color=COLORS['primary'], marker='o', markersize=3)
+    ax.fill_between(range(len(trend)), [t['amount'] for t in trend], alpha=0.15, color=COLORS['primary'])
+    ax.tick_params(axis='x', labelrotation=60, labelsize=7)
+    ax.spines[['top', 'right']].set_visible(False)
+    ax.grid(axis='y', color=COLORS['light'])
+    return figure
+
+@traced('pdf.render_report_pdf')
+def render_report_pdf(report, output_path, title="Rapport des ventes"):
+    """
+    Écrit le rapport (dict de generate_sales_report_data) dans un PDF vectoriel
+
+    Returns:
+        str: Chemin du fichier généré
+    """
+    if 'error' in report:
+        raise ValueError(report['error'])
+    warm_up()
+
+    subtitle = f"Généré le {report.get('date_generated', '')}"
+    with PdfPages(output_path, metadata={'Title': title, 'Creator': 'Analyse des ventes'}) as pdf:
+        for figure in (_summary_page(report, title, subtitle),
+                       _products_page(report, title),
+                       _trend_page(report, title)):
+            pdf.savefig(figure)
+    return output_path
+
+def _render_job(job):
+    report, output_path, title = job
+    try:
+        return {'status': 'success', 'pdf_path': render_report_pdf(report, output_path, title)}
+    except Exception as e:
+        return {'status': 'error', 'pdf_path': output_path, 'message': str(e)}
+
+@traced('pdf.render_reports', rows=len)
+def render_reports(jobs, workers=None):
+    """
+    Rend plusieurs rapports en parallèle
+
+    Args:
+        jobs (list): Tuples (rapport, chemin du PDF, titre)
+        workers (int, optional): Nombre de processus (nombre de cœurs par défaut)
+
+    Returns:
+        list: Résultat de chaque rendu, dans l'ordre des jobs
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) == 1:
+        return [_render_job(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers, initializer=warm_up) as executor:
+        return list(executor.map(_render_job, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Table de cumuls journaliers (jour × magasin × produit) tenue à jour par l'import
+
+Chaque lot inséré dans ventes est agrégé en mémoire puis ajouté aux cumuls dans
+la même transaction, ce qui permet à DatabaseManager de répondre aux requêtes
+d'agrégation sans reparcourir la table brute. Les montants y sont tenus en
+centimes entiers (voir money.py) : les cumuls s'additionnent sans arrondi.
+En schéma en étoile (voir dimensions.py), les cumuls sont indexés comme ventes
+par magasin_id et produit_id.
+
+Usage:
+    python backend/rollups.py verifier       # compare les cumuls à la table ventes
+    python backend/rollups.py reconstruire   # recalcule les cumuls depuis ventes
+"""
+
+import os
+import sys
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+from backends import backend_of, ensure_indexes
+from dimensions import key_columns, uses_star_schema
+from money import AMOUNT_CENTS_SQL, PRICE_CENTS_SQL
+
+ROLLUP_TABLE = 'ventes_cumul_jour'
+
+ROLLUP_COLUMNS = [
+    ('date', 'DATE NOT NULL'),
+    ('magasin', 'VARCHAR(100) NOT NULL'),
+    ('produit', 'VARCHAR(200) NOT NULL'),
+    ('quantite_totale', 'BIGINT NOT NULL'),
+    ('total_centimes', 'BIGINT NOT NULL'),
+    ('somme_prix_centimes', 'BIGINT NOT NULL'),
+    ('nb_transactions', 'INT NOT NULL')
+]
+ROLLUP_KEY = ('date', 'magasin', 'produit')
+# La clé primaire (date en tête) sert les requêtes bornées par des dates ; les index par
+# magasin et par produit contiennent les mesures lues par DatabaseManager et PDFExporter
+ROLLUP_MEASURES = ('quantite_totale', 'total_centimes', 'nb_transactions')
+ROLLUP_INDEXES = [('idx_cumul_magasin_date', ('magasin', 'date', 'produit') + ROLLUP_MEASURES),
+                  ('idx_cumul_produit_date', ('produit', 'date', 'magasin') + ROLLUP_MEASURES)]
+OBSOLETE_ROLLUP_INDEXES = ('idx_cumul_magasin', 'idx_cumul_produit')
+
+REBUILD_ROLLUP_SQL = f"""
+INSERT INTO {ROLLUP_TABLE}
+    (date, magasin, produit, quantite_totale, total_centimes, somme_prix_centimes, nb_transactions)
+SELECT date, magasin, produit, SUM(quantite), SUM({AMOUNT_CENTS_SQL}),
+       SUM({PRICE_CENTS_SQL}), COUNT(*)
+FROM ventes
+GROUP BY date, magasin, produit
+"""
+
+def rollup_layout(star=False):
+    """Colonnes, clé et index de la table de cumuls selon le schéma de ventes"""
+    if not star:
+        return ROLLUP_COLUMNS, ROLLUP_KEY, ROLLUP_INDEXES
+    store, product = key_columns(True)
+    columns = [('date', 'DATE NOT NULL'), (store, 'INT NOT NULL'), (product, 'INT NOT NULL')]
+    renamed = {'magasin': store, 'produit': product}
+    return (columns + ROLLUP_COLUMNS[len(ROLLUP_KEY):], ('date', store, product),
+            [(name, tuple(renamed.get(column, column) for column in index_columns))
+             for name, index_columns in ROLLUP_INDEXES])
+
+def rebuild_rollup_sql(star=False):
+    if not star:
+        return REBUILD_ROLLUP_SQL
+    store, product = key_columns(True)
+    return REBUILD_ROLLUP_SQL.replace('magasin, produit', f'{store}, {product}')
+
+def create_rollup_table(cursor, star=None):
+    """
+    Crée la table de cumuls et la remplit depuis ventes si elle vient d'être créée
+
+    Une table de l'ancien format (montants DECIMAL en euros) est recréée en centimes,
+    une table dont les clés ne suivent pas le schéma de ventes est recréée ; les
+    index d'une table existante sont mis à niveau.
+    """
+    backend = backend_of(cursor)
+    star = uses_star_schema(cursor) if star is None else star
+    store, _ = key_columns(star)
+    if backend.table_exists(cursor, ROLLUP_TABLE):
+        if (backend.column_exists(cursor, ROLLUP_TABLE, 'total_centimes')
+                and backend.column_exists(cursor, ROLLUP_TABLE, store)):
+            ensure_indexes(cursor, ROLLUP_TABLE, rollup_layout(star)[2], OBSOLETE_ROLLUP_INDEXES)
+            return False
+        print(f"Conversion de la table de cumuls '{ROLLUP_TABLE}'...")
+        cursor.execute(f"DROP TABLE {ROLLUP_TABLE}")
+
+    print(f"Création de la table de cumuls '{ROLLUP_TABLE}'...")
+    for statement in backend.create_table_sql(ROLLUP_TABLE, *rollup_layout(star)):
+        cursor.execute(statement)
+    cursor.execute(rebuild_rollup_sql(star))
+    return True
+
+def add_to_rollup(delta, row):
+    """
+    Ajoute une ligne (date, magasin, produit, quantite, prix en centimes[, empreinte]) aux cumuls en mémoire
+
+    Magasin et produit sont des identifiants en schéma en étoile.
+    """
+    date, magasin, produit, quantite, prix = row[:5]
+    entry = delta.get((date, magasin, produit))
+    if entry is None:
+        delta[(date, magasin, produit)] = [quantite, quantite * prix, prix, 1]
+    else:
+        entry[0] += quantite
+        entry[1] += quantite * prix
+        entry[2] += prix
+        entry[3] += 1
+
+def aggregate_rows(rows):
+    delta = {}
+    for row in rows:
+        add_to_rollup(delta, row)
+    return delta
+
+def apply_rollup_delta(cursor, delta, star=False):
+    """Ajoute les cumuls calculés en mémoire à la table (dans la transaction courante)"""
+    if not delta:
+        return
+    columns, rollup_key, _ = rollup_layout(star)
+    upsert = backend_of(cursor).upsert_sql(ROLLUP_TABLE, [name for name, _ in columns], rollup_key,
+                                           [name for name, _ in columns[len(rollup_key):]])
+    # Ordre de clés stable : deux écrivains concurrents verrouillent dans le même ordre
+    cursor.executemany(upsert, [key + tuple(values) for key, values in sorted(delta.items())])
+
+def update_rollups(cursor, rows, star=False):
+    """Met à jour les cumuls pour un lot de lignes insérées dans ventes"""
+    apply_rollup_delta(cursor, aggregate_rows(rows), star)
+
+def rebuild_rollups(db):
+    """
+    Recalcule entièrement les cumuls depuis la table ventes
+
+    Vidage et recalcul forment une seule transaction : les lecteurs voient les
+    anciens cumuls jusqu'au commit, et un échec les laisse intacts.
+    """
+    ok = db.execute_transaction([(f"DELETE FROM {ROLLUP_TABLE}", None),
+                                 (rebuild_rollup_sql(db.is_star_schema()), None)])
+    if ok:
+        print(f"Table '{ROLLUP_TABLE}' reconstruite.")
+    return bool(ok)
+
+def check_rollups(db, max_report=20):
+    """
+    Compare les cumuls à une agrégation fraîche de la table ventes
+
+    Returns:
+        list: Différences (clé, valeurs attendues, valeurs des cumuls) ; vide si cohérent
+    """
+    store, product = key_columns(db.is_star_schema())
+    raw = db.fetch_all(f"""
+    SELECT date, {store} AS magasin, {product} AS produit, SUM(quantite) AS quantite_totale,
+           SUM({AMOUNT_CENTS_SQL}) AS total_centimes, COUNT(*) AS nb_transactions
+    FROM ventes
+    GROUP BY date, {store}, {product}
+    """)
+    rolled = db.fetch_all(f"""
+    SELECT date, {store} AS magasin, {product} AS produit, quantite_totale, total_centimes, nb_transactions
+    FROM {ROLLUP_TABLE}
+    """)
+
+    def index(rows):
+        return {(row['date'], row['magasin'], row['produit']):
+                (int(row['quantite_totale']), int(row['total_centimes']), int(row['nb_transactions']))
+                for row in rows}
+
+    expected = index(raw)
+    actual = index(rolled)
+    differences = [(key, expected.get(key), actual.get(key))
+                   for key in expected.keys() | actual.keys()
+                   if expected.get(key) != actual.get(key)]
+
+    print(f"{len(expected)} combinaisons dans ventes, {len(actual)} dans '{ROLLUP_TABLE}'.")
+    if differences:
+        print(f"{len(differences)} différences trouvées :")
+        for key, exp, act in sorted(differences, key=lambda d: str(d[0]))[:max_report]:
+            print(f"  {key}: attendu {exp}, cumul {act}")
+    else:
+        print("Les cumuls sont cohérents avec la table ventes.")
+    return differences
+
+if __name__ == "__main__":
+    from database import DatabaseManager
+
+    command = sys.argv[1] if len(sys.argv) > 1 else 'verifier'
+    db = DatabaseManager(use_rollups=False)
+    if not db.connect():
+        sys.exit(1)
+
+    if command == 'reconstruire':
+        rebuild_rollups(db)
+        exit_code = 0
+    else:
+        exit_code = 1 if check_rollups(db) else 0
+
+    db.disconnect()
+    sys.exit(exit_code)
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Copie locale de la table ventes en colonnes NumPy, partitionnée par mois
+
+Arborescence :
+    <dossier>/manifest.json           repère des lignes copiées (dernier id et ids encore
+                                      attendus, voir watermark.py), dictionnaires
+                                      magasins/produits, nombre de lignes de chaque partition
+    <dossier>/AAAA-MM/<colonne>.npy   une colonne par fichier (jour, magasin, produit,
+                                      quantite, prix_centimes)
+
+Chaque rafraîchissement ne copie que les lignes pas encore copiées d'après le
+repère du manifeste et ne réécrit que les mois touchés. La lecture charge entièrement en
+mémoire les colonnes et les mois demandés (le DataFrame produit en a de toute
+façon besoin), ce qui permet de produire les rapports sans accès à la base.
+
+Usage: python backend/snapshot.py [dossier]
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+from columns import COLUMN_DTYPES, FRAME_COLUMNS, build_frame, columnar_select, decode_chunk, stored_columns_for
+from config import DB_CHUNK_SIZE, SNAPSHOT_DIR
+from watermark import Watermark, id_condition
+
+class SnapshotStore:
+
+    def __init__(self, path=SNAPSHOT_DIR):
+        self.path = path
+        self.manifest = self._read_manifest()
+
+    def _manifest_path(self):
+        return os.path.join(self.path, 'manifest.json')
+
+    def _read_manifest(self):
+        try:
+            with open(self._manifest_path(), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'max_id': 0, 'trous': [], 'magasins': [], 'produits': [], 'partitions': {}}
+
+    def _write_manifest(self):
+        tmp_path = self._manifest_path() + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, ensure_ascii=False)
+        os.replace(tmp_path, self._manifest_path())
+
+    def _column_path(self, month, column):
+        return os.path.join(self.path, month, f'{column}.npy')
+
+    def _read_partition(self, month, columns):
+        """Lit en mémoire les colonnes d'une partition, limitées au nombre de lignes du manifeste"""
+        count = self.manifest['partitions'].get(month, 0)
+        data = {}
+        for column in columns:
+            path = self._column_path(month, column)
+            if not count or not os.path.exists(path):
+                data[column] = np.empty(0, dtype=COLUMN_DTYPES[column])
+                continue
+            # Des lignes au-delà du manifeste viennent d'un rafraîchissement interrompu
+            data[column] = np.load(path)[:count]
+        return data
+
+    def _write_partition(self, month, data):
+        os.makedirs(os.path.join(self.path, month), exist_ok=True)
+        for column, values in data.items():
+            path = self._column_path(month, column)
+            tmp_path = path + '.tmp.npy'
+            np.save(tmp_path, values)
+            os.replace(tmp_path, path)
+
+    def refresh(self, db, chunk_size=DB_CHUNK_SIZE):
+        """
+        Ajoute à la copie locale les lignes insérées depuis le dernier rafraîchissement
+
+        Returns:
+            int: Nombre de lignes ajoutées
+        """
+        watermark = Watermark.from_state(self.manifest)
+        version = db.get_data_version()
+        if version <= watermark.max_id and not watermark.gaps:
+            print("Copie locale déjà à jour.")
+            return 0
+
+        intervals, new_watermark = watermark.plan(db, max(version, watermark.max_id))
+        store_codes = {name: code for code, name in enumerate(self.manifest['magasins'])}
+        product_codes = {name: code for code, name in enumerate(self.manifest['produits'])}
+        chunks = []
+        if intervals:
+            select, dimensions = columnar_select(db)
+            condition, params = id_condition(intervals)
+            for rows in db.iter_chunks(select + f"WHERE {condition}", params, chunk_size):
+                chunks.append(decode_chunk(rows, store_codes, product_codes, dimensions))
+        if not chunks:
+            # Aucune ligne arrivée dans les trous : seul le repère change (trous expirés)
+            os.makedirs(self.path, exist_ok=True)
+            self.manifest.update(new_watermark.to_state())
+            self._write_manifest()
+            return 0
+
+        new_rows = {column: np.concatenate([chunk[column] for chunk in chunks]) for column in COLUMN_DTYPES}
+        months = new_rows['jour'].astype('datetime64[D]').astype('datetime64[M]').astype(str)
+
+        os.makedirs(self.path, exist_ok=True)
+        for month in np.unique(months):
+            mask = months == month
+            existing = self._read_partition(month, COLUMN_DTYPES)
+            merged = {column: np.concatenate([existing[column], new_rows[column][mask]])
+                      for column in COLUMN_DTYPES}
+            self._write_partition(month, merged)
+            self.manifest['partitions'][month] = int(len(merged['jour']))
+
+        # Le manifeste est écrit en dernier : il fait foi en cas d'interruption
+        self.manifest.update(new_watermark.to_state())
+        self.manifest['magasins'] = list(store_codes)
+        self.manifest['produits'] = list(product_codes)
+        self._write_manifest()
+
+        added = int(len(new_rows['jour']))
+        print(f"Copie locale mise à jour: {added} lignes ajoutées dans {len(np.unique(months))} mois.")
+        return added
+
+    def months(self, start=None, end=None):
+        """Mois disponibles (AAAA-MM), éventuellement limités à [start, end]"""
+        return sorted(month for month in self.manifest['partitions']
+                      if (start is None or month >= start[:7]) and (end is None or month <= end[:7]))
+
+    def load(self, columns=None, start=None, end=None):
+        """
+        Charge la copie locale dans un DataFrame
+
+        Les colonnes et les mois demandés sont lus entièrement en mémoire ; les
+        jours hors de [start, end] sont écartés mois par mois avant l'assemblage.
+
+        Args:
+            columns (list, optional): Colonnes du DataFrame voulues (Date, Magasin, Produit,
+                                      quantite, prix_centimes, montant_centimes, ou les
+                                      montants en euros prix_unitaire, montant) ;
+                                      FRAME_COLUMNS par défaut
+            start (str, optional): Première date incluse (AAAA-MM-JJ)
+            end (str, optional): Dernière date incluse (AAAA-MM-JJ)
+
+        Returns:
+            DataFrame ou None si la copie est vide
+        """
+        frame_columns = list(columns) if columns else None
+        needed = stored_columns_for(frame_columns or FRAME_COLUMNS)
+        # La date sert au filtre fin à l'intérieur des mois de bord
+        read_columns = needed + (['jour'] if (start or end) and 'jour' not in needed else [])
+
+        first_day = np.datetime64(start, 'D').astype(np.int64) if start else None
+        last_day = np.datetime64(end, 'D').astype(np.int64) if end else None
+        parts = []
+        for month in self.months(start, end):
+            part = self._read_partition(month, read_columns)
+            # Seuls les mois de bord perdent des jours : les autres ne sont pas recopiés
+            if first_day is not None or last_day is not None:
+                days = part['jour']
+                mask = np.ones(len(days), dtype=bool)
+                if first_day is not None:
+                    mask &= days >= first_day
+                if last_day is not None:
+                    mask &= days <= last_day
+                if not mask.all():
+                    part = {column: values[mask] for column, values in part.items()}
+            parts.append(part)
+        if not parts:
+            print("Pas de données disponibles dans la copie locale.")
+            return None
+
+        data = {column: np.concatenate([part[column] for part in parts]) for column in read_columns}
+        return build_frame(data, self.manifest['magasins'], self.manifest['produits'], frame_columns)
+
+if __name__ == "__main__":
+    from database import DatabaseManager
+
+    store = SnapshotStore(sys.argv[1] if len(sys.argv) > 1 else SNAPSHOT_DIR)
+    db = DatabaseManager()
+    if not db.connect():
+        sys.exit(1)
+    store.refresh(db)
+    db.disconnect()
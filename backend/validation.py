@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Validation des lignes importées par lots entiers, avant l'envoi à la base
+
+Le trigger verif_ventes_before_insert (vente_db.sql) contrôle chaque ligne au
+moment de l'INSERT : une seule ligne refusée fait échouer l'INSERT multi-lignes
+du lot, qui doit alors être rejoué ligne par ligne (insert_batch). Les mêmes
+règles sont appliquées ici côté client, sur tout un lot à la fois avec NumPy,
+avec les limites des colonnes de ventes et quelques contrôles de vraisemblance.
+Une ligne est écartée pour la première règle qu'elle enfreint (ordre de RULES) :
+    - quantité ou prix négatif ou nul, date dans le futur (règles du trigger) ;
+    - quantité ou prix hors des limites de INT et DECIMAL(10, 2) ;
+    - magasin ou produit vide ;
+    - magasin ou produit absent des tables de référence magasins / produits,
+      quand elles sont remplies (hors schéma en étoile, voir dimensions.py) ;
+    - prix aberrant : plus de VALIDATION_OUTLIER_FACTOR fois au-dessus ou en
+      dessous du prix médian du produit (médiane du lot, ou dernière médiane
+      connue si le produit y est trop rare).
+Seules les lignes valides sont envoyées à la base ; les autres, comme les lignes
+illisibles, sont écrites dans un fichier de rejets (RejectFile) avec leur motif.
+"""
+
+import csv
+import os
+import sys
+import time
+from collections import Counter
+from datetime import date
+from itertools import compress
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+from backends import backend_of
+from dimensions import uses_star_schema
+
+try:
+    from config import VALIDATION_OUTLIER_FACTOR
+except ImportError:
+    VALIDATION_OUTLIER_FACTOR = 10.0
+
+# Fichier de rejets écrit à côté du CSV importé
+REJECT_SUFFIX = '.rejets.csv'
+
+# Limites des colonnes quantite (INT) et prix_unitaire (DECIMAL(10, 2), en centimes)
+MAX_QUANTITY = 2 ** 31 - 1
+MAX_PRICE_CENTS = 10 ** 10 - 1
+
+# Lignes d'un produit nécessaires dans un lot pour en calculer le prix médian
+OUTLIER_MIN_SAMPLE = 5
+
+# Motifs de rejet, par ordre de priorité
+RULES = [
+    'quantité négative ou nulle',
+    'prix négatif ou nul',
+    'date dans le futur',
+    'quantité hors limites',
+    'prix hors limites',
+    'magasin manquant',
+    'produit manquant',
+    'magasin inconnu',
+    'produit inconnu',
+    'prix aberrant'
+]
+
+def load_reference_names(cursor, table):
+    """Noms de la table de référence magasins ou produits ; None si elle est absente ou vide"""
+    if not backend_of(cursor).table_exists(cursor, table):
+        return None
+    cursor.execute(f"SELECT nom FROM {table}")
+    names = {row[0] for row in cursor.fetchall()}
+    return names or None
+
+class BatchValidator:
+    """
+    Contrôle vectorisé de lots de lignes nettoyées (date, magasin, produit, quantite,
+    prix en centimes[, empreinte]), tel que renvoyées par parse_row
+
+    Args:
+        known_stores, known_products (set, optional): Noms admis (pas de contrôle si None)
+        outlier_factor (float): Écart au prix médian du produit au-delà duquel un prix est aberrant
+        today (str, optional): Date du jour (AAAA-MM-JJ) pour la règle des dates futures
+    """
+
+    def __init__(self, known_stores=None, known_products=None, outlier_factor=VALIDATION_OUTLIER_FACTOR,
+                 today=None):
+        self.known_stores = known_stores
+        self.known_products = known_products
+        self.outlier_factor = outlier_factor
+        self.today = today or date.today().isoformat()
+        # Dernier prix médian (centimes) de chaque produit
+        self.reference_prices = {}
+        self.rows = 0
+        self.elapsed = 0.0
+        self.reasons = Counter()
+
+    @classmethod
+    def for_cursor(cls, cursor, **kwargs):
+        """
+        Validateur utilisant les tables de référence magasins / produits de la base
+
+        En schéma en étoile, ces tables sont les dimensions complétées par l'import :
+        elles ne servent pas de référence.
+        """
+        if uses_star_schema(cursor):
+            return cls(**kwargs)
+        return cls(load_reference_names(cursor, 'magasins'), load_reference_names(cursor, 'produits'), **kwargs)
+
+    @staticmethod
+    def _integers(rows, index, count):
+        try:
+            return np.fromiter(map(itemgetter(index), rows), dtype=np.int64, count=count)
+        except OverflowError:
+            # Valeur hors de int64 : comparaisons sur des entiers Python, plus lentes mais exactes
+            return np.array([row[index] for row in rows], dtype=object)
+
+    @staticmethod
+    def _unknown(names, known):
+        """Masque des noms absents de known (None si tous sont connus)"""
+        if set(names) <= known:
+            return None
+        return np.fromiter((name not in known for name in names), dtype=bool, count=len(names))
+
+    def _outliers(self, products, prices):
+        codes, uniques = pd.factorize(np.array(products, dtype=object))
+        counts = np.bincount(codes, minlength=len(uniques))
+        # Médiane par produit : un seul tri des prix préfixés par le code produit
+        # (les prix, bornés par la règle précédente, tiennent sur 40 bits)
+        shift = np.int64(1 << 40)
+        ordered = np.sort(codes * shift + prices.clip(0, MAX_PRICE_CENTS))
+        ordered -= np.repeat(np.arange(len(uniques), dtype=np.int64) * shift, counts)
+        starts = np.cumsum(counts) - counts
+        medians = (ordered[starts + (counts - 1) // 2] + ordered[starts + counts // 2]) / 2
+
+        references = np.full(len(uniques), np.nan)
+        for code, name in enumerate(uniques):
+            if counts[code] >= OUTLIER_MIN_SAMPLE:
+                self.reference_prices[name] = references[code] = medians[code]
+            else:
+                references[code] = self.reference_prices.get(name, np.nan)
+        reference = references[codes]
+        with np.errstate(invalid='ignore'):
+            return (prices > reference * self.outlier_factor) | (prices * self.outlier_factor < reference)
+
+    def split(self, rows):
+        """
+        Sépare un lot en lignes valides et lignes refusées
+
+        Les colonnes sont lues une fois chacune ; les règles rarement enfreintes
+        (champ vide, nom inconnu) ne calculent leur masque que si le lot les enfreint.
+
+        Returns:
+            tuple: (lignes valides, liste de (indice dans rows, motif))
+        """
+        count = len(rows)
+        if not count:
+            return rows, []
+        start = time.perf_counter()
+
+        stores = [row[1] for row in rows]
+        products = [row[2] for row in rows]
+        quantities = self._integers(rows, 3, count)
+        prices = self._integers(rows, 4, count)
+
+        checks = [
+            lambda: quantities <= 0,
+            lambda: prices <= 0,
+            lambda: np.fromiter(map(self.today.__lt__, map(itemgetter(0), rows)), dtype=bool, count=count),
+            lambda: quantities > MAX_QUANTITY,
+            lambda: prices > MAX_PRICE_CENTS,
+            lambda: np.fromiter(map(''.__eq__, stores), dtype=bool, count=count) if '' in stores else None,
+            lambda: np.fromiter(map(''.__eq__, products), dtype=bool, count=count) if '' in products else None,
+            lambda: self._unknown(stores, self.known_stores) if self.known_stores else None,
+            lambda: self._unknown(products, self.known_products) if self.known_products else None,
+            lambda: self._outliers(products, prices) if self.outlier_factor else None
+        ]
+        reasons = np.zeros(count, dtype=np.int8)
+        for code, check in enumerate(checks, 1):
+            mask = check()
+            if mask is not None:
+                reasons[(reasons == 0) & np.asarray(mask, dtype=bool)] = code
+
+        refused = np.flatnonzero(reasons)
+        if len(refused):
+            rows = list(compress(rows, (reasons == 0).tolist()))
+            self.reasons.update(RULES[code - 1] for code in reasons[refused])
+        self.rows += count
+        self.elapsed += time.perf_counter() - start
+        return rows, [(int(i), RULES[reasons[i] - 1]) for i in refused]
+
+    def add_parse_error(self, reason):
+        """Compte une ligne illisible (refusée avant la validation par lots)"""
+        self.reasons[reason] += 1
+
+    def merge(self, other):
+        """Ajoute les compteurs d'un validateur utilisé ailleurs (processus de lecture)"""
+        self.rows += other.rows
+        self.elapsed += other.elapsed
+        self.reasons.update(other.reasons)
+
+    def rate(self):
+        """Débit de la validation par lots, en lignes par seconde"""
+        return self.rows / self.elapsed if self.elapsed > 0 else 0.0
+
+class RejectFile:
+    """
+    Fichier des lignes rejetées : position, motif puis les colonnes d'origine
+
+    Le fichier n'est créé qu'au premier rejet.
+
+    Args:
+        path (str): Fichier à écrire
+        field_names (list): En-tête du CSV importé
+        delimiter, encoding (str): Ceux du CSV importé
+        position (str): Nom de la première colonne ('ligne', ou 'octet' pour la lecture par plages)
+        append (bool): Compléter un fichier existant (reprise d'un import interrompu)
+    """
+
+    def __init__(self, path, field_names, delimiter=',', encoding='utf-8', position='ligne', append=False):
+        self.path = path
+        self.header = [position, 'motif'] + list(field_names)
+        self.delimiter = delimiter
+        self.encoding = encoding
+        self.append = append and os.path.exists(path)
+        self.count = 0
+        self._file = None
+        self._writer = None
+        if not append and os.path.exists(path):
+            os.remove(path)
+
+    def write(self, position, reason, values):
+        if self._writer is None:
+            self._file = open(self.path, 'a' if self.append else 'w', encoding=self.encoding, newline='')
+            self._writer = csv.writer(self._file, delimiter=self.delimiter)
+            if not self.append:
+                self._writer.writerow(self.header)
+        self._writer.writerow([position, reason] + list(values))
+        self.count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._writer = None
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Repère des lignes de ventes déjà lues par les rafraîchissements incrémentaux
+
+Le cube (cube.py), la copie locale (snapshot.py) et l'export du tableau de bord
+(dashboard_export.py) ne lisent que les lignes ajoutées depuis leur dernier
+passage. MAX(id) seul n'est pas un repère sûr : avec plusieurs imports
+simultanés, un id inférieur peut être validé après qu'un id supérieur a été lu,
+et sa ligne ne serait jamais reprise.
+
+Le repère garde donc, avec le dernier id lu, les ids absents rencontrés sous
+celui-ci (trous, en intervalles inclus) : chaque rafraîchissement relit ces
+trous en plus des nouveaux ids, et une ligne n'est jamais lue deux fois. Un trou
+situé plus de WATERMARK_WINDOW ids sous le dernier id est abandonné : c'est un
+id consommé sans ligne (transaction annulée, INSERT IGNORE écarté).
+
+La lecture se fait en deux temps : relevé des ids présents dans les plages
+à lire (parcours de la clé primaire), puis lecture des lignes de ces seuls ids.
+Une ligne validée entre les deux reste un trou et sera lue la fois suivante.
+"""
+
+import os
+import sys
+
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+from config import DB_CHUNK_SIZE, WATERMARK_WINDOW
+
+def id_condition(intervals):
+    """
+    Condition SQL sur id couvrant des intervalles inclus
+
+    Returns:
+        tuple: (condition, paramètres)
+    """
+    condition = ' OR '.join(['id BETWEEN %s AND %s'] * len(intervals))
+    return f"({condition})", [bound for interval in intervals for bound in interval]
+
+def split_interval(first, last, ids):
+    """
+    Découpe [first, last] d'après les ids présents (triés, compris dans l'intervalle)
+
+    Returns:
+        tuple: (intervalles présents, intervalles absents)
+    """
+    if not len(ids):
+        return [], [(first, last)]
+    breaks = np.flatnonzero(np.diff(ids) > 1)
+    starts = np.concatenate((ids[:1], ids[breaks + 1])).tolist()
+    ends = np.concatenate((ids[breaks], ids[-1:])).tolist()
+    present = list(zip(starts, ends))
+    missing = []
+    previous = first - 1
+    for start, end in present:
+        if start > previous + 1:
+            missing.append((previous + 1, start - 1))
+        previous = end
+    if previous < last:
+        missing.append((previous + 1, last))
+    return present, missing
+
+def merge_intervals(intervals):
+    """Trie des intervalles disjoints et fusionne ceux qui se touchent"""
+    merged = []
+    for first, last in sorted(intervals):
+        if merged and first == merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], last)
+        else:
+            merged.append((first, last))
+    return merged
+
+class Watermark:
+    """Dernier id lu et trous encore attendus en dessous"""
+
+    def __init__(self, max_id=0, gaps=()):
+        self.max_id = int(max_id)
+        self.gaps = [(int(first), int(last)) for first, last in gaps]
+
+    @classmethod
+    def from_state(cls, state):
+        """Repère sauvegardé par to_state (un ancien état n'a que max_id)"""
+        return cls(state.get('max_id', 0), state.get('trous', ()))
+
+    def to_state(self):
+        return {'max_id': self.max_id, 'trous': [list(gap) for gap in self.gaps]}
+
+    def is_current(self, version):
+        """True si aucune ligne n'est à lire pour la version donnée (get_data_version)"""
+        return version == self.max_id and not self.gaps
+
+    def plan(self, db, version, window=WATERMARK_WINDOW, chunk_size=DB_CHUNK_SIZE):
+        """
+        Intervalles d'ids à lire pour passer à version
+
+        Args:
+            db (DatabaseManager): Accès aux données
+            version (int): Dernier id à prendre en compte (get_data_version)
+
+        Returns:
+            tuple: (intervalles d'ids présents, Watermark à retenir une fois ces lignes lues)
+        """
+        ranges = list(self.gaps)
+        present, gaps = [], []
+        first = self.max_id + 1
+        # Les ids à plus de window du nouveau dernier id sont lus tels quels : leurs trous sont définitifs
+        settled = version - window
+        if settled >= first:
+            present.append((first, settled))
+            first = settled + 1
+        if version >= first:
+            # Cas courant : aucun trou parmi les nouveaux ids, inutile de les relever
+            result = db.fetch_one("SELECT COUNT(*) AS nb FROM ventes WHERE id BETWEEN %s AND %s",
+                                  (first, version))
+            if result and int(result['nb']) == version - first + 1:
+                present.append((first, version))
+            else:
+                ranges.append((first, version))
+
+        if ranges:
+            condition, params = id_condition(ranges)
+            chunks = [np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+                      for rows in db.iter_chunks(f"SELECT id FROM ventes WHERE {condition}", params, chunk_size)]
+            ids = np.sort(np.concatenate(chunks)) if chunks else np.empty(0, dtype=np.int64)
+            for first, last in ranges:
+                lo, hi = np.searchsorted(ids, [first, last + 1])
+                found, missing = split_interval(first, last, ids[lo:hi])
+                present.extend(found)
+                gaps.extend(missing)
+
+        last_id = max(version, self.max_id)
+        gaps = sorted(gap for gap in gaps if gap[1] > last_id - window)
+        return merge_intervals(present), Watermark(last_id, gaps)
@@ -6,19 +6,63 @@ CREATE DATABASE IF NOT EXISTS ventes_db CHARACTER SET utf8mb4 COLLATE utf8mb4_un
 USE ventes_db;
 
 -- Création de la table principale des ventes
+-- Partitionnée par mois (backend/partitions.py) : les requêtes bornées par des dates ne lisent
+-- que les mois concernés. La clé primaire et l'index unique contiennent la date, comme l'exige
+-- MySQL. Les partitions mensuelles depuis PARTITION_FIRST_MONTH (config.py) et celles des
+-- prochains mois sont créées par l'import, ou par : python backend/partitions.py avancer
 CREATE TABLE IF NOT EXISTS ventes (
-    id INT AUTO_INCREMENT PRIMARY KEY,
+    id INT NOT NULL AUTO_INCREMENT,
     date DATE NOT NULL,
     magasin VARCHAR(100) NOT NULL,
     produit VARCHAR(200) NOT NULL,
     quantite INT NOT NULL,
     prix_unitaire DECIMAL(10, 2) NOT NULL,
-    -- Indices pour améliorer les performances des requêtes
-    INDEX idx_date (date),
-    INDEX idx_magasin (magasin),
-    INDEX idx_produit (produit)
+    -- Empreinte de la ligne (backend/fingerprints.py) : un réimport n'ajoute pas de doublons
+    empreinte BIGINT NULL,
+    PRIMARY KEY (id, date),
+    -- Index couvrants : les agrégations (SUM(quantite * prix_unitaire) par magasin, produit,
+    -- jour ou mois, filtrées par période, magasin ou produit) sont lues dans l'index seul
+    INDEX idx_date_couvrant (date, magasin, produit, quantite, prix_unitaire),
+    INDEX idx_magasin_date (magasin, date, produit, quantite, prix_unitaire),
+    INDEX idx_produit_date (produit, date, magasin, quantite, prix_unitaire),
+    UNIQUE INDEX idx_date_empreinte (date, empreinte)
+) ENGINE=InnoDB
+PARTITION BY RANGE COLUMNS(date) (
+    PARTITION p_anterieur VALUES LESS THAN ('2020-01-01'),
+    PARTITION p_futur VALUES LESS THAN (MAXVALUE)
+);
+
+-- Fichiers entièrement importés (empreinte SHA-256 du contenu)
+CREATE TABLE IF NOT EXISTS fichiers_importes (
+    empreinte CHAR(64) NOT NULL,
+    fichier VARCHAR(255) NOT NULL,
+    taille BIGINT NOT NULL,
+    lignes INT NOT NULL,
+    date_import DATETIME NOT NULL,
+    PRIMARY KEY (empreinte)
+) ENGINE=InnoDB;
+
+-- Cumuls journaliers par magasin et produit, tenus à jour par l'import (backend/rollups.py)
+-- Les agrégations du tableau de bord et les vues ci-dessous lisent cette table plutôt que ventes
+-- Montants en centimes entiers (backend/money.py), convertis en euros par les vues
+CREATE TABLE IF NOT EXISTS ventes_cumul_jour (
+    date DATE NOT NULL,
+    magasin VARCHAR(100) NOT NULL,
+    produit VARCHAR(200) NOT NULL,
+    quantite_totale BIGINT NOT NULL,
+    total_centimes BIGINT NOT NULL,
+    somme_prix_centimes BIGINT NOT NULL,
+    nb_transactions INT NOT NULL,
+    PRIMARY KEY (date, magasin, produit),
+    INDEX idx_cumul_magasin_date (magasin, date, produit, quantite_totale, total_centimes, nb_transactions),
+    INDEX idx_cumul_produit_date (produit, date, magasin, quantite_totale, total_centimes, nb_transactions)
 ) ENGINE=InnoDB;
 
+-- Tables de référence des magasins et produits
+-- En schéma en étoile (STAR_SCHEMA de config.py, backend/dimensions.py), ce sont les dimensions :
+-- ventes et ventes_cumul_jour portent alors magasin_id / produit_id au lieu des noms, et l'import
+-- y ajoute les noms nouveaux. Pas de FOREIGN KEY : InnoDB les refuse sur une table partitionnée.
+-- Ce script crée le schéma à noms, que supposent les vues ci-dessous.
 -- Table pour les magasins (pour référence future)
 CREATE TABLE IF NOT EXISTS magasins (
     id INT AUTO_INCREMENT PRIMARY KEY,
@@ -42,16 +86,16 @@ CREATE TABLE IF NOT EXISTS produits (
     date_creation DATETIME DEFAULT CURRENT_TIMESTAMP
 ) ENGINE=InnoDB;
 
--- Vues pour faciliter l'analyse des données
+-- Vues pour faciliter l'analyse des données (calculées sur les cumuls journaliers)
 
 -- Vue des ventes par jour
 CREATE OR REPLACE VIEW ventes_quotidiennes AS
 SELECT 
-    DATE(date) AS jour,
-    SUM(quantite * prix_unitaire) AS total_ventes,
+    date AS jour,
+    SUM(total_centimes) / 100 AS total_ventes,
     COUNT(DISTINCT magasin) AS nb_magasins_actifs,
-    COUNT(*) AS nb_transactions
-FROM ventes
+    SUM(nb_transactions) AS nb_transactions
+FROM ventes_cumul_jour
 GROUP BY jour
 ORDER BY jour;
 
@@ -59,13 +103,13 @@ ORDER BY jour;
 CREATE OR REPLACE VIEW ventes_par_magasin AS
 SELECT 
     magasin,
-    COUNT(*) AS nb_transactions,
-    SUM(quantite) AS quantite_totale,
-    SUM(quantite * prix_unitaire) AS total_ventes,
-    AVG(prix_unitaire) AS prix_moyen,
+    SUM(nb_transactions) AS nb_transactions,
+    SUM(quantite_totale) AS quantite_totale,
+    SUM(total_centimes) / 100 AS total_ventes,
+    SUM(somme_prix_centimes) / 100 / SUM(nb_transactions) AS prix_moyen,
     MIN(date) AS premiere_vente,
     MAX(date) AS derniere_vente
-FROM ventes
+FROM ventes_cumul_jour
 GROUP BY magasin
 ORDER BY total_ventes DESC;
 
@@ -73,12 +117,12 @@ ORDER BY total_ventes DESC;
 CREATE OR REPLACE VIEW ventes_par_produit AS
 SELECT 
     produit,
-    COUNT(*) AS nb_transactions,
-    SUM(quantite) AS quantite_totale,
-    SUM(quantite * prix_unitaire) AS total_ventes,
-    AVG(prix_unitaire) AS prix_moyen,
+    SUM(nb_transactions) AS nb_transactions,
+    SUM(quantite_totale) AS quantite_totale,
+    SUM(total_centimes) / 100 AS total_ventes,
+    SUM(somme_prix_centimes) / 100 / SUM(nb_transactions) AS prix_moyen,
     COUNT(DISTINCT magasin) AS nb_magasins
-FROM ventes
+FROM ventes_cumul_jour
 GROUP BY produit
 ORDER BY quantite_totale DESC;
 
@@ -87,9 +131,9 @@ CREATE OR REPLACE VIEW meilleures_combinaisons AS
 SELECT 
     magasin,
     produit,
-    SUM(quantite) AS quantite_totale,
-    SUM(quantite * prix_unitaire) AS total_ventes
-FROM ventes
+    SUM(quantite_totale) AS quantite_totale,
+    SUM(total_centimes) / 100 AS total_ventes
+FROM ventes_cumul_jour
 GROUP BY magasin, produit
 ORDER BY quantite_totale DESC;
 
@@ -97,6 +141,8 @@ ORDER BY quantite_totale DESC;
 DELIMITER //
 CREATE PROCEDURE rapport_mensuel(IN annee INT, IN mois INT)
 BEGIN
+    DECLARE debut DATE;
+    
     -- Validation des paramètres
     IF annee < 2000 OR annee > 2100 THEN
         SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Année invalide';
@@ -106,21 +152,26 @@ BEGIN
         SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Mois invalide';
     END IF;
     
+    -- Bornes du mois comparées directement à la colonne date (et non YEAR(date) / MONTH(date)) :
+    -- l'index idx_date_couvrant et l'élagage des partitions s'appliquent
+    SET debut = MAKEDATE(annee, 1) + INTERVAL (mois - 1) MONTH;
+    
     -- Générer le rapport
     SELECT 
         magasin,
         SUM(quantite) AS quantite_totale,
-        SUM(quantite * prix_unitaire) AS total_ventes,
+        SUM(quantite * CAST(ROUND(prix_unitaire * 100) AS SIGNED)) / 100 AS total_ventes,
         COUNT(DISTINCT date) AS jours_actifs,
         COUNT(DISTINCT produit) AS nb_produits_vendus
     FROM ventes
-    WHERE YEAR(date) = annee AND MONTH(date) = mois
+    WHERE date >= debut AND date < debut + INTERVAL 1 MONTH
     GROUP BY magasin
     ORDER BY total_ventes DESC;
 END //
 DELIMITER ;
 
 -- Trigger pour vérification de données
+-- (mêmes règles appliquées par lots avant l'envoi par l'import, voir backend/validation.py)
 DELIMITER //
 CREATE TRIGGER verif_ventes_before_insert
 BEFORE INSERT ON ventes
@@ -149,4 +200,17 @@ INSERT INTO ventes (date, magasin, produit, quantite, prix_unitaire) VALUES
 ('2023-01-16', 'Magasin Marseille', 'Écran 4K', 3, 299.99),
 ('2023-01-17', 'Magasin Lyon', 'Casque audio', 15, 79.99),
 ('2023-01-17', 'Magasin Paris', 'Smartphone', 7, 649.99),
-('2023-01-18', 'Magasin Marseille', 'Ordinateur portable', 4, 1099.99)
+('2023-01-18', 'Magasin Marseille', 'Ordinateur portable', 4, 1099.99);
+
+-- Cumuls journaliers des données d'exemple
+INSERT INTO ventes_cumul_jour
+    (date, magasin, produit, quantite_totale, total_centimes, somme_prix_centimes, nb_transactions)
+SELECT date, magasin, produit, SUM(quantite), SUM(quantite * CAST(ROUND(prix_unitaire * 100) AS SIGNED)),
+       SUM(CAST(ROUND(prix_unitaire * 100) AS SIGNED)), COUNT(*)
+FROM ventes
+GROUP BY date, magasin, produit
+ON DUPLICATE KEY UPDATE
+    quantite_totale = VALUES(quantite_totale),
+    total_centimes = VALUES(total_centimes),
+    somme_prix_centimes = VALUES(somme_prix_centimes),
+    nb_transactions = VALUES(nb_transactions);
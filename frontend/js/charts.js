@@ -58,6 +58,23 @@ function initializeCharts(data) {
     setupChartEvents(data);
 }
 
+// Redessine les graphiques après une mise à jour des données (les événements
+// déjà branchés par setupChartEvents lisent le même objet data, modifié sur place)
+function redrawCharts(data) {
+    ['salesTrendChart', 'storesComparisonChart', 'productsPerformanceChart', 'monthlyComparisonChart']
+        .forEach(function(name) {
+            if (window[name]) {
+                window[name].destroy();
+                window[name] = null;
+            }
+        });
+
+    initSalesTrendChart(data);
+    initStoresComparisonChart(data);
+    initProductsPerformanceChart(data);
+    initMonthlyComparisonChart(data);
+}
+
 function initSalesTrendChart(data) {
     if (!data.monthly_sales || data.monthly_sales.length === 0) {
         console.warn("Pas de données mensuelles disponibles");
@@ -357,13 +374,6 @@ function setupChartEvents(data) {
             searchProductsTable(this.value);
         });
     }
-
-    const refreshBtn = document.getElementById('refreshData');
-    if (refreshBtn) {
-        refreshBtn.addEventListener('click', function() {
-            window.location.reload();
-        });
-    }
 }
 
 function updateSalesTrendChart(periodType, data) {
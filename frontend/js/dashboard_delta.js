@@ -0,0 +1,69 @@
+// Mise à jour incrémentale des données du tableau de bord
+// Applique dashboard_delta.json (écrit par SalesAnalyzer.export_data_for_dashboard)
+// à des données déjà chargées, sans retélécharger dashboard_data.js.
+
+function roundCents(value) {
+    return Math.round(value * 100) / 100;
+}
+
+// Renvoie les données mises à jour, ou null si le delta ne part pas de leur version
+// (il faut alors recharger dashboard_data.js en entier)
+function applyDashboardDelta(data, delta) {
+    if (!data || !delta) return null;
+    if (data.data_version === delta.version) return data;
+    if (data.data_version !== delta.depuis) return null;
+
+    const stores = {};
+    data.sales_by_store.forEach(function(s) { stores[s.magasin] = s; });
+    const products = {};
+    data.sales_by_product.forEach(function(p) { products[p.produit] = p; });
+    const months = {};
+    data.monthly_sales.forEach(function(m) { months[m.periode] = m; });
+
+    delta.lignes.forEach(function(ligne) {
+        const magasin = ligne[0], produit = ligne[1], periode = ligne[2];
+        const quantite = ligne[3], montant = ligne[4];
+
+        data.total_sales = roundCents((data.total_sales || 0) + montant);
+
+        if (!stores[magasin]) {
+            stores[magasin] = { magasin: magasin, total_ventes: 0 };
+            data.sales_by_store.push(stores[magasin]);
+        }
+        stores[magasin].total_ventes = roundCents(stores[magasin].total_ventes + montant);
+
+        if (!products[produit]) {
+            products[produit] = { produit: produit, quantite_totale: 0, total_ventes: 0 };
+            data.sales_by_product.push(products[produit]);
+        }
+        products[produit].quantite_totale += quantite;
+        products[produit].total_ventes = roundCents(products[produit].total_ventes + montant);
+
+        if (!months[periode]) {
+            months[periode] = { periode: periode, total_ventes: 0 };
+            data.monthly_sales.push(months[periode]);
+        }
+        months[periode].total_ventes = roundCents(months[periode].total_ventes + montant);
+    });
+
+    // Mêmes tris que build_dashboard_facets (backend/database.py)
+    data.sales_by_store.sort(function(a, b) { return b.total_ventes - a.total_ventes; });
+    data.sales_by_product.sort(function(a, b) { return b.total_ventes - a.total_ventes; });
+    data.monthly_sales.sort(function(a, b) { return a.periode < b.periode ? -1 : a.periode > b.periode ? 1 : 0; });
+    const limit = data.best_selling_products.length || 5;
+    data.best_selling_products = data.sales_by_product.slice()
+        .sort(function(a, b) { return b.quantite_totale - a.quantite_totale; })
+        .slice(0, limit)
+        .map(function(p) { return { produit: p.produit, quantite_totale: p.quantite_totale }; });
+
+    data.data_version = delta.version;
+    return data;
+}
+
+// Télécharge le dernier delta et l'applique ; null si un rechargement complet est nécessaire
+function refreshDashboardData(data) {
+    return fetch('js/dashboard_delta.json', { cache: 'no-cache' })
+        .then(function(response) { return response.ok ? response.json() : null; })
+        .then(function(delta) { return applyDashboardDelta(data, delta); })
+        .catch(function() { return null; });
+}
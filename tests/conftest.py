@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+
+"""Fixtures communes : base SQLite temporaire et fichiers CSV de ventes"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+CSV_HEADER = "Date,Magasin,Produit,Quantité vendue,Prix unitaire\n"
+
+@pytest.fixture
+def db_config(tmp_path):
+    """Paramètres d'une base SQLite vide propre au test"""
+    return {'backend': 'sqlite', 'database': str(tmp_path / 'ventes.sqlite')}
+
+@pytest.fixture
+def write_csv(tmp_path):
+    """Écrit un CSV de ventes (lignes sans en-tête) et renvoie son chemin"""
+    def write(lines, name='ventes.csv'):
+        path = tmp_path / name
+        path.write_text(CSV_HEADER + ''.join(line + '\n' for line in lines), encoding='utf-8')
+        return str(path)
+    return write
+
+@pytest.fixture
+def empty_db(db_config):
+    """DatabaseManager connecté à une base dont les tables existent mais sont vides"""
+    from backends import connect
+    from database import DatabaseManager
+    from import_csv import create_tables_if_not_exist
+
+    conn = connect(db_config)
+    cursor = conn.cursor()
+    assert create_tables_if_not_exist(cursor, star=False)
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+    db = DatabaseManager(db_config, use_rollups=False)
+    assert db.connect()
+    yield db
+    db.disconnect()
+
+def insert_sales(db, rows):
+    """Insère des ventes (id, date, magasin, produit, quantite, prix) avec leurs ids"""
+    for row in rows:
+        assert db.execute_query("INSERT INTO ventes (id, date, magasin, produit, quantite, prix_unitaire) "
+                                "VALUES (%s, %s, %s, %s, %s, %s)", row, commit=True)
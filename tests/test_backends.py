@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from backends import SQLiteBackend
+from columns import COLUMNAR_SELECT
+from conftest import insert_sales
+
+SALES = [
+    (1, '1970-01-02', 'Magasin_1', 'Produit_1', 2, 1.5),
+    (2, '2024-02-29', 'Magasin_1', 'Produit_2', 1, 10.05),
+    (3, '2024-03-01', 'Magasin_2', 'Produit_1', 3, 0.29),
+    (4, '2024-03-15', 'Magasin_2', 'Produit_2', 1, 100),
+]
+
+def test_translate_mysql_functions():
+    backend = SQLiteBackend()
+    assert backend.translate("SELECT DATE_FORMAT(date, '%Y-%m') AS p FROM ventes WHERE magasin = %s") == \
+        "SELECT strftime('%Y-%m', date) AS p FROM ventes WHERE magasin = ?"
+    assert backend.translate("SELECT DATE_FORMAT(date, '%H:%i:%s')") == "SELECT strftime('%H:%M:%S', date)"
+    assert backend.translate("SELECT DATEDIFF(date, '1970-01-01'), DATEDIFF(date, %s)") == \
+        ("SELECT CAST(julianday(date) - julianday('1970-01-01') AS INTEGER), "
+         "CAST(julianday(date) - julianday(?) AS INTEGER)")
+    assert backend.translate("SELECT CAST(ROUND(prix_unitaire * 100) AS SIGNED)") == \
+        "SELECT CAST(ROUND(prix_unitaire * 100) AS INTEGER)"
+
+def test_translate_keeps_string_literals():
+    backend = SQLiteBackend()
+    assert backend.translate("SELECT 1 WHERE produit LIKE '%s%' AND nom = 'l''%s' AND magasin = %s") == \
+        "SELECT 1 WHERE produit LIKE '%s%' AND nom = 'l''%s' AND magasin = ?"
+    with pytest.raises(ValueError):
+        backend.translate("SELECT DATE_FORMAT(date, '%M %Y')")
+
+def test_translated_queries_match_mysql_results(empty_db):
+    insert_sales(empty_db, SALES)
+    assert [row['periode'] for row in empty_db.get_sales_by_date('daily')] == \
+        ['1970-01-02', '2024-02-29', '2024-03-01', '2024-03-15']
+    monthly = empty_db.get_sales_by_date('monthly')
+    assert [(row['periode'], row['total_ventes']) for row in monthly] == \
+        [('1970-01', 3.0), ('2024-02', 10.05), ('2024-03', 100.87)]
+    assert [row['periode'] for row in empty_db.get_sales_by_date('yearly')] == ['1970', '2024']
+
+    rows = empty_db.fetch_all(COLUMNAR_SELECT + " ORDER BY id")
+    assert [(row['jour'], row['prix_centimes']) for row in rows] == \
+        [(1, 150), (19782, 1005), (19783, 29), (19797, 10000)]
+    assert empty_db.fetch_one("SELECT DATEDIFF(date, %s) AS ecart FROM ventes WHERE id = %s",
+                              ('2024-02-01', 3))['ecart'] == 29
+    assert empty_db.fetch_one("SELECT COUNT(*) AS nb FROM ventes WHERE produit LIKE 'Produit%' "
+                              "AND magasin = %s", ('Magasin_2',))['nb'] == 2
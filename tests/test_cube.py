@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+
+from conftest import insert_sales
+from cube import SalesCube
+
+def sale(sale_id, magasin, quantite):
+    return (sale_id, '2024-02-10', magasin, 'Produit_1', quantite, 1.25)
+
+def quantities(cube):
+    return {row['magasin']: row['quantite_totale'] for row in cube.query(('magasin',))}
+
+def test_refresh_reads_only_new_rows(empty_db):
+    cube = SalesCube()
+    insert_sales(empty_db, [sale(1, 'Magasin_1', 2), sale(2, 'Magasin_2', 3)])
+    assert cube.refresh(empty_db) == 2
+    assert cube.refresh(empty_db) == 0
+    insert_sales(empty_db, [sale(3, 'Magasin_1', 5)])
+    assert cube.refresh(empty_db) == 1
+    assert quantities(cube) == {'Magasin_1': 7, 'Magasin_2': 3}
+    assert cube.query()[0]['total_ventes'] == 12.5
+
+def test_refresh_picks_up_late_commit_below_the_mark(empty_db):
+    cube = SalesCube()
+    # L'id 2 est encore en cours d'insertion par un autre import
+    insert_sales(empty_db, [sale(1, 'Magasin_1', 2), sale(3, 'Magasin_1', 4)])
+    assert cube.refresh(empty_db) == 2
+    assert not cube.is_current(empty_db.get_data_version())
+
+    insert_sales(empty_db, [sale(2, 'Magasin_2', 9)])
+    assert cube.refresh(empty_db) == 1
+    assert cube.is_current(empty_db.get_data_version())
+    assert quantities(cube) == {'Magasin_1': 6, 'Magasin_2': 9}
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+
+import api
+from analysis import SalesAnalyzer
+from cache import ResultCache
+from conftest import insert_sales
+
+def sale(sale_id, quantite):
+    return (sale_id, '2024-02-10', 'Magasin_1', 'Produit_1', quantite, 1.0)
+
+def test_token_changes_on_late_commit_below_last_id(empty_db):
+    assert empty_db.get_data_token() == '0-0'
+    insert_sales(empty_db, [sale(1, 1), sale(3, 3)])
+    token = empty_db.get_data_token()
+    # L'id 2, validé après l'id 3 par un import concurrent, ne change pas le dernier id
+    insert_sales(empty_db, [sale(2, 20)])
+    assert empty_db.get_data_version() == 3
+    assert empty_db.get_data_token() != token
+
+def test_analyzer_cache_sees_late_commit(empty_db):
+    analyzer = SalesAnalyzer(db_manager=empty_db, cache=ResultCache())
+    insert_sales(empty_db, [sale(1, 1), sale(3, 3)])
+    assert analyzer.calculate_total_sales() == 4.0
+    insert_sales(empty_db, [sale(2, 20)])
+    assert analyzer.calculate_total_sales() == 24.0
+
+def test_api_etag_changes_on_late_commit(empty_db, monkeypatch):
+    monkeypatch.setattr(api, 'VERSION_TTL', -1)
+    client = api.create_app(db=empty_db, cache=ResultCache()).test_client()
+    insert_sales(empty_db, [sale(1, 1), sale(3, 3)])
+    first = client.get('/api/total')
+    assert first.get_json()['total_ventes'] == 4.0
+    assert client.get('/api/total', headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+
+    insert_sales(empty_db, [sale(2, 20)])
+    second = client.get('/api/total', headers={'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 200
+    assert second.get_json()['total_ventes'] == 24.0
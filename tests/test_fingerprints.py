@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+import sqlite3
+
+from backends import backend_of, connect
+from fingerprints import (FINGERPRINT_INDEX, OBSOLETE_FINGERPRINT_INDEX, OccurrenceCounter, drop_known_rows,
+                          ensure_fingerprint_schema, row_fingerprint)
+from import_csv import import_data, import_files
+
+ROW = ('2024-03-01', 'Magasin_1', 'Produit_1', 2, 150)
+
+def test_identical_rows_get_distinct_ranked_fingerprints():
+    counter = OccurrenceCounter(1000)
+    first, second = (row_fingerprint('2024-03-01 10:00', ROW, counter) for _ in range(2))
+    assert first != second
+    assert 0 <= first < 2 ** 63 and 0 <= second < 2 ** 63
+    # Même ordre de lecture, mêmes empreintes
+    counter = OccurrenceCounter(1000)
+    assert [row_fingerprint('2024-03-01 10:00', ROW, counter) for _ in range(2)] == [first, second]
+
+def test_drop_known_rows_matches_date_and_fingerprint(db_config):
+    conn = connect(db_config)
+    cursor = conn.cursor()
+    cursor.execute("CREATE TABLE ventes (id INTEGER PRIMARY KEY, date DATE NOT NULL, magasin VARCHAR(100), "
+                   "produit VARCHAR(200), quantite INT, prix_unitaire DECIMAL(10, 2))")
+    ensure_fingerprint_schema(cursor)
+    cursor.execute("INSERT INTO ventes (date, magasin, produit, quantite, prix_unitaire, empreinte) "
+                   "VALUES ('2024-03-01', 'Magasin_1', 'Produit_1', 2, 1.5, 42)")
+    batch = [ROW + (42,), ('2024-03-02',) + ROW[1:] + (42,), ROW + (43,)]
+    fresh, known = drop_known_rows(cursor, batch)
+    assert known == 1
+    assert fresh == batch[1:]
+    conn.close()
+
+def test_old_fingerprint_index_is_replaced(db_config):
+    conn = connect(db_config)
+    cursor = conn.cursor()
+    cursor.execute("CREATE TABLE ventes (id INTEGER PRIMARY KEY, date DATE NOT NULL, empreinte BIGINT NULL)")
+    cursor.execute(f"CREATE UNIQUE INDEX {OBSOLETE_FINGERPRINT_INDEX} ON ventes (empreinte)")
+    ensure_fingerprint_schema(cursor)
+    backend = backend_of(cursor)
+    assert backend.index_exists(cursor, 'ventes', FINGERPRINT_INDEX)
+    assert not backend.index_exists(cursor, 'ventes', OBSOLETE_FINGERPRINT_INDEX)
+    # Une même empreinte à deux dates différentes n'est pas un doublon
+    cursor.execute("INSERT INTO ventes (date, empreinte) VALUES ('2024-03-01', 7), ('2024-03-02', 7)")
+    conn.close()
+
+def test_reimport_adds_no_rows(db_config, write_csv):
+    path = write_csv(["2024-03-01 10:00:00,Magasin_1,Produit_1,2,1.50"] * 3
+                     + ["2024-03-02 11:00:00,Magasin_2,Produit_1,1,4.00"])
+    assert import_data(path, db_config=db_config, resume=False, idempotent=True)['importees'] == 4
+    again = import_data(path, db_config=db_config, resume=False, idempotent=True, skip_known_files=False)
+    assert (again['importees'], again['doublons']) == (0, 4)
+
+def stored_fingerprints(config):
+    with sqlite3.connect(config['database']) as conn:
+        return sorted(conn.execute("SELECT date, empreinte FROM ventes").fetchall())
+
+def test_parallel_import_ranks_duplicates_across_ranges(tmp_path, write_csv):
+    # Lignes identiques de part et d'autre des limites de plages (environ 45 octets par ligne)
+    lines = ["2024-03-01 10:00:00,Magasin_1,Produit_1,2,1.50"] * 6 + \
+            [f"2024-03-0{day} 09:00:00,Magasin_2,Produit_{day},1,4.00" for day in range(2, 6)] + \
+            ["2024-03-01 10:00:00,Magasin_1,Produit_1,2,1.50"] * 3
+    path = write_csv(lines)
+    sequential = {'backend': 'sqlite', 'database': str(tmp_path / 'sequentiel.sqlite')}
+    assert import_data(path, db_config=sequential, resume=False, idempotent=True)['importees'] == len(lines)
+
+    for chunk_bytes in (64, 100, 4096):
+        parallel = {'backend': 'sqlite', 'database': str(tmp_path / f'parallele_{chunk_bytes}.sqlite')}
+        summary = import_files([path], workers=2, chunk_bytes=chunk_bytes, db_config=parallel, idempotent=True)
+        assert (summary[path]['importees'], summary[path]['doublons']) == (len(lines), 0)
+        assert stored_fingerprints(parallel) == stored_fingerprints(sequential)
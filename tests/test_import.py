@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sqlite3
+
+import pytest
+
+import import_csv
+from import_csv import import_data, load_checkpoint, save_checkpoint
+
+LINES = [f"2024-04-{day:02d} 12:00:00,Magasin_{day % 3},Produit_{day % 4},{day},1.{day:02d}" for day in range(1, 9)]
+# Ventes identiques de part et d'autre de l'interruption : leurs rangs doivent être retrouvés
+LINES += ["2024-04-20 08:00:00,Magasin_1,Produit_1,1,2.00"] * 4
+
+def stored_rows(config):
+    with sqlite3.connect(config['database']) as conn:
+        return sorted(conn.execute("SELECT date, magasin, produit, quantite, prix_unitaire FROM ventes").fetchall())
+
+def interrupt_after(monkeypatch, batches):
+    """Fait échouer l'import au lot suivant les batches premiers lots insérés"""
+    real_insert = import_csv.insert_batch
+    calls = []
+
+    def insert_batch(*args, **kwargs):
+        if len(calls) == batches:
+            raise RuntimeError("coupure simulée")
+        calls.append(1)
+        return real_insert(*args, **kwargs)
+    monkeypatch.setattr(import_csv, 'insert_batch', insert_batch)
+
+@pytest.mark.parametrize('idempotent', [False, True])
+def test_interrupted_import_resumes_from_checkpoint(db_config, write_csv, monkeypatch, idempotent):
+    path = write_csv(LINES)
+    reference = dict(db_config, database=db_config['database'] + '.reference')
+    import_data(path, db_config=reference, resume=False, idempotent=idempotent)
+
+    interrupt_after(monkeypatch, 2)
+    assert import_data(path, batch_size=4, db_config=db_config, idempotent=idempotent) is None
+    checkpoint = load_checkpoint(path)
+    assert checkpoint['importees'] == 8
+    assert len(stored_rows(db_config)) == 8
+
+    monkeypatch.undo()
+    summary = import_data(path, batch_size=4, db_config=db_config, idempotent=idempotent)
+    assert summary['importees'] == len(LINES)
+    assert summary['doublons'] == 0
+    assert stored_rows(db_config) == stored_rows(reference)
+    assert load_checkpoint(path) is None
+
+def test_checkpoint_beyond_end_of_file_is_ignored(db_config, write_csv):
+    path = write_csv(LINES)
+    save_checkpoint(path, os.path.getsize(path) + 1, 99, 99)
+    assert load_checkpoint(path) is None
+    assert import_data(path, db_config=db_config)['importees'] == len(LINES)
+
+def test_checkpoint_of_another_file_version_is_ignored(db_config, write_csv):
+    path = write_csv(LINES)
+    save_checkpoint(path, 100, 3, 2)
+    assert load_checkpoint(path)['offset'] == 100
+    # Fichier corrigé déposé sous le même nom : même taille, contenu et date différents
+    write_csv([line.replace('Magasin_', 'Magasin-') for line in LINES])
+    os.utime(path, ns=(0, 0))
+    assert load_checkpoint(path) is None
+    assert import_data(path, db_config=db_config)['importees'] == len(LINES)
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import os
+import time
+
+import ingestion
+from import_csv import save_checkpoint
+from ingestion import DONE_DIR, ERROR_DIR, IngestionService
+
+def make_service(tmp_path, regenerate_seconds=0.0):
+    service = IngestionService(str(tmp_path / 'depot'), db_config={'backend': 'sqlite'},
+                               poll_interval=0.02, report_interval=0, metrics_path=None)
+    reports = []
+
+    def regenerate_reports():
+        time.sleep(regenerate_seconds)
+        reports.append(time.monotonic())
+    service.regenerate_reports = regenerate_reports
+    return service, reports
+
+def drop(service, *names):
+    os.makedirs(service.drop_dir, exist_ok=True)
+    for name in names:
+        with open(os.path.join(service.drop_dir, name), 'w', encoding='utf-8') as f:
+            f.write(name)
+    return [os.path.join(service.drop_dir, name) for name in names]
+
+def test_stop_during_report_publishes_last_import_and_returns(tmp_path, monkeypatch):
+    # Le second import se termine pendant la première régénération, et l'arrêt arrive pendant cet import
+    service, reports = make_service(tmp_path, regenerate_seconds=0.3)
+    first, second = drop(service, 'a.csv', 'b.csv')
+    os.utime(first, (1, 1))
+
+    async def main():
+        loop = asyncio.get_running_loop()
+
+        def import_data(path, db_config=None):
+            if path == second:
+                time.sleep(0.1)
+                loop.call_soon_threadsafe(service.stop)
+            return {'importees': 1, 'rejetees': 0}
+        monkeypatch.setattr(ingestion, 'import_data', import_data)
+        await asyncio.wait_for(service.run(), 5)
+
+    asyncio.run(main())
+    assert service.metrics['fichiers_importes'] == 2
+    assert len(reports) == 2
+    assert service.first_unreported is None
+    assert sorted(os.listdir(os.path.join(service.drop_dir, DONE_DIR))) == ['a.csv', 'b.csv']
+
+def test_failed_file_takes_its_checkpoint_along(tmp_path, monkeypatch):
+    service, reports = make_service(tmp_path)
+    path, = drop(service, 'ventes.csv')
+
+    def import_data(path, db_config=None):
+        save_checkpoint(path, 4, 2, 1)
+        service.stop()
+        raise RuntimeError("coupure simulée")
+    monkeypatch.setattr(ingestion, 'import_data', import_data)
+    asyncio.run(asyncio.wait_for(service.run(), 5))
+
+    assert service.metrics['fichiers_en_erreur'] == 1
+    assert not reports
+    assert sorted(os.listdir(service.drop_dir)) == [ERROR_DIR]
+    assert sorted(os.listdir(os.path.join(service.drop_dir, ERROR_DIR))) == \
+        ['ventes.csv', 'ventes.csv.checkpoint']
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+
+import sqlite3
+from decimal import Decimal
+
+import pytest
+
+from backends import connect
+from money import (AMOUNT_CENTS_SQL, PRICE_CENTS_SQL, PRICE_FROM_CENTS_SQL, cents_from_float, parse_cents,
+                   rows_to_euros, to_euros)
+
+@pytest.mark.parametrize('text, cents', [
+    ('12.34', 1234), ('12,3', 1230), ('1 299', 129900), ('-0.5', -50), ('+7', 700), ('.5', 50),
+    ('0.005', 1), ('0.0049', 0), ('2.675', 268), ('1e2', 10000), ('99999999.99', 9999999999),
+])
+def test_parse_cents(text, cents):
+    assert parse_cents(text) == cents
+
+@pytest.mark.parametrize('text', ['', '-', 'abc', '1.2.3', 'nan', 'inf', '12€'])
+def test_parse_cents_rejects_non_numbers(text):
+    with pytest.raises(ValueError):
+        parse_cents(text)
+
+def test_conversion_to_euros_happens_once():
+    assert cents_from_float([0.29, 10.05, 1.15, -0.07]).tolist() == [29, 1005, 115, -7]
+    assert to_euros(None) is None
+    assert to_euros(Decimal(100087)) == 1000.87
+    assert rows_to_euros([{'magasin': 'Magasin_1', 'total_centimes': 1005}]) == \
+        [{'magasin': 'Magasin_1', 'total_ventes': 10.05}]
+
+def test_cents_round_trip_through_sqlite(empty_db, db_config):
+    cents = list(range(0, 100000, 7)) + [9999999999, 123456789, 1, 5, 57, 995]
+    conn = connect(db_config)
+    cursor = conn.cursor()
+    cursor.executemany(f"INSERT INTO ventes (date, magasin, produit, quantite, prix_unitaire) "
+                       f"VALUES (%s, %s, %s, %s, {PRICE_FROM_CENTS_SQL})",
+                       [('2024-03-01', 'Magasin_1', 'Produit_1', 3, value) for value in cents])
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+    # Valeurs stockées (REAL sous SQLite) : le double le plus proche de chaque prix, sans bruit
+    with sqlite3.connect(db_config['database']) as raw:
+        stored = [price for price, in raw.execute("SELECT prix_unitaire FROM ventes ORDER BY id")]
+    assert stored == [value / 100 for value in cents]
+
+    rows = empty_db.fetch_all(f"SELECT prix_unitaire, {PRICE_CENTS_SQL} AS prix, {AMOUNT_CENTS_SQL} AS montant "
+                              f"FROM ventes ORDER BY id")
+    assert [row['prix_unitaire'] for row in rows] == [Decimal(value).scaleb(-2) for value in cents]
+    assert [row['prix'] for row in rows] == cents
+    assert [row['montant'] for row in rows] == [3 * value for value in cents]
+    # Somme exacte en centimes, convertie une seule fois
+    total = empty_db.get_sales_by_date('yearly')[0]['total_ventes']
+    assert total == to_euros(3 * sum(cents))
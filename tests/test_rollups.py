@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+import rollups
+from database import DatabaseManager
+from import_csv import import_data
+
+LINES = [
+    "2022-01-01 08:00:00,Magasin_1,Produit_1,3,2.50",
+    "2022-01-01 09:00:00,Magasin_1,Produit_1,1,2.50",
+    "2022-01-01 10:00:00,Magasin_2,Produit_1,2,4.10",
+    "2022-01-02 11:00:00,Magasin_1,Produit_2,5,0.99",
+]
+
+@pytest.fixture
+def db(db_config, write_csv):
+    assert import_data(write_csv(LINES), db_config=db_config, resume=False)['importees'] == len(LINES)
+    manager = DatabaseManager(db_config, use_rollups=False)
+    assert manager.connect()
+    yield manager
+    manager.disconnect()
+
+def test_import_keeps_rollups_consistent(db):
+    assert rollups.check_rollups(db) == []
+
+def test_check_rollups_reports_drift(db):
+    db.execute_query(f"UPDATE {rollups.ROLLUP_TABLE} SET quantite_totale = quantite_totale + 1 "
+                     "WHERE date = '2022-01-02'", commit=True)
+    assert len(rollups.check_rollups(db)) == 1
+
+def test_rebuild_restores_rollups(db):
+    db.execute_query(f"DELETE FROM {rollups.ROLLUP_TABLE} WHERE date = '2022-01-01'", commit=True)
+    assert rollups.check_rollups(db)
+    assert rollups.rebuild_rollups(db)
+    assert rollups.check_rollups(db) == []
+
+def test_failed_rebuild_keeps_previous_rollups(db, monkeypatch):
+    before = db.fetch_all(f"SELECT * FROM {rollups.ROLLUP_TABLE} ORDER BY date, magasin, produit")
+    monkeypatch.setattr(rollups, 'rebuild_rollup_sql', lambda star=False: "INSERT INTO table_absente SELECT 1")
+    assert not rollups.rebuild_rollups(db)
+    assert db.fetch_all(f"SELECT * FROM {rollups.ROLLUP_TABLE} ORDER BY date, magasin, produit") == before
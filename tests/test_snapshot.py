@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+
+from conftest import insert_sales
+from snapshot import SnapshotStore
+
+SALES = [
+    (1, '2024-01-31', 'Magasin_1', 'Produit_1', 1, 2.0),
+    (2, '2024-02-01', 'Magasin_1', 'Produit_2', 2, 3.5),
+    (4, '2024-02-15', 'Magasin_2', 'Produit_1', 3, 1.1),
+    (5, '2024-03-01', 'Magasin_2', 'Produit_2', 4, 0.5),
+]
+
+def test_load_filters_days_inside_border_months(empty_db, tmp_path):
+    insert_sales(empty_db, SALES)
+    store = SnapshotStore(str(tmp_path / 'copie'))
+    assert store.refresh(empty_db) == 4
+
+    frame = store.load(start='2024-02-01', end='2024-02-29')
+    assert sorted(frame['quantite'].tolist()) == [2, 3]
+    assert len(store.load()) == 4
+
+def test_refresh_copies_late_commit_once(empty_db, tmp_path):
+    insert_sales(empty_db, SALES)
+    path = str(tmp_path / 'copie')
+    assert SnapshotStore(path).refresh(empty_db) == 4
+
+    # L'id 3 est validé après la copie des ids 4 et 5 ; le repère est relu depuis le manifeste
+    insert_sales(empty_db, [(3, '2024-02-10', 'Magasin_3', 'Produit_1', 7, 1.0)])
+    store = SnapshotStore(path)
+    assert store.refresh(empty_db) == 1
+    assert store.refresh(empty_db) == 0
+    frame = store.load(columns=['Magasin', 'quantite'])
+    assert frame.groupby('Magasin')['quantite'].sum().to_dict() == {'Magasin_1': 3, 'Magasin_2': 7, 'Magasin_3': 7}
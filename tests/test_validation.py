@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+from validation import BatchValidator
+
+def sale(magasin='Magasin_1', produit='Produit_1', quantite=1, prix=100, day='2024-05-01'):
+    return (day, magasin, produit, quantite, prix)
+
+def reasons(validator, rows):
+    valid, refused = validator.split(rows)
+    assert len(valid) + len(refused) == len(rows)
+    return dict(refused)
+
+def test_first_broken_rule_wins():
+    validator = BatchValidator(known_stores={'Magasin_1'}, known_products={'Produit_1'}, today='2024-06-01')
+    rows = [
+        sale(),
+        sale(quantite=0, prix=0, day='2030-01-01'),
+        sale(prix=-5, magasin='Magasin_9'),
+        sale(day='2030-01-01', quantite=2 ** 31),
+        sale(magasin='', produit='Produit_9'),
+        sale(magasin='Magasin_9', produit='Produit_9'),
+        sale(produit='Produit_9'),
+    ]
+    assert reasons(validator, rows) == {
+        1: 'quantité négative ou nulle',
+        2: 'prix négatif ou nul',
+        3: 'date dans le futur',
+        4: 'magasin manquant',
+        5: 'magasin inconnu',
+        6: 'produit inconnu',
+    }
+    assert validator.reasons['quantité négative ou nulle'] == 1
+    assert validator.rows == len(rows)
+
+def test_outliers_use_the_median_of_each_product():
+    validator = BatchValidator(today='2024-06-01')
+    # Produits mélangés : chaque médiane ne porte que sur les prix de son produit
+    rows = [sale(produit='A', prix=p) for p in (10, 20, 30, 40, 50, 60)]
+    rows += [sale(produit='B', prix=p) for p in (10, 20, 30, 40, 1000)]
+    rows = rows[::2] + rows[1::2]
+    refused = reasons(validator, rows)
+    assert validator.reference_prices == {'A': 35, 'B': 30}
+    assert [rows[i][4] for i in refused] == [1000]
+    assert set(refused.values()) == {'prix aberrant'}
+
+def test_rare_products_use_the_last_known_median():
+    validator = BatchValidator(today='2024-06-01')
+    reasons(validator, [sale(produit='A', prix=p) for p in (10, 20, 30, 40, 50, 60)])
+    # Trop peu de lignes de A dans ce lot : la médiane du lot précédent (35) sert de référence
+    assert reasons(validator, [sale(produit='A', prix=351), sale(produit='A', prix=350),
+                               sale(produit='A', prix=3)]) == {0: 'prix aberrant', 2: 'prix aberrant'}
+    # Un produit jamais vu en nombre n'est pas contrôlé
+    assert reasons(validator, [sale(produit='C', prix=10 ** 6)]) == {}
+
+def test_invalid_price_is_not_reported_as_outlier():
+    validator = BatchValidator(today='2024-06-01')
+    rows = [sale(prix=100)] * 5 + [sale(prix=0)]
+    assert reasons(validator, rows) == {5: 'prix négatif ou nul'}
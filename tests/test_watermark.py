@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from conftest import insert_sales
+from watermark import Watermark, split_interval
+
+def sale(sale_id, day='2024-01-15', magasin='Magasin_1', quantite=1):
+    return (sale_id, day, magasin, 'Produit_1', quantite, 2.5)
+
+def test_split_interval():
+    present, missing = split_interval(1, 12, np.array([2, 3, 4, 7, 10]))
+    assert present == [(2, 4), (7, 7), (10, 10)]
+    assert missing == [(1, 1), (5, 6), (8, 9), (11, 12)]
+    assert split_interval(5, 8, np.array([], dtype=np.int64)) == ([], [(5, 8)])
+
+def test_contiguous_ids_need_no_gap_tracking(empty_db):
+    insert_sales(empty_db, [sale(i) for i in range(1, 6)])
+    intervals, watermark = Watermark().plan(empty_db, empty_db.get_data_version())
+    assert intervals == [(1, 5)]
+    assert watermark.max_id == 5 and watermark.gaps == []
+    assert watermark.is_current(5)
+
+def test_late_commit_below_the_mark_is_read_once(empty_db):
+    # Les ids 3 et 4 appartiennent à un import concurrent pas encore validé
+    insert_sales(empty_db, [sale(1), sale(2), sale(5), sale(6)])
+    intervals, watermark = Watermark().plan(empty_db, empty_db.get_data_version())
+    assert intervals == [(1, 2), (5, 6)]
+    assert watermark.gaps == [(3, 4)]
+    assert not watermark.is_current(6)
+
+    insert_sales(empty_db, [sale(3, magasin='Magasin_2', quantite=7)])
+    intervals, watermark = watermark.plan(empty_db, empty_db.get_data_version())
+    assert intervals == [(3, 3)]
+    assert watermark.max_id == 6 and watermark.gaps == [(4, 4)]
+
+    rows = empty_db.get_monthly_rollup_for_ids(intervals)
+    assert [(row['magasin'], int(row['quantite_totale'])) for row in rows] == [('Magasin_2', 7)]
+
+def test_gaps_expire_outside_the_window(empty_db):
+    insert_sales(empty_db, [sale(1), sale(3)])
+    _, watermark = Watermark().plan(empty_db, 3, window=10)
+    assert watermark.gaps == [(2, 2)]
+    insert_sales(empty_db, [sale(i) for i in range(4, 20)])
+    intervals, watermark = watermark.plan(empty_db, 19, window=10)
+    assert watermark.gaps == []
+    assert intervals == [(4, 19)]
+
+def test_state_round_trip():
+    watermark = Watermark(42, [(7, 9)])
+    restored = Watermark.from_state(watermark.to_state())
+    assert (restored.max_id, restored.gaps) == (42, [(7, 9)])
+    assert Watermark.from_state({'max_id': 10}).gaps == []